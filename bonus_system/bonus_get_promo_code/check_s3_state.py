@@ -6,9 +6,14 @@
 
 import boto3
 import json
+import os
 import sys
 from datetime import datetime
 
+# Спільний формат файлу промокодів (модуль з директорії Lambda поповнення)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bonus_replenish_promo_code'))
+from promo_codes_store import read_promo_codes, write_promo_codes
+
 class S3PromoChecker:
     def __init__(self):
         self.s3_client = boto3.client('s3', region_name='eu-north-1')
@@ -19,9 +24,7 @@ class S3PromoChecker:
     def get_promo_codes_state(self):
         """Отримує стан промокодів з S3"""
         try:
-            response = self.s3_client.get_object(Bucket=self.bucket, Key=self.promo_codes_key)
-            data = json.loads(response['Body'].read().decode('utf-8'))
-            return data
+            return read_promo_codes(self.s3_client, self.bucket, self.promo_codes_key)
         except self.s3_client.exceptions.NoSuchKey:
             print("❌ Файл з промокодами не знайдено в S3")
             return {}
@@ -33,7 +36,7 @@ class S3PromoChecker:
         """Отримує лічильники використання з S3"""
         try:
             response = self.s3_client.get_object(Bucket=self.bucket, Key=self.used_codes_key)
-            data = json.loads(response['Body'].read().decode('utf-8'))
+            data = json.load(response['Body'])
             return data
         except self.s3_client.exceptions.NoSuchKey:
             return {}
@@ -182,12 +185,7 @@ class S3PromoChecker:
             }
             
             # Зберігаємо
-            self.s3_client.put_object(
-                Bucket=self.bucket,
-                Key=self.promo_codes_key,
-                Body=json.dumps(promo_codes, indent=2),
-                ContentType='application/json'
-            )
+            write_promo_codes(self.s3_client, self.bucket, self.promo_codes_key, promo_codes)
             
             print(f"✅ Додано {count} тестових промокодів для суми {amount} грн")
             print(f"📝 Нові коди: {', '.join(new_codes)}")
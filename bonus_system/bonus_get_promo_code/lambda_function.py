@@ -59,11 +59,14 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Missing required field: amount'})
             }
 
+        # Ключ суми в S3-файлах (рядок) обчислюємо один раз
+        amount_key = str(amount)
+
         # Ініціалізація сервісу (без браузера)
         promo_service = PromoService()
         
         # Отримання та видалення промокоду з S3
-        promo_code, should_trigger_low_count = promo_service.get_and_remove_code_from_s3(str(amount))
+        promo_code, should_trigger_low_count = promo_service.get_and_remove_code_from_s3(amount_key)
         
         if not promo_code:
             error_message = f"Промокоди для суми {amount} грн закінчилися."
@@ -78,7 +81,7 @@ def lambda_handler(event, context):
         
         # Записуємо використання промокоду і перевіряємо, чи потрібно запускати поповнення
         try:
-            should_trigger_batch = promo_service.add_used_code_count(str(amount))
+            should_trigger_batch = promo_service.add_used_code_count(amount_key)
             
             # Запускаємо поповнення, якщо:
             # 1. Набралося достатньо використаних промокодів (батч)
@@ -1,15 +1,40 @@
 import os
+import sys
 import logging
 import json
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 from datetime import datetime
 
+# Спільний формат файлу промокодів. У пакет Lambda модуль копіює deploy.sh,
+# при локальному запуску він береться з сусідньої директорії поповнення
+try:
+    from promo_codes_store import read_promo_codes, write_promo_codes
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bonus_replenish_promo_code'))
+    from promo_codes_store import read_promo_codes, write_promo_codes
+
 logger = logging.getLogger(__name__)
 
+# S3 клієнт створюється один раз на контейнер Lambda і перевикористовується
+# в "теплих" викликах (PromoService створюється на кожен запит)
+_S3_CLIENT = None
+
+def _get_s3_client():
+    """Повертає спільний S3 клієнт, створюючи його при першому виклику."""
+    global _S3_CLIENT
+    if _S3_CLIENT is None:
+        # TCP keepalive тримає з'єднання з S3 живим між "теплими" викликами
+        _S3_CLIENT = boto3.client('s3', config=BotoConfig(
+            tcp_keepalive=True,
+            retries={'max_attempts': 3, 'mode': 'standard'}
+        ))
+    return _S3_CLIENT
+
 class PromoService:
     def __init__(self):
-        self.s3_client = boto3.client('s3')
+        self.s3_client = _get_s3_client()
         self.s3_bucket = os.getenv('SESSION_S3_BUCKET', 'lambda-promo-sessions')
         self.promo_codes_key = 'promo-codes/available_codes.json'
         self.used_codes_key = 'promo-codes/used_codes_count.json'
@@ -25,7 +50,7 @@ class PromoService:
             # Спробуємо завантажити існуючі дані
             try:
                 response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.used_codes_key)
-                used_data = json.loads(response['Body'].read().decode('utf-8'))
+                used_data = json.load(response['Body'])
             except ClientError as e:
                 if e.response['Error']['Code'] == 'NoSuchKey':
                     # Файл не існує, створюємо новий
@@ -71,7 +96,7 @@ class PromoService:
         """
         try:
             response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.used_codes_key)
-            used_data = json.loads(response['Body'].read().decode('utf-8'))
+            used_data = json.load(response['Body'])
             
             # Зберігаємо поточні дані
             current_used = used_data.copy()
@@ -106,8 +131,7 @@ class PromoService:
         """
         try:
             logger.info(f"☁️ [Fast] Завантаження списку промокодів з s3://{self.s3_bucket}/{self.promo_codes_key}")
-            response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.promo_codes_key)
-            all_codes = json.loads(response['Body'].read().decode('utf-8'))
+            all_codes = read_promo_codes(self.s3_client, self.s3_bucket, self.promo_codes_key)
             
             available_for_amount = all_codes.get(amount_key, [])
             if not available_for_amount:
@@ -120,12 +144,7 @@ class PromoService:
             
             all_codes[amount_key] = available_for_amount
             
-            self.s3_client.put_object(
-                Bucket=self.s3_bucket,
-                Key=self.promo_codes_key,
-                Body=json.dumps(all_codes, indent=2),
-                ContentType='application/json'
-            )
+            write_promo_codes(self.s3_client, self.s3_bucket, self.promo_codes_key, all_codes)
             logger.info("☁️ [Fast] Оновлений (зменшений) список промокодів збережено в S3.")
             
             # Перевіряємо, чи потрібно запускати поповнення через малу кількість кодів
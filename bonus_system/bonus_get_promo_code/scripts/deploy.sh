@@ -63,7 +63,7 @@ log_info "Встановлюємо залежності з requirements.txt..."
 pip install --target "$BUILD_DIR" -r requirements.txt > /dev/null
 
 log_info "Копіюємо код Lambda функції..."
-cp lambda_function.py promo_logic.py "$BUILD_DIR"/
+cp lambda_function.py promo_logic.py ../bonus_replenish_promo_code/promo_codes_store.py "$BUILD_DIR"/
 
 log_info "Створюємо ZIP-архів..."
 (cd "$BUILD_DIR" && zip -r ../"$ZIP_FILE" . > /dev/null)
@@ -4,21 +4,33 @@
 import re
 
 
+# BON код: BON + число, далі будь-які символи (регістр не важливий).
+# Скомпільовано один раз; група 1 - сума
+_BON_RE = re.compile(r'BON(\d+)', re.IGNORECASE)
+
+
+def parse_bon(code):
+    """
+    Розбирає BON промокод за один прохід regex
+    Повертає суму як число або None, якщо це не BON код
+    """
+    if not code:
+        return None
+    
+    match = _BON_RE.match(code)
+    return int(match.group(1)) if match else None
+
+
 def is_bon_promo_code(code):
     """
     Перевіряє чи є код BON промокодом
     BON коди мають формат: BONxxxx+ де xxxx - це число за яким можуть бути літери
     """
-    if not code:
-        return False
-    
-    # Перевіряємо чи починається з BON
-    if not code.upper().startswith('BON'):
+    # Достатньо перевірити префікс і першу цифру - без regex та копії через upper()
+    if not code or len(code) < 4:
         return False
     
-    # Паттерн для BON кодів: BON + число + будь-які символи
-    pattern = r'^BON\d+.*$'
-    return bool(re.match(pattern, code.upper()))
+    return code[0] in 'Bb' and code[1] in 'Oo' and code[2] in 'Nn' and code[3].isdecimal()
 
 
 def extract_amount_from_bon_code(code):
@@ -26,15 +38,7 @@ def extract_amount_from_bon_code(code):
     Витягує суму з BON промокода
     Повертає суму як число або None якщо не вдалося витягти
     """
-    if not is_bon_promo_code(code):
-        return None
-    
-    # Витягуємо число після BON
-    match = re.search(r'BON(\d+)', code.upper())
-    if match:
-        return int(match.group(1))
-    
-    return None
+    return parse_bon(code)
 
 
 def format_bon_code(amount):
@@ -1,6 +1,17 @@
 import os
+import atexit
+import contextlib
 import logging
-from playwright.sync_api import sync_playwright, Browser, BrowserContext, Page
+import signal
+import threading
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+# Playwright імпортується лише при запуску браузера (див. _ensure_browser),
+# щоб не витрачати cold start на виклики, що завершуються раніше
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
 
 """
 BrowserManager - Менеджер браузера для Playwright з підтримкою headed/headless режимів
@@ -32,6 +43,138 @@ BrowserManager - Менеджер браузера для Playwright з підт
 # Налаштування логування
 logger = logging.getLogger(__name__)
 
+# Режим за замовчуванням визначається один раз при імпорті модуля:
+# в AWS Lambda завжди headless, локально - PLAYWRIGHT_HEADED (за замовчуванням HEADED)
+_DEFAULT_HEADED = False if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else (
+    os.environ.get('PLAYWRIGHT_HEADED', 'true').lower() in ('true', '1', 'yes')
+)
+
+# Діагностика директорії браузерів виконується один раз на контейнер
+_diag_done = False
+
+def _js_heap_flag():
+    """
+    Ліміт V8 heap для рендерера, залежно від пам'яті Lambda.
+    128MB залишаємо самому процесу браузера
+    """
+    try:
+        memory_mb = int(os.getenv('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '512'))
+    except ValueError:
+        memory_mb = 512
+    heap_mb = max(128, memory_mb - 128)
+    return f'--js-flags=--max-old-space-size={heap_mb} --max-semi-space-size=16'
+
+# Аргументи Chromium будуються один раз при імпорті модуля.
+# dict.fromkeys прибирає дублікати зі збереженням порядку
+
+# Режим для локального дебагу - мінімальні аргументи
+HEADED_ARGS = (
+    '--disable-blink-features=AutomationControlled',
+)
+
+# Headless режим для продакшна (AWS Lambda)
+HEADLESS_ARGS = tuple(dict.fromkeys([
+    # Основні аргументи для AWS Lambda
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+    # Один --disable-features: Chromium бере лише останнє значення прапорця
+    '--disable-features=VizDisplayCompositor,TranslateUI,BlinkGenPropertyTrees',
+    '--disable-blink-features=AutomationControlled',
+    
+    # Новий headless режим (playwright 1.40 запускає повний Chromium, прапорець діє);
+    # Chromium працює у звичайній багатопроцесній моделі
+    '--headless=new',
+    # Картинки не декодуються навіть якщо запит пройде повз route
+    '--blink-settings=imagesEnabled=false',
+    
+    # Оптимізація для serverless
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-ipc-flooding-protection',
+    
+    # Зменшення використання пам'яті
+    '--memory-pressure-off',
+    _js_heap_flag(),
+    
+    # Відключення непотрібних функцій
+    '--disable-extensions',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-translate',
+    '--disable-background-networking',
+    '--disable-background-mode',
+    '--disable-client-side-phishing-detection',
+    '--disable-component-update',
+    '--disable-domain-reliability',
+    '--disable-hang-monitor',
+    '--disable-popup-blocking',
+    '--disable-prompt-on-repost',
+    '--disable-web-resources',
+    '--metrics-recording-only',
+    '--no-first-run',
+    '--safebrowsing-disable-auto-update',
+    '--use-mock-keychain',
+    
+    # Додаткові опції для AWS Lambda
+    # (без --enable-logging/--v=1 - докладні логи Chromium йдуть у CloudWatch)
+    '--no-default-browser-check',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-threaded-animation',
+    '--disable-threaded-scrolling',
+    '--disable-checker-imaging',
+    '--disable-new-content-rendering-timeout',
+    '--disable-background-media-suspend',
+    '--disable-partial-raster',
+    '--disable-canvas-aa',
+    '--disable-2d-canvas-clip-aa',
+    '--disable-gl-drawing-for-tests',
+    '--disable-3d-apis',
+    '--disable-accelerated-2d-canvas',
+    '--disable-accelerated-jpeg-decoding',
+    '--disable-accelerated-mjpeg-decode',
+    '--disable-app-list-dismiss-on-blur',
+    '--disable-accelerated-video-decode',
+]))
+
+def _derive_user_agent():
+    """
+    User-Agent з версією Chrome з PLAYWRIGHT_CHROME_VERSION (за замовчуванням 120.0.0.0),
+    щоб його можна було узгодити з версією Chromium у шарі Lambda без зміни коду
+    """
+    chrome_version = os.getenv('PLAYWRIGHT_CHROME_VERSION', '120.0.0.0')
+    return f'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{chrome_version} Safari/537.36'
+
+# Налаштування контексту браузера (лише для читання - передаються через **)
+_HEADLESS_CTX = MappingProxyType({
+    'viewport': {'width': 1280, 'height': 720},
+    'user_agent': _derive_user_agent(),
+    'ignore_https_errors': True,
+    'java_script_enabled': True,
+})
+
+# У headed режимі збільшуємо viewport для кращого дебагу
+_HEADED_CTX = MappingProxyType({**_HEADLESS_CTX, 'viewport': {'width': 1920, 'height': 1080}})
+
+# Типи ресурсів, які скрапер не використовує - у headless режимі не завантажуються.
+# Стилі не блокуємо: від них залежать видимість і кліки по елементах адмінки
+_BLOCKED_RESOURCE_TYPES = frozenset(('image', 'font', 'media'))
+
+def _block_heavy_resources(route):
+    """Обробник context.route: відхиляє картинки, шрифти та медіа"""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+# Старий однопроцесний режим - лише для відкату через PLAYWRIGHT_LEGACY_HEADLESS=1
+LEGACY_HEADLESS_ARGS = (
+    '--single-process',
+    '--no-zygote',
+    '--disable-setuid-sandbox',
+)
+
 class BrowserManager:
     """
     Менеджер для роботи з Playwright браузером в AWS Lambda.
@@ -47,182 +190,190 @@ class BrowserManager:
         self._initialized = False
         
         # Визначаємо режим запуску
-        if headed_mode is not None:
-            self.headed_mode = headed_mode
-        else:
-            # В AWS Lambda завжди headless режим
-            if os.getenv('AWS_LAMBDA_FUNCTION_NAME'):
-                self.headed_mode = False
-            else:
-                # Для локального режиму перевіряємо змінну середовища (за замовчуванням HEADED режим)
-                self.headed_mode = os.getenv('PLAYWRIGHT_HEADED', 'true').lower() in ['true', '1', 'yes']
+        self.headed_mode = _DEFAULT_HEADED if headed_mode is None else headed_mode
         
-        logger.info(f"🎬 BrowserManager режим: {'HEADED (видимий)' if self.headed_mode else 'HEADLESS (фоновий)'}")
+        logger.debug("🎬 BrowserManager режим: %s", 'HEADED (видимий)' if self.headed_mode else 'HEADLESS (фоновий)')
     
-    def initialize(self) -> Page:
+    def initialize(self) -> "Page":
         """
         Ініціалізує браузер та повертає сторінку для роботи.
+        Браузер запускається один раз, сторінка - якщо її ще немає.
         """
         if self._initialized and self.page:
             return self.page
         
-        logger.info("🚀 Ініціалізуємо Playwright браузер...")
+        self._ensure_browser()
+        return self.new_page()
+    
+    def _ensure_browser(self):
+        """
+        Запускає Playwright і Chromium, якщо вони ще не запущені.
+        Між теплими викликами Lambda перевикористовується лише браузер.
+        """
+        global _diag_done
+        
+        if self._initialized and self.browser and self.browser.is_connected():
+            return
+        
+        if self._initialized:
+            # Браузер впав між викликами - закриваємо залишки і запускаємо заново
+            logger.warning("⚠️ Браузер від'єднано, перезапускаємо...")
+            self.cleanup()
+        
+        logger.debug("🚀 Ініціалізуємо Playwright браузер...")
+        started = time.perf_counter()
         
         # Діагностика середовища
         playwright_browsers_path = os.getenv('PLAYWRIGHT_BROWSERS_PATH', '/opt/playwright-browsers')
-        logger.info(f"🔍 PLAYWRIGHT_BROWSERS_PATH: {playwright_browsers_path}")
+        logger.debug("🔍 PLAYWRIGHT_BROWSERS_PATH: %s", playwright_browsers_path)
         
         # Перевіряємо, чи існує директорія з браузерами
         if os.path.exists(playwright_browsers_path):
-            logger.info(f"✅ Директорія браузерів знайдена: {playwright_browsers_path}")
-            # Виводимо що є в директорії
-            try:
-                contents = os.listdir(playwright_browsers_path)
-                logger.info(f"📂 Вміст директорії: {contents}")
-            except Exception as e:
-                logger.warning(f"⚠️ Не вдалося прочитати директорію: {e}")
+            logger.debug("✅ Директорія браузерів знайдена: %s", playwright_browsers_path)
+            # Вміст директорії виводимо лише в DEBUG і один раз на контейнер
+            if not _diag_done and logger.isEnabledFor(logging.DEBUG):
+                _diag_done = True
+                try:
+                    logger.debug("📂 Вміст директорії: %s", os.listdir(playwright_browsers_path))
+                except Exception as e:
+                    logger.warning(f"⚠️ Не вдалося прочитати директорію: {e}")
         else:
             logger.error(f"❌ Директорія браузерів не знайдена: {playwright_browsers_path}")
         
         try:
-            # Запуск Playwright
+            # Запуск Playwright (лінивий імпорт драйвера)
+            from playwright.sync_api import sync_playwright
             self.playwright = sync_playwright().start()
             
             # Конфігурація браузера - адаптивна залежно від режиму
-            browser_args = []
-            
             if self.headed_mode:
-                # Режим для локального дебагу - мінімальні аргументи
-                logger.info("🖥️ Запуск у HEADED режимі для дебагу...")
-                browser_args = [
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-web-security',  # Для доступу до різних доменів під час тестування
-                ]
+                logger.debug("🖥️ Запуск у HEADED режимі для дебагу...")
             else:
-                # Headless режим для продакшна (AWS Lambda)
-                logger.info("👻 Запуск у HEADLESS режимі для продакшна...")
-                browser_args = [
-                    # Основні аргументи для AWS Lambda
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-web-security',
-                    '--disable-features=VizDisplayCompositor',
-                    '--disable-blink-features=AutomationControlled',
-                    
-                    # Оптимізація для serverless
-                    '--single-process',
-                    '--no-zygote',
-                    '--disable-setuid-sandbox',
-                    '--disable-background-timer-throttling',
-                    '--disable-renderer-backgrounding',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-ipc-flooding-protection',
-                    
-                    # Зменшення використання пам'яті
-                    '--memory-pressure-off',
-                    '--max_old_space_size=512',
-                    
-                    # Відключення непотрібних функцій
-                    '--disable-extensions',
-                    '--disable-default-apps',
-                    '--disable-sync',
-                    '--disable-translate',
-                    '--disable-background-networking',
-                    '--disable-background-mode',
-                    '--disable-client-side-phishing-detection',
-                    '--disable-component-update',
-                    '--disable-default-apps',
-                    '--disable-domain-reliability',
-                    '--disable-features=TranslateUI,BlinkGenPropertyTrees',
-                    '--disable-hang-monitor',
-                    '--disable-ipc-flooding-protection',
-                    '--disable-popup-blocking',
-                    '--disable-prompt-on-repost',
-                    '--disable-renderer-backgrounding',
-                    '--disable-sync',
-                    '--disable-web-resources',
-                    '--disable-web-security',
-                    '--metrics-recording-only',
-                    '--no-first-run',
-                    '--safebrowsing-disable-auto-update',
-                    '--use-mock-keychain',
-                    
-                    # Додаткові опції для AWS Lambda
-                    '--enable-logging',
-                    '--log-level=0',
-                    '--v=1',
-                    '--no-default-browser-check',
-                    '--disable-component-extensions-with-background-pages',
-                    '--disable-default-apps',
-                    '--disable-background-mode',
-                    '--disable-background-timer-throttling',
-                    '--disable-renderer-backgrounding',
-                    '--disable-backgrounding-occluded-windows',
-                    '--disable-features=TranslateUI',
-                    '--disable-features=BlinkGenPropertyTrees',
-                    '--run-all-compositor-stages-before-draw',
-                    '--disable-threaded-animation',
-                    '--disable-threaded-scrolling',
-                    '--disable-checker-imaging',
-                    '--disable-new-content-rendering-timeout',
-                    '--disable-background-media-suspend',
-                    '--disable-partial-raster',
-                    '--disable-canvas-aa',
-                    '--disable-2d-canvas-clip-aa',
-                    '--disable-gl-drawing-for-tests',
-                    '--disable-canvas-aa',
-                    '--disable-3d-apis',
-                    '--disable-accelerated-2d-canvas',
-                    '--disable-accelerated-jpeg-decoding',
-                    '--disable-accelerated-mjpeg-decode',
-                    '--disable-app-list-dismiss-on-blur',
-                    '--disable-accelerated-video-decode',
-                ]
-            
-            self.browser = self.playwright.chromium.launch(
-                headless=not self.headed_mode,
-                args=browser_args,
-                slow_mo=50 if self.headed_mode else 0,  # Повільніший режим для дебагу
-            )
+                logger.debug("👻 Запуск у HEADLESS режимі для продакшна...")
+            browser_args = list(HEADED_ARGS if self.headed_mode else HEADLESS_ARGS)
+            launch_kwargs = {'headless': not self.headed_mode, 'args': browser_args}
+            if not self.headed_mode and os.getenv('PLAYWRIGHT_LEGACY_HEADLESS', '').lower() in ['true', '1', 'yes']:
+                logger.warning("⚠️ PLAYWRIGHT_LEGACY_HEADLESS: використовуємо старий однопроцесний headless")
+                browser_args.remove('--headless=new')
+                browser_args.extend(LEGACY_HEADLESS_ARGS)
+            # Скрапер працює з одним доменом адмінки - CORS не вимикаємо, лише для аварійного відкату
+            if os.getenv('PLAYWRIGHT_DISABLE_WEB_SECURITY', '').lower() in ['true', '1', 'yes']:
+                logger.warning("⚠️ PLAYWRIGHT_DISABLE_WEB_SECURITY: запуск з --disable-web-security")
+                browser_args.append('--disable-web-security')
             
-            # Створення контексту з оптимізованими налаштуваннями
-            context_options = {
-                'viewport': {'width': 1280, 'height': 720},
-                'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'ignore_https_errors': True,
-                'java_script_enabled': True,
-            }
-            
-            # У headed режимі збільшуємо viewport для кращого дебагу
             if self.headed_mode:
-                context_options['viewport'] = {'width': 1920, 'height': 1080}
-                logger.info("🖥️ Використовується збільшений viewport для дебагу: 1920x1080")
-            
-            self.context = self.browser.new_context(**context_options)
-            
-            # Створення сторінки
-            self.page = self.context.new_page()
+                launch_kwargs['slow_mo'] = 50  # Повільніший режим лише для дебагу
             
-            # Встановлення тайм-аутів (більші для headed режиму)
-            timeout = 120000 if self.headed_mode else 60000  # 2 хвилини для дебагу, 1 хвилина для продакшна
-            self.page.set_default_timeout(timeout)
-            self.page.set_default_navigation_timeout(timeout)
-            
-            if self.headed_mode:
-                logger.info("⏰ Збільшені тайм-аути для headed режиму: 120 секунд")
+            self.browser = self.playwright.chromium.launch(**launch_kwargs)
             
             self._initialized = True
-            logger.info(f"✅ Playwright браузер успішно ініціалізовано в {'HEADED' if self.headed_mode else 'HEADLESS'} режимі")
-            
-            return self.page
+            self._log_init_summary(round((time.perf_counter() - started) * 1000), len(browser_args))
             
         except Exception as e:
             logger.error(f"❌ Помилка при ініціалізації браузера: {e}")
             self.cleanup()
             raise
     
-    def get_page(self) -> Page:
+    def _log_init_summary(self, duration_ms, args_count):
+        """
+        Один рядок INFO на запуск браузера замість покрокових повідомлень (вони в DEBUG).
+        
+        Args:
+            duration_ms: Тривалість запуску Playwright + Chromium у мс
+            args_count: Кількість аргументів Chromium
+        """
+        logger.info(
+            "✅ Браузер запущено: mode=%s dur_ms=%d args=%d",
+            'headed' if self.headed_mode else 'headless', duration_ms, args_count
+        )
+    
+    def new_page(self) -> "Page":
+        """
+        Створює свіжий контекст і сторінку у вже запущеному браузері.
+        Попередні контекст і сторінка закриваються, щоб не накопичувати пам'ять.
+        """
+        self._ensure_browser()
+        self.close_page()
+        
+        try:
+            self.context = self._new_context()
+            self.page = self._new_configured_page(self.context)
+            return self.page
+            
+        except Exception as e:
+            logger.error(f"❌ Помилка при створенні сторінки: {e}")
+            self.close_page()
+            raise
+    
+    def _new_context(self):
+        """
+        Створює контекст з оптимізованими налаштуваннями для поточного режиму.
+        """
+        if self.headed_mode:
+            logger.debug("🖥️ Використовується збільшений viewport для дебагу: 1920x1080")
+        context = self.browser.new_context(**(_HEADED_CTX if self.headed_mode else _HEADLESS_CTX))
+        if not self.headed_mode:
+            context.route("**/*", _block_heavy_resources)
+        return context
+    
+    def _new_configured_page(self, context) -> "Page":
+        """
+        Створює сторінку в контексті та встановлює тайм-аути.
+        """
+        page = context.new_page()
+        
+        # Встановлення тайм-аутів (більші для headed режиму)
+        timeout = 120000 if self.headed_mode else 60000  # 2 хвилини для дебагу, 1 хвилина для продакшна
+        page.set_default_timeout(timeout)
+        page.set_default_navigation_timeout(timeout)
+        
+        if self.headed_mode:
+            logger.debug("⏰ Збільшені тайм-аути для headed режиму: 120 секунд")
+        
+        return page
+    
+    @contextlib.contextmanager
+    def page_session(self):
+        """
+        Тимчасова сторінка у спільному браузері.
+        Після блоку закриваються лише сторінка та контекст - Chromium лишається запущеним
+        
+        Приклад:
+            for amount in amounts:
+                with browser_manager.page_session() as page:
+                    ...
+        """
+        self._ensure_browser()
+        context = self._new_context()
+        try:
+            yield self._new_configured_page(context)
+        finally:
+            try:
+                context.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Помилка при закритті контексту: {e}")
+    
+    def close_page(self):
+        """
+        Закриває сторінку та контекст, залишаючи браузер запущеним.
+        """
+        try:
+            if self.page:
+                self.page.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Помилка при закритті сторінки: {e}")
+        finally:
+            self.page = None
+        
+        try:
+            if self.context:
+                self.context.close()
+        except Exception as e:
+            logger.warning(f"⚠️ Помилка при закритті контексту: {e}")
+        finally:
+            self.context = None
+    
+    def get_page(self) -> "Page":
         """
         Повертає активну сторінку, ініціалізуючи браузер при необхідності.
         """
@@ -236,15 +387,9 @@ class BrowserManager:
         """
         logger.info("🧹 Очищення ресурсів браузера...")
         
+        self.close_page()
+        
         try:
-            if self.page:
-                self.page.close()
-                self.page = None
-                
-            if self.context:
-                self.context.close()
-                self.context = None
-                
             if self.browser:
                 self.browser.close()
                 self.browser = None
@@ -269,6 +414,7 @@ class BrowserManager:
 
 # Глобальний екземпляр для переuse в Lambda
 _global_browser_manager = None
+_global_browser_lock = threading.Lock()
 
 def create_browser_manager(headed_mode=None) -> BrowserManager:
     """
@@ -281,10 +427,24 @@ def create_browser_manager(headed_mode=None) -> BrowserManager:
     """
     global _global_browser_manager
     
-    if _global_browser_manager is None:
-        _global_browser_manager = BrowserManager(headed_mode=headed_mode)
+    # Швидкий шлях без блокування - менеджер вже створено
+    browser_manager = _global_browser_manager
+    if browser_manager is not None:
+        return browser_manager
     
-    return _global_browser_manager
+    # Подвійна перевірка під lock, щоб паралельні потоки не запустили два браузери
+    with _global_browser_lock:
+        if _global_browser_manager is None:
+            _global_browser_manager = BrowserManager(headed_mode=headed_mode)
+        return _global_browser_manager
+
+def cleanup_invocation():
+    """
+    Закриває сторінку та контекст після виклику Lambda.
+    Браузер лишається запущеним для наступного теплого виклику.
+    """
+    if _global_browser_manager:
+        _global_browser_manager.close_page()
 
 def cleanup_global_browser():
     """
@@ -295,3 +455,21 @@ def cleanup_global_browser():
     if _global_browser_manager:
         _global_browser_manager.cleanup()
         _global_browser_manager = None
+
+def _handle_sigterm(signum, frame):
+    """
+    Завершує процес при SIGTERM від Lambda runtime.
+
+    Обробник може перервати синхронний виклик Playwright посеред роботи, тому
+    браузер тут не закриваємо: SystemExit розкручує стек через finally-блоки,
+    а Chromium закриває cleanup_global_browser з atexit.
+    """
+    raise SystemExit(0)
+
+# Повне закриття браузера лише при завершенні процесу
+atexit.register(cleanup_global_browser)
+
+# SIGTERM перехоплюємо тільки в Lambda - локально Ctrl-C/kill працюють як звичайно.
+# Обробник сигналу можна встановити лише з головного потоку
+if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') and threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGTERM, _handle_sigterm)
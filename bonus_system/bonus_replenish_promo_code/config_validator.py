@@ -6,60 +6,76 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Обов'язкові змінні: (назва, опис)
+_REQUIRED = (
+    ('ADMIN_URL', 'URL адмін-панелі'),
+    ('ADMIN_USERNAME', 'Логін адміністратора'),
+    ('ADMIN_PASSWORD', 'Пароль адміністратора'),
+)
+
+# Опціональні змінні: (назва, значення за замовчуванням, тип)
+_OPTIONAL = (
+    ('TARGET_CODES_PER_AMOUNT', '10', int),
+    ('LOG_LEVEL', 'INFO', str),
+    ('PLAYWRIGHT_BROWSERS_PATH', '/opt/playwright-browsers', str),
+    ('SESSION_S3_BUCKET', 'lambda-promo-sessions', str),
+    ('PROMO_CODES_S3_KEY', 'promo-codes/available_codes.json', str),
+    ('USED_CODES_S3_KEY', 'promo-codes/used_codes_count.json', str),
+)
+
+# Результат успішної валідації - змінні середовища не змінюються між теплими викликами
+_cached_config = None
+
+def _typed_value(var_name, value, default_value, var_type, warnings, log_info=True):
+    """
+    Приводить значення змінної до її типу, при помилці повертає значення за замовчуванням
+    """
+    try:
+        if var_type is int:
+            typed_value = int(value)
+            if typed_value <= 0:
+                warnings.append(f"⚠️ {var_name}={value} має бути додатнім числом, використовуємо {default_value}")
+                typed_value = int(default_value)
+        else:
+            typed_value = var_type(value)
+        
+        # f-рядки форматуємо лише якщо INFO взагалі виводиться
+        if log_info:
+            if value == default_value:
+                logger.info(f"ℹ️ {var_name}: використовуємо за замовчуванням ({default_value})")
+            else:
+                logger.info(f"✅ {var_name}: {value}")
+        return typed_value
+            
+    except (ValueError, TypeError):
+        warnings.append(f"⚠️ Некоректне значення {var_name}={value}, використовуємо {default_value}")
+        return var_type(default_value)
+
 def validate_environment():
     """
     Валідує всі необхідні змінні середовища
     """
-    required_vars = {
-        'ADMIN_URL': 'URL адмін-панелі',
-        'ADMIN_USERNAME': 'Логін адміністратора',
-        'ADMIN_PASSWORD': 'Пароль адміністратора'
-    }
-    
-    optional_vars = {
-        'TARGET_CODES_PER_AMOUNT': ('10', int),
-        'LOG_LEVEL': ('INFO', str),
-        'PLAYWRIGHT_BROWSERS_PATH': ('/opt/playwright-browsers', str),
-        'SESSION_S3_BUCKET': ('lambda-promo-sessions', str),
-        'PROMO_CODES_S3_KEY': ('promo-codes/available_codes.json', str),
-        'USED_CODES_S3_KEY': ('promo-codes/used_codes_count.json', str)
-    }
+    # Один знімок os.environ для всіх перевірок
+    get = os.environ.get
+    log_info = logger.isEnabledFor(logging.INFO)
     
-    errors = []
     warnings = []
     
     # Перевіряємо обов'язкові змінні
-    for var_name, description in required_vars.items():
-        value = os.getenv(var_name)
-        if not value:
-            errors.append(f"❌ Відсутня обов'язкова змінна {var_name} ({description})")
-        else:
-            logger.info(f"✅ {var_name}: встановлено")
+    errors = [
+        f"❌ Відсутня обов'язкова змінна {var_name} ({description})"
+        for var_name, description in _REQUIRED if not get(var_name)
+    ]
+    if log_info:
+        for var_name, _ in _REQUIRED:
+            if get(var_name):
+                logger.info(f"✅ {var_name}: встановлено")
     
     # Перевіряємо опціональні змінні та встановлюємо за замовчуванням
-    config = {}
-    for var_name, (default_value, var_type) in optional_vars.items():
-        value = os.getenv(var_name, default_value)
-        
-        # Перевіряємо тип та валідність
-        try:
-            if var_type == int:
-                typed_value = int(value)
-                if typed_value <= 0:
-                    warnings.append(f"⚠️ {var_name}={value} має бути додатнім числом, використовуємо {default_value}")
-                    typed_value = int(default_value)
-            else:
-                typed_value = var_type(value)
-            
-            config[var_name] = typed_value
-            if value == default_value:
-                logger.info(f"ℹ️ {var_name}: використовуємо за замовчуванням ({default_value})")
-            else:
-                logger.info(f"✅ {var_name}: {value}")
-                
-        except (ValueError, TypeError) as e:
-            warnings.append(f"⚠️ Некоректне значення {var_name}={value}, використовуємо {default_value}")
-            config[var_name] = var_type(default_value)
+    config = {
+        var_name: _typed_value(var_name, get(var_name, default_value), default_value, var_type, warnings, log_info)
+        for var_name, default_value, var_type in _OPTIONAL
+    }
     
     # Виводимо результат валідації
     if errors:
@@ -76,6 +92,11 @@ def validate_environment():
 
 def get_validated_config():
     """
-    Повертає валідовану конфігурацію
+    Повертає валідовану конфігурацію.
+    Валідація виконується один раз на контейнер, теплі виклики отримують кеш
     """
-    return validate_environment()
+    global _cached_config
+    
+    if _cached_config is None:
+        _cached_config = validate_environment()
+    return _cached_config
@@ -5,9 +5,9 @@ import sys
 import time
 from functools import wraps
 from promo_logic import PromoService
-from browser_manager import create_browser_manager
+from browser_manager import create_browser_manager, cleanup_invocation
 from decorators import timeout_handler, retry_on_failure
-from config_validator import validate_environment
+from config_validator import get_validated_config
 
 # --- Налаштування логера ---
 def setup_logger():
@@ -60,9 +60,9 @@ def lambda_handler(event, context):
     logger = setup_logger()
     
     try:
-        # Валідація конфігурації середовища
+        # Валідація конфігурації середовища (кешується між теплими викликами)
         try:
-            validate_environment()
+            get_validated_config()
         except ValueError as config_error:
             logger.error(f"❌ [Replenish] Помилка конфігурації: {config_error}")
             return create_response('error', f'Configuration error: {config_error}')
@@ -131,5 +131,6 @@ def lambda_handler(event, context):
         return {'status': 'error', 'message': str(e)}
     finally:
         if browser_manager:
-            browser_manager.cleanup()
-            logger.info("🚪 [Replenish] Браузер закрито.")
\ No newline at end of file
+            # Закриваємо лише сторінку - браузер перевикористовується в теплих викликах
+            cleanup_invocation()
+            logger.info("🚪 [Replenish] Сторінку закрито.")
\ No newline at end of file
@@ -0,0 +1,88 @@
+"""
+Читання та запис файлу промокодів в S3 (promo-codes/available_codes.json)
+
+Формат файлу спільний для генератора промокодів і Lambda-функцій отримання
+та поповнення кодів, тому читати й писати його слід лише через цей модуль:
+
+- вміст - компактний JSON {"сума": [коди, ...]} без пробілів;
+- об'єкт стиснений gzip (рівень 1 - швидкий, а коди добре стискаються)
+  і зберігається з ContentType: application/json та ContentEncoding: gzip;
+- читання приймає і старий нестиснений JSON (файли, записані до переходу
+  на gzip): формат визначається за ContentEncoding або gzip-сигнатурою.
+"""
+import gzip
+import json
+
+# Параметри об'єкта в S3 (для put_object та ExtraArgs у upload_fileobj)
+PROMO_CODES_OBJECT_ARGS = {
+    'ContentType': 'application/json',
+    'ContentEncoding': 'gzip',
+}
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+def encode_promo_codes(data, dumps=None):
+    """
+    Серіалізує промокоди у формат файлу S3 (компактний JSON у gzip)
+
+    Args:
+        data: словник {сума: [коди]}
+        dumps: власний серіалізатор у bytes (наприклад, orjson.dumps)
+
+    Returns:
+        bytes: тіло об'єкта для S3
+    """
+    raw = dumps(data) if dumps else json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return gzip.compress(raw, compresslevel=1)
+
+
+def decode_promo_codes(response, loads=None):
+    """
+    Розбирає відповідь get_object з файлом промокодів
+
+    Args:
+        response: відповідь s3_client.get_object
+        loads: власний парсер bytes (наприклад, orjson.loads)
+
+    Returns:
+        dict: словник {сума: [коди]}
+    """
+    body = response['Body']
+    if loads is None and response.get('ContentEncoding') == 'gzip':
+        # Розпаковуємо і парсимо потоком, без проміжних копій bytes/str усього файлу
+        return json.load(gzip.GzipFile(fileobj=body))
+
+    raw = body.read()
+    if raw[:2] == _GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    return loads(raw) if loads else json.loads(raw)
+
+
+def read_promo_codes(s3_client, bucket, key, loads=None):
+    """
+    Завантажує файл промокодів з S3. Помилки S3 (зокрема NoSuchKey) не перехоплюються
+
+    Args:
+        s3_client: boto3 S3 клієнт
+        bucket: бакет
+        key: ключ файлу промокодів
+        loads: власний парсер bytes
+
+    Returns:
+        dict: словник {сума: [коди]}
+    """
+    return decode_promo_codes(s3_client.get_object(Bucket=bucket, Key=key), loads)
+
+
+def write_promo_codes(s3_client, bucket, key, data):
+    """
+    Зберігає файл промокодів в S3 у спільному форматі
+
+    Args:
+        s3_client: boto3 S3 клієнт
+        bucket: бакет
+        key: ключ файлу промокодів
+        data: словник {сума: [коди]}
+    """
+    s3_client.put_object(Bucket=bucket, Key=key, Body=encode_promo_codes(data), **PROMO_CODES_OBJECT_ARGS)
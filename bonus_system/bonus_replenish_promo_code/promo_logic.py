@@ -20,24 +20,71 @@ import random
 import string
 import time
 import json
+import functools
 from datetime import datetime, timedelta
-from playwright.sync_api import Page
+from typing import TYPE_CHECKING
 import boto3
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError, NoCredentialsError
 
+# Page потрібен лише для анотацій - сам playwright імпортує browser_manager при запуску
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
 try:
     from .bon_utils import is_bon_promo_code, extract_amount_from_bon_code
+    from .promo_codes_store import read_promo_codes, write_promo_codes
 except ImportError:
     # Fallback для запуску без пакета
     from bon_utils import is_bon_promo_code, extract_amount_from_bon_code
+    from promo_codes_store import read_promo_codes, write_promo_codes
 
-# Перевірка доступності S3
+# Перевірка доступності S3. Створений клієнт зберігаємо: у "теплих" викликах Lambda
+# модуль не перезавантажується, тож клієнт перевикористовується без повторної ініціалізації
+# TCP keepalive тримає з'єднання з S3 живим між викликами контейнера
+_S3_CONFIG = BotoConfig(tcp_keepalive=True, retries={'max_attempts': 3, 'mode': 'standard'})
 try:
-    boto3.client('s3')  # Просто перевірка, чи можна створити клієнт
+    _S3_CLIENT = boto3.client('s3', config=_S3_CONFIG)
     S3_AVAILABLE = True
 except (NoCredentialsError, ClientError):
+    _S3_CLIENT = None
     S3_AVAILABLE = False
 
+# Алфавіт випадкової частини коду та готові генератори для кожної можливої
+# довжини (3-6 символів, залежить від кількості цифр у сумі) з фіксованим k
+_CODE_ALPHABET = string.ascii_uppercase + string.digits
+_RANDOM_PART_BY_LENGTH = {
+    length: functools.partial(random.choices, _CODE_ALPHABET, k=length)
+    for length in range(3, 7)
+}
+
+# JS: відмічає чекбокси рядків із заданими кодами (код - 4-та комірка рядка).
+# Повертає { selected: [коди, відмічені зараз], notFound: [коди без рядка] }
+_SELECT_ROWS_BY_CODE_JS = """(codes) => {
+    const rowByCode = new Map();
+    document.querySelectorAll('tr').forEach(row => {
+        const cell = row.querySelectorAll(':scope > td')[3];
+        if (cell) {
+            rowByCode.set(cell.textContent.trim(), row);
+        }
+    });
+    const result = { selected: [], notFound: [] };
+    codes.forEach(code => {
+        const row = rowByCode.get(code);
+        if (!row) {
+            result.notFound.push(code);
+            return;
+        }
+        const checkbox = row.querySelector('input[type="checkbox"]');
+        if (checkbox && !checkbox.checked) {
+            checkbox.click();
+            result.selected.push(code);
+        }
+    });
+    return result;
+}"""
+
+
 
 class PromoService:
     """
@@ -53,12 +100,14 @@ class PromoService:
     Для складних операцій використовуйте PromoSmartManager з promo_smart.py
     """
     
-    def __init__(self, page: Page = None):
+    def __init__(self, page: "Page" = None):
         self.page = page
         self.admin_url = os.getenv('ADMIN_URL', 'https://safeyourlove.com/edit/discounts/codes')  # Одразу на сторінку знижок
         self.admin_username = os.getenv('ADMIN_USERNAME')
         self.admin_password = os.getenv('ADMIN_PASSWORD')
         self._cached_iframe = None  # Кешування iframe
+        self._cached_frame = None  # Кешування Frame всередині iframe (без RPC на кожен виклик)
+        self._frame_listener_page = None  # Сторінка, на якій підписано скидання кешу при навігації
         self._session_cookies = None  # Кешування сесії в пам'яті
         self._session_timestamp = None
         self._session_timeout = 3600  # 1 година у секундах
@@ -74,7 +123,7 @@ class PromoService:
         self.s3_client = None
         if self.use_s3:
             try:
-                self.s3_client = boto3.client('s3')
+                self.s3_client = _S3_CLIENT or boto3.client('s3', config=_S3_CONFIG)
                 print(f"🔧 AWS Lambda: Використовуємо S3 для збереження сесії (bucket: {self.s3_bucket})")
             except Exception as e:
                 print(f"⚠️ Не вдалося ініціалізувати S3 клієнт: {e}")
@@ -92,8 +141,7 @@ class PromoService:
         """Генерує один рядок промокоду для заданої суми."""
         amount_str = str(amount)
         prefix = f'BON{amount_str}'
-        random_part_length = max(3, 7 - len(amount_str))
-        random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=random_part_length))
+        random_part = ''.join(_RANDOM_PART_BY_LENGTH[max(3, 7 - len(amount_str))]())
         return prefix + random_part
     
     def apply_amount_filter(self, amount):
@@ -252,27 +300,16 @@ class PromoService:
                 print(f"🗑️ Видаляємо {len(inactive_codes_to_delete)} неактивних кодів: {inactive_codes_to_delete}")
                 
                 try:
-                    # 1. Вибираємо неактивні коди через чекбокси (як в промо генераторі)
-                    selected_count = 0
-                    for code in inactive_codes_to_delete:
-                        try:
-                            # Шукаємо рядок з промокодом використовуючи XPath як в промо генераторі
-                            row_locator = frame.locator(f'//tr[td[4][normalize-space(.)="{code}"]]')
-                            
-                            if row_locator.count() == 0:
-                                print(f"⚠️ Не знайдено рядок для коду: {code}")
-                                continue
-
-                            # Шукаємо чекбокс в рядку
-                            checkbox = row_locator.locator('input[type="checkbox"]').first
-                            if checkbox.count() > 0:
-                                if not checkbox.is_checked():
-                                    checkbox.click()
-                                    selected_count += 1
-                                    print(f"  ✅ Відмічено неактивний код: {code}")
-                                    
-                        except Exception as e:
-                            print(f"⚠️ Помилка при відмітці коду {code}: {e}")
+                    # 1. Вибираємо неактивні коди через чекбокси (як в промо генераторі).
+                    # Один прохід по таблиці будує індекс код -> рядок (Map) замість
+                    # XPath-запиту з normalize-space на кожен код; чекбокси відмічаються
+                    # в тому ж запиті
+                    selection = frame.evaluate(_SELECT_ROWS_BY_CODE_JS, inactive_codes_to_delete)
+                    for code in selection['notFound']:
+                        print(f"⚠️ Не знайдено рядок для коду: {code}")
+                    for code in selection['selected']:
+                        print(f"  ✅ Відмічено неактивний код: {code}")
+                    selected_count = len(selection['selected'])
                     
                     print(f"☑️ Відмічено {selected_count} неактивних кодів для видалення")
                     
@@ -283,7 +320,11 @@ class PromoService:
                         def handle_dialog(dialog):
                             nonlocal dialog_handled
                             print(f"💬 Отримано діалог підтвердження: {dialog.message}")
-                            dialog.accept()
+                            try:
+                                dialog.accept()
+                            except Exception as e:
+                                # Діалог уже підтвердив постійний обробник сторінки (promo_smart)
+                                print(f"ℹ️ Діалог уже оброблено: {e}")
                             dialog_handled = True
                             print("✅ Діалог підтверджено")
                         
@@ -325,10 +366,26 @@ class PromoService:
                                 print("❌ Не вдалося знайти способ видалення")
                                 return active_codes, []
                         
-                        # Очікуємо появи діалогу підтвердження
+                        # Очікуємо появи діалогу підтвердження. Стандартний confirm() блокує
+                        # evaluate до підтвердження, тож тоді обробник вже спрацював; інакше
+                        # чекаємо саме появи модального вікна замість фіксованої паузи
                         print("⏳ Очікуємо появи діалогу підтвердження...")
-                        import time
-                        time.sleep(1.5)
+                        confirm_selectors = [
+                            '.confirm-modal__button--ok',
+                            'button:has-text("Підтвердити")',
+                            'button:has-text("Так")',
+                            'button:has-text("OK")',
+                            '#dialog-window .confirm-modal__button--ok',
+                            '.modal-footer button.btn-primary',
+                            '.ui-dialog-buttonset button:first-child',
+                            'button[onclick*="confirm"]',
+                            '.dialog-confirm-button'
+                        ]
+                        if not dialog_handled:
+                            try:
+                                frame.locator(', '.join(confirm_selectors)).first.wait_for(state='visible', timeout=1500)
+                            except Exception:
+                                pass  # Модальне вікно не з'явилося - нижче спрацюють резервні способи
                         
                         # Перевіряємо, чи був оброблений стандартний діалог
                         if dialog_handled:
@@ -337,18 +394,6 @@ class PromoService:
                             # Шукаємо модальне вікно підтвердження
                             print("🔍 Стандартний діалог не з'явився, шукаємо модальне вікно...")
                             
-                            confirm_selectors = [
-                                '.confirm-modal__button--ok',
-                                'button:has-text("Підтвердити")',
-                                'button:has-text("Так")',
-                                'button:has-text("OK")',
-                                '#dialog-window .confirm-modal__button--ok',
-                                '.modal-footer button.btn-primary',
-                                '.ui-dialog-buttonset button:first-child',
-                                'button[onclick*="confirm"]',
-                                '.dialog-confirm-button'
-                            ]
-                            
                             button_found = False
                             for selector in confirm_selectors:
                                 confirm_buttons = frame.locator(selector)
@@ -357,7 +402,6 @@ class PromoService:
                                     confirm_buttons.first.click()
                                     print("🎯 Кнопку підтвердження натиснуто!")
                                     button_found = True
-                                    time.sleep(0.5)
                                     break
                             
                             if not button_found:
@@ -400,9 +444,14 @@ class PromoService:
                                 except Exception as js_error:
                                     print(f"⚠️ JavaScript підтвердження не вдалося: {js_error}")
                         
-                        # Очікуємо завершення операції
+                        # Очікуємо завершення операції: появи лоадера таблиці, потім його зникнення
                         print("⏳ Очікуємо завершення операції видалення...")
-                        time.sleep(3.0)
+                        loader = frame.locator('#datagrid-loader')
+                        try:
+                            loader.wait_for(state='visible', timeout=1000)
+                            loader.wait_for(state='hidden', timeout=10000)
+                        except Exception:
+                            pass  # Якщо лоадер не з'явився, продовжуємо
                         
                         print(f"✅ {len(inactive_codes_to_delete)} неактивних кодів видалено з адмін-панелі")
                     else:
@@ -432,8 +481,7 @@ class PromoService:
         try:
             # Завантажуємо існуючі промокоди з S3
             try:
-                response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.promo_codes_key)
-                existing_codes = json.loads(response['Body'].read().decode('utf-8'))
+                existing_codes = read_promo_codes(self.s3_client, self.s3_bucket, self.promo_codes_key)
                 print(f"📦 Завантажено існуючі промокоди: {[(k, len(v)) for k, v in existing_codes.items()]}")
             except ClientError as e:
                 if e.response['Error']['Code'] == 'NoSuchKey':
@@ -449,13 +497,8 @@ class PromoService:
                 existing_codes[amount_str] = codes_list
                 print(f"🔄 Оновлено суму {amount_str}: було {old_count} кодів, стало {len(codes_list)}")
             
-            # Зберігаємо оновлений файл
-            self.s3_client.put_object(
-                Bucket=self.s3_bucket,
-                Key=self.promo_codes_key,
-                Body=json.dumps(existing_codes, indent=2),
-                ContentType='application/json'
-            )
+            # Зберігаємо оновлений файл у спільному форматі (див. promo_codes_store)
+            write_promo_codes(self.s3_client, self.s3_bucket, self.promo_codes_key, existing_codes)
             
             print(f"💾 Промокоди оновлено в S3 для сум: {list(updated_codes.keys())}")
             print(f"📊 Загальний стан S3: {[(k, len(v)) for k, v in existing_codes.items()]}")
@@ -515,7 +558,8 @@ class PromoService:
             codes_to_create = target_codes_per_amount - len(active_codes)
             print(f"⚙️ [Smart] Для суми {amount} створюємо {codes_to_create} нових кодів (до цільової {target_codes_per_amount})")
             
-            new_codes = active_codes.copy()
+            # Збираємо лише створені коди; підсумковий список будується один раз після циклу
+            created_codes = []
             
             for i in range(codes_to_create):
                 try:
@@ -525,7 +569,7 @@ class PromoService:
                     
                     # Створення коду в адмін-панелі
                     if self.create_promo_code(new_promo_code, amount):
-                        new_codes.append(new_promo_code)
+                        created_codes.append(new_promo_code)
                         total_created += 1
                         print(f"✅ [Smart] Промокод {new_promo_code} створено")
                         time.sleep(1)  # Затримка між створеннями
@@ -535,6 +579,7 @@ class PromoService:
                 except Exception as e:
                     print(f"❌ [Smart] Помилка при створенні коду {i+1}/{codes_to_create}: {e}")
             
+            new_codes = [*active_codes, *created_codes]
             updated_codes[amount_key] = new_codes
             print(f"📊 [Smart] Для суми {amount}: було {len(active_codes)} активних, створено {codes_to_create}, тепер маємо {len(new_codes)}")
         
@@ -714,7 +759,7 @@ class PromoService:
             print(f"☁️ Завантаження сесії з S3: {self.s3_bucket}/{self.s3_key}")
             
             response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=self.s3_key)
-            session_data = json.loads(response['Body'].read().decode('utf-8'))
+            session_data = json.load(response['Body'])
             
             self._session_cookies = session_data.get('cookies', [])
             self._session_timestamp = session_data.get('timestamp', 0)
@@ -935,14 +980,24 @@ class PromoService:
             print(f"⚠️ Не вдалося відновити сесію: {e}")
             return False
         
+    def _on_frame_navigated(self, frame):
+        """Скидає кеш Frame, якщо iframe адмінки перейшов на іншу сторінку"""
+        if frame is self._cached_frame:
+            self._cached_frame = None
+
     def _get_iframe(self, timeout=8000):
         """Отримує iframe з кешуванням та очікуванням завантаження таблиці"""
         try:
+            # Швидкий шлях: закешований Frame перевіряється локально, без звернення до браузера
+            if self._cached_frame is not None and not self._cached_frame.is_detached():
+                return self._cached_frame
+
             if self._cached_iframe:
                 try:
                     # Перевіряємо, чи iframe ще активний і не від'єднаний від DOM
                     frame = self._cached_iframe.content_frame()
                     if frame and not frame.is_detached():
+                        self._cached_frame = frame
                         return frame
                 except Exception:
                     # Якщо є помилка, скидаємо кеш
@@ -975,11 +1030,19 @@ class PromoService:
                 
                 print("✅ Таблиця промокодів завантажена")
 
+                # Запам'ятовуємо Frame; після навігації iframe кеш скидається,
+                # щоб наступний виклик знову дочекався таблиці
+                self._cached_frame = frame
+                if self._frame_listener_page is not self.page:
+                    self.page.on('framenavigated', self._on_frame_navigated)
+                    self._frame_listener_page = self.page
+
             return frame
 
         except Exception as e:
             print(f"❌ Не вдалося отримати або дочекатися iframe: {e}")
             self._cached_iframe = None  # Скидаємо кеш при помилці
+            self._cached_frame = None
             return None
     
     def login(self):
@@ -1157,7 +1220,7 @@ class PromoService:
             
         try:
             response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=used_codes_key)
-            used_data = json.loads(response['Body'].read().decode('utf-8'))
+            used_data = json.load(response['Body'])
             
             print(f"📊 Знайдено лічільники: {used_data}")
             return used_data
@@ -1189,7 +1252,7 @@ class PromoService:
             # Завантажуємо поточні дані
             try:
                 response = self.s3_client.get_object(Bucket=self.s3_bucket, Key=used_codes_key)
-                used_data = json.loads(response['Body'].read().decode('utf-8'))
+                used_data = json.load(response['Body'])
             except ClientError as e:
                 if e.response['Error']['Code'] == 'NoSuchKey':
                     print("ℹ️ Файл з лічільниками не існує - нічого очищати.")
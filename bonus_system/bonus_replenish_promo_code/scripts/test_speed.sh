@@ -29,15 +29,30 @@ cat > test_data.json << EOF
 }
 EOF
 
-# 2. Завантажуємо файл в S3
-echo "☁️ Завантажуємо дані в S3: s3://$S3_BUCKET/$S3_KEY"
-aws s3 cp test_data.json s3://$S3_BUCKET/$S3_KEY
+# 2. Завантажуємо файл в S3 (пропускаємо PUT, якщо в S3 вже такі самі дані)
+# ETag невеликого об'єкта, завантаженого одним запитом, - це MD5 його вмісту
+# md5sum є в Linux, на macOS - md5 -q
+if command -v md5sum > /dev/null 2>&1; then
+    LOCAL_MD5=$(md5sum test_data.json | cut -d' ' -f1)
+else
+    LOCAL_MD5=$(md5 -q test_data.json 2>/dev/null)
+fi
+REMOTE_ETAG=$(aws s3api head-object --bucket "$S3_BUCKET" --key "$S3_KEY" \
+    --query ETag --output text 2>/dev/null | tr -d '"')
 
-if [ $? -eq 0 ]; then
-    echo "✅ Дані успішно завантажено в S3"
+# Пропускаємо лише коли обидва значення відомі: порожні означають відсутній файл або утиліту
+if [ -n "$LOCAL_MD5" ] && [ "$LOCAL_MD5" = "$REMOTE_ETAG" ]; then
+    echo "♻️ Дані в s3://$S3_BUCKET/$S3_KEY не змінились, завантаження пропущено"
 else
-    echo "❌ Помилка завантаження в S3"
-    exit 1
+    echo "☁️ Завантажуємо дані в S3: s3://$S3_BUCKET/$S3_KEY"
+    aws s3 cp test_data.json s3://$S3_BUCKET/$S3_KEY
+
+    if [ $? -eq 0 ]; then
+        echo "✅ Дані успішно завантажено в S3"
+    else
+        echo "❌ Помилка завантаження в S3"
+        exit 1
+    fi
 fi
 
 echo ""
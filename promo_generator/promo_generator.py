@@ -32,24 +32,46 @@
 - Спрощено архітектуру
 """
 
-from typing import Any, Dict, List, Optional, Set
-import boto3
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+import io
 import json
 import random
 import string
 import logging
+import logging.handlers
 import time
 import os
 import sys
 import re
+import signal
 import datetime
+import functools
+import weakref
+import queue
 import multiprocessing
-from multiprocessing import Process, Queue
+from collections import ChainMap, Counter, defaultdict
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from dotenv import load_dotenv
 
-# Додаємо шлях до replenish_promo_code_lambda для імпорту
+# orjson (опціонально) - швидша серіалізація JSON для S3; без нього використовується json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Додаємо корінь проєкту та replenish_promo_code_lambda для імпорту.
+# Робочі процеси отримують ці шляхи та імпорти від батьківського модуля
+# (fork - успадковують, spawn - виконують цей блок при імпорті)
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, os.path.join(parent_dir, 'replenish_promo_code_lambda'))
+for _path in (parent_dir, os.path.join(parent_dir, 'replenish_promo_code_lambda')):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Спільний формат файлу промокодів в S3 (gzip JSON) - той самий, що й у Lambda-функціях
+from bonus_system.bonus_replenish_promo_code.promo_codes_store import (
+    PROMO_CODES_OBJECT_ARGS, encode_promo_codes, read_promo_codes
+)
 
 # Імпорти для браузера та логіну (з обробкою помилок)
 try:
@@ -82,10 +104,12 @@ CONFIG = {
     'sync_s3': True,     # Синхронізація з S3
     'auto_delete_excess': False,  # Автоматичне видалення зайвих промокодів
     'delete_existing_before_add': False,  # Видалення всіх існуючих промокодів перед додаванням нових
-    'verbose_logging': True,     # Детальне логування
+    'verbose_logging': True,     # Детальне логування (підсумки по сумах)
+    'verbose_per_page_logging': False,  # Розподіл кодів по сумах для КОЖНОЇ сторінки пагінації
     'quick_mode': True,  # Швидкий режим - мінімум логів для оптимальних випадків
     'parallel_processes': 3,    # Кількість паралельних процесів
     'process_timeout': 600,  # Таймаут для процесу в секундах (10 хвилин)
+    'browser_init_concurrency': 3,  # Скільки процесів можуть одночасно запускати браузер
 }
 
 # Налаштування кількості процесів через змінні середовища
@@ -103,6 +127,9 @@ def get_processes_count():
 # Оновлюємо конфігурацію
 CONFIG['parallel_processes'] = get_processes_count()
 
+# Режим браузера (HEADED/HEADLESS) визначається один раз при імпорті модуля
+_HEADED_MODE = os.getenv('PLAYWRIGHT_HEADED', 'true').lower() in ('true', '1', 'yes')
+
 # --- Функції для паралельної роботи ---
 
 def split_range_for_processes(start_amount, end_amount, num_processes):
@@ -148,7 +175,13 @@ def split_range_for_processes(start_amount, end_amount, num_processes):
     logger.info(f"✅ Розділення завершено. Створено {len(ranges)} діапазонів")
     return ranges
 
-def worker_process(process_id, start_amount, end_amount, result_queue, config_override=None):
+# Черга логів воркерів (встановлюється ініціалізатором пулу) та файл, куди їх пише батьківський процес
+_WORKER_LOG_QUEUE = None
+_WORKER_LOG_FILE = None
+# Семафор, що обмежує кількість одночасних запусків браузера між воркерами
+_BROWSER_INIT_SEMAPHORE = None
+
+def worker_process(process_id, start_amount, end_amount, config_override=None):
     """
     Робочий процес для обробки діапазону сум.
     
@@ -156,36 +189,44 @@ def worker_process(process_id, start_amount, end_amount, result_queue, config_ov
         process_id: ідентифікатор процесу
         start_amount: початкова сума для обробки
         end_amount: кінцева сума для обробки
-        result_queue: черга для передачі результатів
         config_override: перевизначення конфігурації
+        
+    Returns:
+        dict: результат обробки діапазону
     """
     try:
         # Налаштовуємо логування для процесу
         process_logger = logging.getLogger(f'worker_{process_id}')
         process_logger.setLevel(logging.INFO)
         
-        # Створюємо файл логу для процесу
-        log_timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        log_filename = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), 
-            'logs', 
-            f'worker_{process_id}_{log_timestamp}.log'
-        )
-        
-        file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        process_logger.addHandler(file_handler)
+        if _WORKER_LOG_QUEUE is not None:
+            # Запис у лог - лише постановка в чергу; у файл пише QueueListener батьківського процесу
+            log_filename = _WORKER_LOG_FILE
+            if not any(isinstance(h, logging.handlers.QueueHandler) for h in process_logger.handlers):
+                process_logger.addHandler(logging.handlers.QueueHandler(_WORKER_LOG_QUEUE))
+        else:
+            # Запуск поза пулом процесів - власний файл логу
+            log_timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            log_filename = os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), 
+                'logs', 
+                f'worker_{process_id}_{log_timestamp}.log'
+            )
+            
+            file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            process_logger.addHandler(file_handler)
         process_logger.propagate = False
         
         process_logger.info(f"🚀 Процес {process_id} запущено для діапазону {start_amount}-{end_amount}")
         
-        # Застосовуємо перевизначення конфігурації
-        local_config = CONFIG.copy()
-        if config_override:
-            local_config.update(config_override)
-        
-        local_config['start_amount'] = start_amount
-        local_config['end_amount'] = end_amount
+        # Конфігурація процесу - read-only вид поверх CONFIG без копіювання словника:
+        # діапазон процесу та перевизначення мають пріоритет над глобальними значеннями
+        local_config = MappingProxyType(ChainMap(
+            {'start_amount': start_amount, 'end_amount': end_amount},
+            config_override or {},
+            CONFIG
+        ))
         
         # Запускаємо обробку для цього діапазону
         result = smart_promo_management_worker(process_id, local_config, process_logger)
@@ -201,8 +242,8 @@ def worker_process(process_id, start_amount, end_amount, result_queue, config_ov
             'log_file': log_filename
         }
         
-        result_queue.put(result_data)
         process_logger.info(f"✅ Процес {process_id} завершено успішно")
+        return result_data
         
     except Exception as e:
         # Створюємо process_logger, якщо він не був створений
@@ -217,9 +258,54 @@ def worker_process(process_id, start_amount, end_amount, result_queue, config_ov
             'codes_data': {},
             'operations': {'created': 0, 'deleted': 0, 'unchanged': 0}
         }
-        result_queue.put(error_result)
-        
         process_logger.error(f"❌ Помилка в процесі {process_id}: {e}")
+        return error_result
+
+def _init_worker(log_queue, log_filename, browser_init_semaphore=None, pid_queue=None):
+    """
+    Ініціалізатор ProcessPoolExecutor: запам'ятовує спільну чергу логів воркерів
+    та семафор запуску браузера, і робить воркер лідером власної групи процесів,
+    щоб при таймауті одним os.killpg завершити і його, і дочірні процеси браузера.
+    PID воркера (він же ідентифікатор групи) повідомляється батьківському процесу через pid_queue.
+    """
+    global _WORKER_LOG_QUEUE, _WORKER_LOG_FILE, _BROWSER_INIT_SEMAPHORE
+    _WORKER_LOG_QUEUE = log_queue
+    _WORKER_LOG_FILE = log_filename
+    _BROWSER_INIT_SEMAPHORE = browser_init_semaphore
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    if pid_queue is not None:
+        pid_queue.put(os.getpid())
+
+def _drain_worker_pids(pid_queue) -> List[int]:
+    """Забирає з черги всі PID воркерів, які вони повідомили при ініціалізації."""
+    pids = []
+    while True:
+        try:
+            pids.append(pid_queue.get_nowait())
+        except queue.Empty:
+            return pids
+
+def _terminate_worker_group(pid):
+    """
+    Завершує воркер разом з дочірніми процесами браузера.
+    
+    Args:
+        pid: PID воркера - лідера власної групи процесів
+    """
+    try:
+        if hasattr(os, 'killpg'):
+            # Воркер - лідер своєї групи, тож сигнал отримають і процеси Chromium
+            os.killpg(pid, signal.SIGTERM)
+        else:
+            os.kill(pid, signal.SIGTERM)
+        logger.warning(f"⚠️ Процес {pid} не завершився, завершуємо примусово (разом з браузером)")
+    except (ProcessLookupError, PermissionError):
+        pass  # Процес вже завершився
+
+def _worker_entry(worker_args):
+    """Точка входу для ProcessPoolExecutor: розпаковує (process_id, start, end)."""
+    return worker_process(*worker_args)
 
 def smart_promo_management_worker(process_id, config, process_logger):
     """
@@ -239,60 +325,32 @@ def smart_promo_management_worker(process_id, config, process_logger):
     
     process_logger.info(f"🔧 Робочий процес {process_id} розпочав роботу")
     
-    # Імпорти
-    import sys
-    import os
+    # config - це ChainMap-вид (кожен доступ перебирає шари), тож параметри,
+    # які читаються повторно, беремо в локальні змінні один раз
+    start_amount = config['start_amount']
+    end_amount = config['end_amount']
+    sort_order = config['sort_order']
+    verbose_logging = config.get('verbose_logging', False)
+    quick_mode = config.get('quick_mode', False)
     
-    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    sys.path.insert(0, parent_dir)
-    sys.path.insert(0, os.path.join(parent_dir, 'replenish_promo_code_lambda'))
+    # Браузерні модулі та функції цього файлу вже завантажені разом з модулем
+    if not BROWSER_MODULES_AVAILABLE:
+        process_logger.error("❌ Не вдалося імпортувати необхідні модулі (див. попередження при завантаженні)")
+        return {'success': False, 'error': 'Import error: browser modules unavailable'}
     
-    # Додаємо поточну папку до sys.path для доступу до функцій promo_generator
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    if current_dir not in sys.path:
-        sys.path.insert(0, current_dir)
+    # Режим передаємо явно: PLAYWRIGHT_HEADED може прийти з .env, завантаженого вже після імпорту browser_manager
+    browser_manager = create_browser_manager(headed_mode=_HEADED_MODE)
     
     try:
-        from bonus_system.bonus_replenish_promo_code.browser_manager import create_browser_manager
-        from bonus_system.bonus_replenish_promo_code.promo_logic import PromoService
-        from promo_smart import PromoSmartManager
-        
-        # Імпортуємо функції з поточного модуля безпосередньо
-        # Оскільки ми знаходимося в робочому процесі, функції вже визначені в цьому файлі
-        global set_table_rows_per_page, apply_bon_filter_once, apply_amount_range_filter
-        global clear_all_filters, sort_table_by_amount, get_all_bon_codes_with_pagination
-        global create_promo_codes, delete_specific_promo_codes, check_existing_bon_codes_for_amount, generate_bon_code
-        
-        # Перевіряємо, що всі функції доступні
-        required_functions = [
-            'set_table_rows_per_page', 'apply_bon_filter_once', 'apply_amount_range_filter',
-            'clear_all_filters', 'sort_table_by_amount', 'get_all_bon_codes_with_pagination',
-            'create_promo_codes', 'delete_specific_promo_codes', 'check_existing_bon_codes_for_amount', 'generate_bon_code'
-        ]
-        
-        missing_functions = []
-        for func_name in required_functions:
-            if func_name not in globals():
-                missing_functions.append(func_name)
-        
-        if missing_functions:
-            raise ImportError(f"Не знайдено функції: {', '.join(missing_functions)}")
-        
-        process_logger.info(f"✅ Процес {process_id}: Всі модулі та функції імпортовано успішно")
-        
-    except ImportError as e:
-        process_logger.error(f"❌ Не вдалося імпортувати необхідні модулі: {e}")
-        return {'success': False, 'error': f'Import error: {e}'}
-    
-    # Додаємо затримку для уникнення конфліктів між процесами
-    time.sleep(process_id * 2)  # Кожен процес стартує з затримкою
-    
-    browser_manager = create_browser_manager()
-    
-    try:
-        # Ініціалізація браузера
+        # Ініціалізація браузера. Замість фіксованої затримки process_id * 2 сек
+        # одночасні запуски Chromium обмежує семафор - решта процесів чекає лише на нього
         process_logger.info(f"🚀 Процес {process_id}: Ініціалізація браузера...")
-        page = browser_manager.initialize()
+        if _BROWSER_INIT_SEMAPHORE is not None:
+            with _BROWSER_INIT_SEMAPHORE:
+                page = browser_manager.initialize()
+        else:
+            page = browser_manager.initialize()
+        install_dialog_auto_accept(page)
         promo_service = PromoService(page)
         
         # Логін
@@ -302,7 +360,6 @@ def smart_promo_management_worker(process_id, config, process_logger):
             return {'success': False, 'error': 'Login failed'}
         
         process_logger.info(f"✅ Процес {process_id}: Успішний логін!")
-        promo_smart_manager = PromoSmartManager(promo_service)
         
         # Словник для результатів
         codes_data = {}
@@ -315,7 +372,7 @@ def smart_promo_management_worker(process_id, config, process_logger):
             return {'success': False, 'error': 'iframe not found'}
         
         # Застосовуємо фільтри та отримуємо дані
-        process_logger.info(f"🔍 Процес {process_id}: Отримання промокодів для діапазону {config['start_amount']}-{config['end_amount']}...")
+        process_logger.info(f"🔍 Процес {process_id}: Отримання промокодів для діапазону {start_amount}-{end_amount}...")
         
         # Встановлюємо максимальну кількість рядків на сторінці
         set_table_rows_per_page(iframe, 160)
@@ -326,16 +383,16 @@ def smart_promo_management_worker(process_id, config, process_logger):
             return {'success': False, 'error': 'BON filter failed'}
         
         # Застосовуємо фільтр по діапазону сум
-        if not apply_amount_range_filter(iframe, config['start_amount'], config['end_amount']):
+        if not apply_amount_range_filter(iframe, start_amount, end_amount):
             process_logger.warning(f"⚠️ Процес {process_id}: Не вдалося застосувати фільтр діапазону")
         
         # Сортуємо таблицю по розміру знижки для кращої організації даних
-        process_logger.info(f"📊 Застосовуємо сортування по розміру знижки ({config['sort_order']})...")
-        sort_success = sort_table_by_amount(iframe, config['sort_order'])
+        process_logger.info(f"📊 Застосовуємо сортування по розміру знижки ({sort_order})...")
+        sort_success = sort_table_by_amount(iframe, sort_order)
         if not sort_success:
             process_logger.warning("⚠️ Не вдалося відсортувати таблицю по розміру знижки, продовжуємо без сортування")
         else:
-            sort_label = "зростання" if config['sort_order'] == "asc" else "спадання"
+            sort_label = "зростання" if sort_order == "asc" else "спадання"
             process_logger.info(f"✅ Таблицю успішно відсортовано по розміру знижки ({sort_label})")
 
         # Якщо активна опція видалення всіх існуючих промокодів перед додаванням нових
@@ -346,12 +403,12 @@ def smart_promo_management_worker(process_id, config, process_logger):
             page = promo_service.page if hasattr(promo_service, 'page') else None
             
             # Видаляємо всі промокоди в діапазоні
-            deleted_count = delete_all_promo_codes_in_range(iframe, config['start_amount'], config['end_amount'], process_logger, page)
+            deleted_count = delete_all_promo_codes_in_range(iframe, start_amount, end_amount, process_logger, page)
             total_operations['deleted'] += deleted_count
             
             # Очищуємо словник кодів, оскільки всі були видалені
             all_codes_by_amount = {}
-            for amount in range(config['start_amount'], config['end_amount'] + 1):
+            for amount in range(start_amount, end_amount + 1):
                 all_codes_by_amount[amount] = []
 
         # Отримуємо коди для діапазону
@@ -360,39 +417,61 @@ def smart_promo_management_worker(process_id, config, process_logger):
         if not all_codes_by_amount:
             process_logger.info(f"ℹ️ Процес {process_id}: Не знайдено промокодів у діапазоні")
             all_codes_by_amount = {}
-            for amount in range(config['start_amount'], config['end_amount'] + 1):
+            for amount in range(start_amount, end_amount + 1):
                 all_codes_by_amount[amount] = []
         
-        # Аналіз та обробка кожної суми
-        for amount in range(config['start_amount'], config['end_amount'] + 1):
-            code_objects = all_codes_by_amount.get(amount, [])
-            
-            # Розділяємо коди на активні та неактивні
-            active_codes = [obj['code'] for obj in code_objects if obj['status'] == 'active']
-            inactive_codes = [obj['code'] for obj in code_objects if obj['status'] == 'inactive']
+        # ФАЗА 1: планування без звернень до браузера.
+        # Збираємо всі коди на видалення (неактивні + зайві) та коди на створення,
+        # щоб видалити все одним пакетом у вже відфільтрованому виді таблиці
+        codes_to_delete_by_amount = {}
+        excess_amounts = set()
+        creations = []
+        target_count = config['target_codes_per_amount']
+        auto_delete_excess = config.get('auto_delete_excess', False)
+        log_each_amount = verbose_logging and not quick_mode
+        
+        # Один прохід по сумах діапазону: розділяємо коди за статусом і одразу
+        # визначаємо, чи потребує сума дій. Суми, що вже збалансовані (немає
+        # неактивних, активних рівно target_count або більше без auto_delete_excess),
+        # рахуємо одразу, без проходу циклом аналізу
+        amounts_needing_work = []
+        for amount in range(start_amount, end_amount + 1):
+            code_objects = all_codes_by_amount.get(amount)
+            if not code_objects:
+                # Порожня сума (частий випадок для розрідженої таблиці): ділити нічого,
+                # потрібне лише створення кодів
+                codes_data[amount] = []
+                if target_count > 0:
+                    amounts_needing_work.append((amount, codes_data[amount], []))
+                continue
             
+            active_codes = []
+            inactive_codes = []
+            for obj in code_objects:
+                if obj.status == 'active':
+                    active_codes.append(obj.code)
+                elif obj.status == 'inactive':
+                    inactive_codes.append(obj.code)
+            codes_data[amount] = active_codes
+            active_count = len(active_codes)
+            if inactive_codes or active_count < target_count or (active_count > target_count and auto_delete_excess):
+                amounts_needing_work.append((amount, active_codes, inactive_codes))
+        
+        balanced_count = (end_amount - start_amount + 1) - len(amounts_needing_work)
+        total_operations['unchanged'] += balanced_count
+        process_logger.info(f"📊 Процес {process_id}: {balanced_count} сум вже збалансовано, потребують обробки: {len(amounts_needing_work)}")
+        
+        for amount, active_codes, inactive_codes in amounts_needing_work:
             current_count_active = len(active_codes)
             current_count_inactive = len(inactive_codes)
-            target_count = config['target_codes_per_amount']
             
-            process_logger.info(f"📊 Процес {process_id}: Аналіз суми {amount} грн - {current_count_active} активних + {current_count_inactive} неактивних = {len(code_objects)} всього (цільова к-ть: {target_count})")
+            if log_each_amount:
+                process_logger.info(f"📊 Процес {process_id}: Аналіз суми {amount} грн - {current_count_active} активних + {current_count_inactive} неактивних = {current_count_active + current_count_inactive} всього (цільова к-ть: {target_count})")
             
             # КРОК 1: ЗАВЖДИ видаляємо неактивні коди (незалежно від auto_delete)
+            planned_delete = list(inactive_codes)
             if inactive_codes:
-                process_logger.info(f"🗑️ Процес {process_id}: Видаляємо {len(inactive_codes)} неактивних кодів для суми {amount} грн")
-                
-                # Застосовуємо фільтр по конкретній сумі для видалення неактивних
-                # BON фільтр вже застосований глобально, тільки змінюємо діапазон сум
-                if apply_amount_range_filter(iframe, amount, amount):
-                    page = promo_service.page if hasattr(promo_service, 'page') else None
-                    delete_result = delete_specific_promo_codes(iframe, inactive_codes, page)
-                    deleted_inactive_count = delete_result.get('deleted', 0) if isinstance(delete_result, dict) else delete_result
-                    total_operations['deleted'] += deleted_inactive_count
-                    
-                    process_logger.info(f"✅ Процес {process_id}: Видалено {deleted_inactive_count} неактивних кодів з {len(inactive_codes)}")
-                    
-                else:
-                    process_logger.warning(f"⚠️ Процес {process_id}: Не вдалося застосувати фільтр для видалення неактивних кодів суми {amount} грн")
+                process_logger.info(f"🗑️ Процес {process_id}: Заплановано видалення {len(inactive_codes)} неактивних кодів для суми {amount} грн")
             
             # КРОК 2: Аналізуємо активні коди
             if current_count_active < target_count:
@@ -400,60 +479,62 @@ def smart_promo_management_worker(process_id, config, process_logger):
                 needed = target_count - current_count_active
                 process_logger.info(f"➕ Процес {process_id}: Для {amount} грн потрібно створити {needed} кодів")
                 
-                # Генеруємо нові коди
-                new_codes = []
-                for _ in range(needed):
-                    # Перевіряємо, чи вже існують промокоди для цієї суми
-                    existing_bon_codes = check_existing_bon_codes_for_amount(amount, active_codes + new_codes)
-                    
-                    # Якщо вже є достатньо існуючих кодів, не генеруємо нові
-                    if len(existing_bon_codes) >= target_count:
-                        process_logger.info(f"ℹ️ Процес {process_id}: Вже існує достатньо промокодів для суми {amount} грн")
-                        break
-                    
-                    # Генеруємо новий код
-                    new_code = generate_bon_code(amount)
-                    new_codes.append(new_code)
-                
-                # Створюємо коди
-                created_count = create_promo_codes(promo_service, new_codes, amount)
-                total_operations['created'] += created_count
+                # Генеруємо всі потрібні коди одним пакетом, унікальні серед існуючих
+                new_codes = generate_bon_codes(amount, needed, active_codes)
                 
-                # Оновлюємо дані для результату
-                for code in new_codes[:created_count]:
-                    active_codes.append(code)
+                creations.append((amount, new_codes))
                     
-            elif current_count_active > target_count and config.get('auto_delete_excess', False):
+            elif current_count_active > target_count and auto_delete_excess:
                 # Потрібно видалити зайві коди
                 excess = current_count_active - target_count
                 process_logger.info(f"➖ Процес {process_id}: Для {amount} грн потрібно видалити {excess} зайвих кодів")
                 
-                codes_to_delete = active_codes[-excess:]  # Видаляємо останні
+                planned_delete.extend(active_codes[-excess:])  # Видаляємо останні
+                excess_amounts.add(amount)
                 
-                # ВАЖЛИВО: Перед видаленням застосовуємо фільтр по конкретній сумі
-                # щоб коди були видимі в таблиці
-                process_logger.info(f"🔍 Застосовуємо фільтр по сумі {amount} грн перед видаленням...")
+            else:
+                total_operations['unchanged'] += 1
+            
+            if planned_delete:
+                codes_to_delete_by_amount[amount] = planned_delete
+        
+        # ФАЗА 2а: одне пакетне видалення в поточному виді таблиці
+        # (BON фільтр і фільтр діапазону сум вже застосовані під час збору кодів)
+        if codes_to_delete_by_amount:
+            page = promo_service.page if hasattr(promo_service, 'page') else None
+            all_codes_to_delete = [code for codes in codes_to_delete_by_amount.values() for code in codes]
+            process_logger.info(f"🗑️ Процес {process_id}: Пакетне видалення {len(all_codes_to_delete)} кодів з {len(codes_to_delete_by_amount)} сум")
+            
+            deleted_codes = _delete_codes_in_current_view(iframe, all_codes_to_delete, page)
+            
+            # Коди, яких не було на поточній сторінці діапазону, видаляємо через
+            # фільтр по конкретній сумі - лише для сум, де такі коди лишилися
+            for amount, codes in codes_to_delete_by_amount.items():
+                leftover = [code for code in codes if code not in deleted_codes]
+                if not leftover:
+                    continue
                 
+                process_logger.info(f"🔍 Процес {process_id}: {len(leftover)} кодів суми {amount} грн не видно в діапазоні, застосовуємо фільтр по сумі...")
                 # BON фільтр вже застосований, тільки змінюємо діапазон сум
                 if apply_amount_range_filter(iframe, amount, amount):
-                    # Отримуємо page з promo_service
-                    page = promo_service.page if hasattr(promo_service, 'page') else None
-                    delete_result = delete_specific_promo_codes(iframe, codes_to_delete, page)
-                    deleted_count = delete_result.get('deleted', 0) if isinstance(delete_result, dict) else delete_result
-                    total_operations['deleted'] += deleted_count
-                    
-                    # Оновлюємо дані
-                    active_codes = active_codes[:-deleted_count] if deleted_count > 0 else active_codes
-                    
-                    process_logger.info(f"✅ Видалено {deleted_count} з {excess} кодів для {amount} грн")
+                    deleted_codes |= _delete_codes_in_current_view(iframe, leftover, page)
                 else:
                     process_logger.warning(f"⚠️ Не вдалося застосувати фільтр для суми {amount} грн, пропускаємо видалення")
-                
-            else:
-                total_operations['unchanged'] += 1
-                
-            # Зберігаємо результат для цієї суми
-            codes_data[amount] = active_codes
+            
+            total_operations['deleted'] += len(deleted_codes)
+            process_logger.info(f"✅ Процес {process_id}: Видалено {len(deleted_codes)} з {len(all_codes_to_delete)} запланованих кодів")
+            
+            # Оновлюємо дані: прибираємо видалені зайві активні коди
+            for amount in excess_amounts:
+                codes_data[amount] = [code for code in codes_data[amount] if code not in deleted_codes]
+        
+        # ФАЗА 2б: створення кодів
+        for amount, new_codes in creations:
+            created_count = create_promo_codes(promo_service, new_codes, amount)
+            total_operations['created'] += created_count
+            
+            # Оновлюємо дані для результату
+            codes_data[amount].extend(new_codes[:created_count])
         
         process_logger.info(f"✅ Процес {process_id}: Обробка завершена")
         
@@ -499,34 +580,128 @@ def check_existing_bon_codes_for_amount(amount, existing_codes):
     logger.debug(f"✅ Знайдено {len(bon_codes_for_amount)} існуючих BON кодів для суми {amount} грн")
     return bon_codes_for_amount
 
-def generate_bon_code(amount):
+def generate_bon_code(amount, existing_codes=None):
     """
     Генерує новий BON код для заданої суми.
     
     Args:
         amount: сума промокоду
+        existing_codes: (опціонально) множина існуючих кодів, з якими
+            новий код не повинен збігатися
         
     Returns:
         str: новий BON код
     """
     logger.debug(f"🔄 Генерація нового BON коду для суми {amount} грн")
-    suffix = generate_random_string(5)
-    new_code = f"BON{amount}{suffix}"
+    new_code = f"BON{amount}{generate_random_string(5)}"
+    while existing_codes and new_code in existing_codes:
+        new_code = f"BON{amount}{generate_random_string(5)}"
     logger.debug(f"✅ Згенеровано новий BON код: {new_code}")
     return new_code
 
+def generate_bon_codes(amount, count, existing_codes=None):
+    """
+    Генерує count унікальних BON кодів для заданої суми пакетом: випадкові
+    частини всіх кодів беруться з одного виклику generate_random_string.
+    
+    Args:
+        amount: сума промокоду
+        count: кількість кодів
+        existing_codes: (опціонально) існуючі коди, з якими нові не повинні збігатися
+        
+    Returns:
+        List[str]: нові BON коди
+    """
+    prefix = f"BON{amount}"
+    # Множину/словник використовуємо як є, список перетворюємо один раз
+    if isinstance(existing_codes, (set, frozenset, dict)):
+        existing = existing_codes
+    else:
+        existing = set(existing_codes) if existing_codes else set()
+    # dict як впорядкована множина: дедуплікація без окремого списку, порядок генерації зберігається
+    new_codes: Dict[str, None] = {}
+    while len(new_codes) < count:
+        # Весь пакет кандидатів будується з одного рядка випадкових символів,
+        # існуючі коди відсіюються одним фільтром. Колізії рідкісні, тож зазвичай
+        # достатньо одного проходу; на нестачу генерується лише відсутня кількість
+        suffixes = generate_random_string(5 * (count - len(new_codes)))
+        candidates = dict.fromkeys(prefix + suffixes[i:i + 5] for i in range(0, len(suffixes), 5))
+        new_codes.update(dict.fromkeys(code for code in candidates if code not in existing))
+    return list(new_codes)
+
+# boto3 імпортується ліниво: S3 потрібен лише головному процесу на початку та в кінці,
+# а воркери (під 'spawn' вони імпортують модуль заново) з S3 не працюють взагалі
+_boto3 = None
+
+def _get_boto3():
+    """Повертає модуль boto3, імпортуючи його при першому виклику."""
+    global _boto3
+    if _boto3 is None:
+        import boto3
+        _boto3 = boto3
+    return _boto3
+
+# S3 клієнт кешується на рівні модуля, але окремо для кожного процесу:
+# після fork SSL-з'єднання батьківського процесу не можна перевикористовувати
+_S3_CLIENT = None
+_S3_CLIENT_PID = None
+_S3_TRANSFER_CONFIG = None
+
+def _get_s3_transfer_config():
+    """
+    Повертає TransferConfig для upload_fileobj (створюється один раз).
+    Великі об'єкти вивантажуються multipart-частинами паралельно (16 потоків),
+    маленькі - одним PUT, як і раніше.
+    """
+    global _S3_TRANSFER_CONFIG
+    if _S3_TRANSFER_CONFIG is None:
+        from boto3.s3.transfer import TransferConfig
+        _S3_TRANSFER_CONFIG = TransferConfig(
+            multipart_threshold=5 * 1024 * 1024,
+            multipart_chunksize=5 * 1024 * 1024,
+            max_concurrency=16,
+            use_threads=True
+        )
+    return _S3_TRANSFER_CONFIG
+
+def _get_s3_client():
+    """Повертає S3 клієнт поточного процесу, створюючи його при першому виклику."""
+    global _S3_CLIENT, _S3_CLIENT_PID
+    if _S3_CLIENT is None or _S3_CLIENT_PID != os.getpid():
+        from botocore.config import Config as BotoConfig
+        _S3_CLIENT = _get_boto3().session.Session().client(
+            's3',
+            region_name=CONFIG['region'],
+            config=BotoConfig(
+                max_pool_connections=50,
+                retries={'max_attempts': 3, 'mode': 'adaptive'}
+            )
+        )
+        _S3_CLIENT_PID = os.getpid()
+    return _S3_CLIENT
+
+def _json_dumps_bytes(data):
+    """Серіалізує дані в компактний JSON (bytes) через orjson, якщо він доступний."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _json_loads(body):
+    """Розбирає JSON з bytes через orjson, якщо він доступний."""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode('utf-8'))
+
 def download_from_s3():
     """Завантажує існуючі дані з S3."""
     try:
-        import boto3
-        s3 = boto3.client('s3', region_name=CONFIG['region'])
+        s3 = _get_s3_client()
         bucket = CONFIG['s3_bucket']
         key = CONFIG['s3_key']
         
         logger.info(f"📥 Завантаження існуючих промокодів з S3: s3://{bucket}/{key}")
         
-        response = s3.get_object(Bucket=bucket, Key=key)
-        existing_data = json.loads(response['Body'].read().decode('utf-8'))
+        existing_data = read_promo_codes(s3, bucket, key, loads=_json_loads)
         
         logger.info("✅ Існуючі промокоди успішно завантажено з S3")
         return existing_data
@@ -543,18 +718,19 @@ def download_from_s3():
 def upload_to_s3(data):
     """Завантажує дані в S3."""
     try:
-        import boto3
-        s3 = boto3.client('s3', region_name=CONFIG['region'])
+        s3 = _get_s3_client()
         bucket = CONFIG['s3_bucket']
         key = CONFIG['s3_key']
         
         logger.info(f"☁️ Завантаження промокодів в S3: s3://{bucket}/{key}")
         
-        s3.put_object(
-            Bucket=bucket,
-            Key=key,
-            Body=json.dumps(data, indent=2),
-            ContentType='application/json'
+        # Спільний формат файлу (promo_codes_store); багатопотокове завантаження через TransferConfig
+        s3.upload_fileobj(
+            io.BytesIO(encode_promo_codes(data, dumps=_json_dumps_bytes)),
+            bucket,
+            key,
+            ExtraArgs=dict(PROMO_CODES_OBJECT_ARGS),
+            Config=_get_s3_transfer_config()
         )
         
         logger.info("✅ Промокоди успішно завантажено в S3")
@@ -565,11 +741,20 @@ def upload_to_s3(data):
         logger.error("Перевірте ваші AWS креданшали та налаштування")
         return False
 
+# Алфавіт для випадкової частини кодів (будується один раз при імпорті).
+# Таблиця переводить випадковий байт у символ алфавіту через bytes.translate;
+# байти >= 252 (252 = 36 * 7) відкидаються, щоб розподіл символів був рівномірним
+_CODE_ALPHABET = (string.ascii_uppercase + string.digits).encode('ascii')
+_UNBIASED_BYTE_LIMIT = 256 - 256 % len(_CODE_ALPHABET)
+_BYTE_TO_CODE_CHAR = bytes(_CODE_ALPHABET[b % len(_CODE_ALPHABET)] for b in range(256))
+_REJECTED_BYTES = bytes(range(_UNBIASED_BYTE_LIMIT, 256))
+
 def generate_random_string(length):
     """Генерує випадковий рядок із великих літер та цифр."""
-    import random
-    import string
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
+    result = b''
+    while len(result) < length:
+        result += random.randbytes(length + 2).translate(_BYTE_TO_CODE_CHAR, _REJECTED_BYTES)
+    return result[:length].decode('ascii')
 
 def manage_promo_codes():
     """
@@ -596,42 +781,62 @@ def manage_promo_codes():
     for i, (start, end) in enumerate(ranges):
         logger.info(f"  Процес {i+1}: {start}-{end} ({end-start+1} сум)")
     
-    # Створюємо чергу для результатів
-    result_queue = Queue()
-    processes = []
-    
-    # Запускаємо процеси
+    # Запускаємо процеси через пул. Під 'fork' воркери успадковують вже імпортований
+    # модуль, тож повторного виконання файлу та власної черги результатів не потрібно.
     logger.info("🚀 Запуск паралельних процесів...")
-    for i, (start, end) in enumerate(ranges):
-        process_id = i + 1
-        p = Process(
-            target=worker_process,
-            args=(process_id, start, end, result_queue)
-        )
-        p.start()
-        processes.append(p)
-        logger.info(f"  ✅ Процес {process_id} запущено")
+    worker_args = [(i + 1, start, end) for i, (start, end) in enumerate(ranges)]
+    mp_context = multiprocessing.get_context()
+    
+    # Логи всіх воркерів йдуть через одну чергу в один файл (QueueListener у батьківському процесі)
+    log_timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+    workers_log_filename = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        'logs',
+        f'workers_{log_timestamp}.log'
+    )
+    os.makedirs(os.path.dirname(workers_log_filename), exist_ok=True)
+    workers_file_handler = logging.FileHandler(workers_log_filename, encoding='utf-8')
+    workers_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    log_queue = mp_context.Queue(-1)
+    log_listener = logging.handlers.QueueListener(log_queue, workers_file_handler, respect_handler_level=True)
+    log_listener.start()
+    logger.info(f"📝 Логи процесів: {workers_log_filename}")
+    
+    # Воркери самі повідомляють свої PID, щоб при таймауті не звертатися до внутрішнього стану пулу
+    pid_queue = mp_context.Queue()
+    executor = ProcessPoolExecutor(
+        max_workers=len(worker_args),
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(log_queue, workers_log_filename, mp_context.Semaphore(CONFIG['browser_init_concurrency']), pid_queue)
+    )
     
     # Збираємо результати
     logger.info("⏳ Очікування завершення процесів...")
     results = []
     
-    # Чекаємо результати від всіх процесів
-    for i in range(len(processes)):
-        try:
-            result = result_queue.get(timeout=CONFIG['process_timeout'])
+    # Результати забираємо в порядку завершення, а не запуску процесів
+    futures = {executor.submit(_worker_entry, args): args[0] for args in worker_args}
+    try:
+        for future in as_completed(futures, timeout=CONFIG['process_timeout']):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"❌ Помилка при отриманні результату процесу {futures[future]}: {e}")
+                continue
             results.append(result)
             logger.info(f"📦 Отримано результат від процесу {result['process_id']}")
-        except Exception as e:
-            logger.error(f"❌ Помилка при отриманні результату процесу: {e}")
-    
-    # Завершуємо всі процеси
-    for i, p in enumerate(processes):
-        p.join(timeout=10)  # Даємо 10 секунд на завершення
-        if p.is_alive():
-            logger.warning(f"⚠️ Процес {i+1} не завершився, завершуємо примусово")
-            p.terminate()
-            p.join()
+    except FuturesTimeoutError:
+        logger.error(f"❌ Не всі процеси завершилися за {CONFIG['process_timeout']} сек")
+    finally:
+        # Якщо не всі процеси завершилися - завершуємо їх примусово
+        timed_out = not all(future.done() for future in futures)
+        if timed_out:
+            for pid in _drain_worker_pids(pid_queue):
+                _terminate_worker_group(pid)
+        executor.shutdown(wait=not timed_out, cancel_futures=True)
+        log_listener.stop()
+        workers_file_handler.close()
     
     # Аналізуємо результати
     logger.info("📊 АНАЛІЗ РЕЗУЛЬТАТІВ:")
@@ -657,7 +862,7 @@ def manage_promo_codes():
     logger.info(f"📈 Підсумок операцій:")
     logger.info(f"  ➕ Створено: {total_operations['created']}")
     logger.info(f"  ➖ Видалено: {total_operations['deleted']}")
-    logger.info(f"  ✅ Успішних процесів: {successful_processes}/{len(processes)}")
+    logger.info(f"  ✅ Успішних процесів: {successful_processes}/{len(worker_args)}")
     
     # Записуємо результати в S3 (тільки якщо є успішні процеси)
     if successful_processes > 0 and CONFIG['sync_s3']:
@@ -681,10 +886,9 @@ def manage_promo_codes():
         
         # Оновлюємо тільки ті діапазони, які були успішно оброблені
         logger.info("🔄 Об'єднуємо нові результати з існуючими даними...")
-        updated_ranges = []
-        for amount, codes in all_codes_data.items():
-            s3_data[str(amount)] = codes
-            updated_ranges.append(amount)
+        # Ключ суми перетворюємо в рядок один раз на запис
+        s3_data.update((str(amount), codes) for amount, codes in all_codes_data.items())
+        updated_ranges = list(all_codes_data)
         
         if updated_ranges:
             min_updated = min(updated_ranges)
@@ -699,7 +903,7 @@ def manage_promo_codes():
         # Додаємо метадані
         s3_data['_metadata'] = {
             'last_updated': datetime.datetime.now().isoformat(),
-            'total_processes': len(processes),
+            'total_processes': len(worker_args),
             'successful_processes': successful_processes,
             'updated_ranges': updated_ranges,
             'operations': total_operations,
@@ -715,48 +919,7 @@ def manage_promo_codes():
             logger.error("❌ Помилка при записі в S3")
     
     logger.info("🏁 ПАРАЛЕЛЬНЕ УПРАВЛІННЯ ПРОМОКОДАМИ ЗАВЕРШЕНО")
-    return successful_processes == len(processes)
-
-if __name__ == "__main__":
-    # Налаштування логування
-    log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-
-    log_timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-    log_filename = os.path.join(log_dir, f'promo_generator_{log_timestamp}.log')
-
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    log_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(log_format)
-    logger.addHandler(console_handler)
-
-    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
-    file_handler.setFormatter(log_format)
-    logger.addHandler(file_handler)
-
-    logger.propagate = False
-    logger.info(f"🔍 Логування налаштовано. Логи зберігаються у: {log_filename}")
-
-    # Запуск головної функції
-    try:
-        # На macOS, 'spawn' є безпечнішим методом, особливо при роботі з GUI/браузерами
-        multiprocessing.set_start_method('spawn', force=True)
-        logger.info("🔧 Встановлено метод запуску multiprocessing: spawn (для macOS)")
-
-        success = manage_promo_codes()
-        if success:
-            logger.info("✅ Управління промокодами завершено успішно.")
-            sys.exit(0)
-        else:
-            logger.error("❌ Управління промокодами завершено з помилками.")
-            sys.exit(1)
-    except Exception as e:
-        logger.critical(f"💥 Критична помилка в головному процесі: {e}", exc_info=True)
-        sys.exit(1)
+    return successful_processes == len(worker_args)
 
 def apply_amount_filter(iframe, amount):
     """
@@ -780,6 +943,55 @@ def apply_amount_filter(iframe, amount):
         logger.error(f"❌ Помилка при застосуванні фільтра: {e}")
         return False
 
+def _wait_for_filter_reload(iframe):
+    """
+    Очікує оновлення таблиці після застосування фільтра: появу та зникнення лоадера,
+    або (якщо лоадер не з'явився) стабілізацію мережевої активності.
+    """
+    try:
+        loader = iframe.locator('#datagrid-loader')
+        try:
+            loader.wait_for(state='visible', timeout=1000)
+            logger.debug("Лоадер з'явився, чекаємо його зникнення...")
+            loader.wait_for(state='hidden', timeout=5000)
+            logger.debug("✅ Лоадер зник після фільтрації")
+        except Exception:
+            logger.debug("Лоадер не з'явився, використовуємо networkidle")
+            iframe.page.wait_for_load_state('networkidle', timeout=3000)
+    except Exception as e:
+        logger.warning(f"⚠️ Помилка очікування після фільтрації: {e}")
+
+def _open_column_filter(iframe, column_id):
+    """
+    Активує блок фільтрації колонки (mouseenter на заголовку без використання hover)
+    і чекає, поки блок з'явиться в DOM, замість фіксованої паузи.
+    
+    Якщо блок вже є в DOM (фільтр цієї колонки застосовувався раніше), обходимось
+    одним запитом до браузера - без mouseenter та очікування селектора.
+    
+    Returns:
+        bool: чи знайдено заголовок колонки
+    """
+    state = iframe.evaluate("""(columnId) => {
+        if (document.querySelector('#sortingBlock_' + columnId)) {
+            return 'attached';
+        }
+        const header = document.querySelector('#header_id_' + columnId);
+        if (!header) {
+            return 'missing';
+        }
+        header.dispatchEvent(new MouseEvent('mouseenter', {
+            view: window,
+            bubbles: true,
+            cancelable: true
+        }));
+        return 'opened';
+    }""", column_id)
+    
+    if state == 'opened':
+        iframe.wait_for_selector(f'#sortingBlock_{column_id}', state='attached', timeout=2000)
+    return state != 'missing'
+
 def apply_amount_range_filter(iframe, start_amount, end_amount):
     """
     💰 Застосовує фільтр по діапазону сум промокодів в адмін-панелі.
@@ -795,80 +1007,57 @@ def apply_amount_range_filter(iframe, start_amount, end_amount):
     try:
         logger.info(f"💰 Застосовуємо фільтр по діапазону сум: {start_amount}-{end_amount} грн")
         
-        # Використовуємо JavaScript для активації фільтра по сумі
-        filter_js = f"""
-        (function() {{
-            try {{
-                // Знаходимо заголовок "Розмір знижки" (колонка 4778)
-                const amountHeader = document.querySelector('#header_id_4778');
-                if (!amountHeader) {{
-                    return {{ success: false, error: "Не знайдено заголовок 'Розмір знижки'" }};
-                }}
+        # Знаходимо заголовок "Розмір знижки" (колонка 4778) і чекаємо блок фільтрації
+        if not _open_column_filter(iframe, 4778):
+            logger.error("❌ Помилка при застосуванні фільтра діапазону: Не знайдено заголовок 'Розмір знижки'")
+            return False
+        
+        # Заповнюємо поля "від"/"до" та натискаємо Enter
+        result = iframe.evaluate("""([startAmount, endAmount]) => {
+            try {
+                const filterBlock = document.querySelector('#sortingBlock_4778');
                 
-                // Активуємо фільтр без використання hover
-                const event = new MouseEvent('mouseenter', {{
-                    view: window,
-                    bubbles: true,
-                    cancelable: true
-                }});
-                amountHeader.dispatchEvent(event);
+                // Активуємо блок фільтрації
+                filterBlock.click();
                 
-                // Даємо час для появи блоку фільтрації
-                setTimeout(() => {{
-                    const filterBlock = document.querySelector('#sortingBlock_4778');
-                    if (!filterBlock) {{
-                        return {{ success: false, error: "Не знайдено блок фільтрації" }};
-                    }}
-                    
-                    // Активуємо блок фільтрації
-                    filterBlock.click();
-                    
-                    // Знаходимо поля введення
-                    const fromField = filterBlock.querySelector('input[name="text1"][placeholder="від"]');
-                    const toField = filterBlock.querySelector('input[name="text2"][placeholder="до"]');
-                    
-                    if (!fromField || !toField) {{
-                        return {{ success: false, error: "Поля 'від' і 'до' не знайдено" }};
-                    }}
-                    
-                    // Заповнюємо поля
-                    fromField.value = '{start_amount}';
-                    toField.value = '{end_amount}';
-                    
-                    // Тригеримо події введення
-                    fromField.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    toField.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    
-                    // Натискаємо Enter для застосування фільтра
-                    const enterEvent = new KeyboardEvent('keydown', {{
-                        key: 'Enter',
-                        code: 'Enter',
-                        keyCode: 13,
-                        bubbles: true
-                    }});
-                    toField.dispatchEvent(enterEvent);
-                    
-                    return {{ success: true }};
-                }}, 300);
+                // Знаходимо поля введення
+                const fromField = filterBlock.querySelector('input[name="text1"][placeholder="від"]');
+                const toField = filterBlock.querySelector('input[name="text2"][placeholder="до"]');
                 
-                return {{ success: true }};
-            }} catch (error) {{
-                return {{ success: false, error: error.message }};
-            }}
-        }})();
-        """
-        
-        # Виконуємо JavaScript
-        result = iframe.evaluate(filter_js)
+                if (!fromField || !toField) {
+                    return { success: false, error: "Поля 'від' і 'до' не знайдено" };
+                }
+                
+                // Заповнюємо поля
+                fromField.value = startAmount;
+                toField.value = endAmount;
+                
+                // Тригеримо події введення
+                fromField.dispatchEvent(new Event('input', { bubbles: true }));
+                toField.dispatchEvent(new Event('input', { bubbles: true }));
+                
+                // Натискаємо Enter для застосування фільтра
+                toField.dispatchEvent(new KeyboardEvent('keydown', {
+                    key: 'Enter',
+                    code: 'Enter',
+                    keyCode: 13,
+                    bubbles: true
+                }));
+                
+                return { success: true };
+            } catch (error) {
+                return { success: false, error: error.message };
+            }
+        }""", [str(start_amount), str(end_amount)])
         
         if isinstance(result, dict) and not result.get('success', False):
             error_msg = result.get('error', 'Невідома помилка')
             logger.error(f"❌ Помилка при застосуванні фільтра діапазону: {error_msg}")
             return False
         
-        # Очікуємо завершення фільтрації
+        # Очікуємо завершення фільтрації (за лоадером, а не фіксованою паузою)
         logger.info("⏳ Очікуємо завершення фільтрації по діапазону сум...")
-        time.sleep(1.5)  # Збільшую час очікування для діапазону
+        _wait_for_filter_reload(iframe)
 
         logger.info(f"✅ Фільтр по діапазону сум {start_amount}-{end_amount} успішно застосовано")
         return True
@@ -894,67 +1083,44 @@ def apply_code_filter(iframe, search_term="BON"):
     try:
         logger.info(f"🔍 Застосовуємо фільтр по коду: '{search_term}'...")
         
-        # Використовуємо JavaScript для активації фільтра по коду
-        filter_js = f"""
-        (function() {{
-            try {{
-                // Знаходимо заголовок "Код" (колонка 4776)
-                const codeHeader = document.querySelector('#header_id_4776');
-                if (!codeHeader) {{
-                    return {{ success: false, error: "Не знайдено заголовок 'Код'" }};
-                }}
+        # Знаходимо заголовок "Код" (колонка 4776) і чекаємо блок фільтрації
+        if not _open_column_filter(iframe, 4776):
+            logger.error("❌ Помилка при застосуванні фільтра по коду: Не знайдено заголовок 'Код'")
+            return False
+        
+        # Заповнюємо поле пошуку та натискаємо Enter
+        result = iframe.evaluate("""(searchTerm) => {
+            try {
+                const filterBlock = document.querySelector('#sortingBlock_4776');
                 
-                // Активуємо фільтр без використання hover
-                const event = new MouseEvent('mouseenter', {{
-                    view: window,
-                    bubbles: true,
-                    cancelable: true
-                }});
-                codeHeader.dispatchEvent(event);
+                // Активуємо блок фільтрації
+                filterBlock.click();
                 
-                // Даємо час для появи блоку фільтрації
-                setTimeout(() => {{
-                    const filterBlock = document.querySelector('#sortingBlock_4776');
-                    if (!filterBlock) {{
-                        return {{ success: false, error: "Не знайдено блок фільтрації для коду" }};
-                    }}
-                    
-                    // Активуємо блок фільтрації
-                    filterBlock.click();
-                    
-                    // Знаходимо поле пошуку
-                    const searchField = filterBlock.querySelector('input[placeholder="пошук..."]');
-                    if (!searchField) {{
-                        return {{ success: false, error: "Поле пошуку не знайдено" }};
-                    }}
-                    
-                    // Заповнюємо поле пошуку
-                    searchField.value = '{search_term}';
-                    
-                    // Тригеримо події введення
-                    searchField.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                    
-                    // Натискаємо Enter для застосування фільтра
-                    const enterEvent = new KeyboardEvent('keydown', {{
-                        key: 'Enter',
-                        code: 'Enter',
-                        keyCode: 13,
-                        bubbles: true
-                    }});
-                    searchField.dispatchEvent(enterEvent);
-                    
-                    return {{ success: true }};
-                }}, 300);
+                // Знаходимо поле пошуку
+                const searchField = filterBlock.querySelector('input[placeholder="пошук..."]');
+                if (!searchField) {
+                    return { success: false, error: "Поле пошуку не знайдено" };
+                }
                 
-                return {{ success: true }};
-            }} catch (error) {{
-                return {{ success: false, error: error.message }};
-            }}
-        }})();
-        """
-        
-        # Виконуємо JavaScript
-        result = iframe.evaluate(filter_js)
+                // Заповнюємо поле пошуку
+                searchField.value = searchTerm;
+                
+                // Тригеримо події введення
+                searchField.dispatchEvent(new Event('input', { bubbles: true }));
+                
+                // Натискаємо Enter для застосування фільтра
+                searchField.dispatchEvent(new KeyboardEvent('keydown', {
+                    key: 'Enter',
+                    code: 'Enter',
+                    keyCode: 13,
+                    bubbles: true
+                }));
+                
+                return { success: true };
+            } catch (error) {
+                return { success: false, error: error.message };
+            }
+        }""", search_term)
         
         if isinstance(result, dict) and not result.get('success', False):
             error_msg = result.get('error', 'Невідома помилка')
@@ -963,19 +1129,7 @@ def apply_code_filter(iframe, search_term="BON"):
         
         # Власне очікування завершення фільтрації
         logger.info("⏳ Очікуємо завершення фільтрації по коду...")
-        try:
-            # Чекаємо на лоадер, якщо він з'явиться
-            loader = iframe.locator('#datagrid-loader')
-            try:
-                loader.wait_for(state='visible', timeout=1000)  # Зменшую з 2000 на 1000
-                logger.debug("Лоадер з'явився, чекаємо його зникнення...")
-                loader.wait_for(state='hidden', timeout=5000)  # Зменшую з 10000 на 5000
-                logger.debug("✅ Лоадер зник після фільтрації по коду")
-            except Exception:
-                logger.debug("Лоадер не з'явився, використовуємо networkidle")
-                iframe.page.wait_for_load_state('networkidle', timeout=3000)  # Зменшую з 5000 на 3000
-        except Exception as e:
-            logger.warning(f"⚠️ Помилка очікування після фільтрації по коду: {e}")
+        _wait_for_filter_reload(iframe)
         
         logger.info(f"✅ Фільтр по коду '{search_term}' успішно застосовано")
         return True
@@ -1019,18 +1173,26 @@ def clear_all_filters(iframe):
     try:
         logger.info("🧹 Скидаємо всі фільтри...")
         
-        # Пробуємо знайти кнопку скидання всіх фільтрів
-        reset_all_button = iframe.locator('#reset_datagrid')
-        if reset_all_button.count() > 0:
-            logger.info("🔄 Знайдено кнопку скидання фільтрів, натискаємо...")
-            reset_all_button.click()
-            time.sleep(1)
+        # Пробуємо знайти та натиснути кнопку скидання всіх фільтрів (один запит)
+        reset_clicked = iframe.evaluate("""() => {
+            const resetButton = document.querySelector('#reset_datagrid');
+            if (!resetButton) {
+                return false;
+            }
+            resetButton.click();
+            return true;
+        }""")
+        if reset_clicked:
+            logger.info("🔄 Натиснуто кнопку скидання фільтрів, очікуємо оновлення таблиці...")
+            # Чекаємо перезавантаження таблиці замість фіксованої секунди
+            _wait_for_filter_reload(iframe)
             return True
             
         # Альтернативний варіант - перезавантажити сторінку
+        # (чекаємо саму навігацію iframe, а не фіксовані 2 секунди)
         logger.info("🔄 Перезавантажуємо таблицю для скидання фільтрів...")
-        iframe.evaluate('document.location.reload()')
-        time.sleep(2)
+        with iframe.expect_navigation(wait_until='domcontentloaded', timeout=5000):
+            iframe.evaluate('() => { setTimeout(() => document.location.reload(), 0); }')
         
         # Чекаємо завершення завантаження
         try:
@@ -1045,15 +1207,57 @@ def clear_all_filters(iframe):
         logger.warning(f"⚠️ Помилка скидання фільтрів: {e}")
         return False
 
+class CodeObj(NamedTuple):
+    """Промокод з таблиці адмін-панелі (сума - ключ словника codes_by_amount)."""
+    code: str
+    status: str  # 'active' або 'inactive'
+
+
+# Перше число в колонці суми (компілюється один раз при імпорті)
+_AMOUNT_RE = re.compile(r'(\d+)')
+
+# Ключові слова статусу промокоду (будуються один раз, а не для кожного рядка).
+# Кортежі зберігають порядок для часткових збігів, frozenset - для точних
+_ACTIVE_STATUS_KEYWORDS = ('так', 'yes', 'активний', 'active', 'активен', 'true', '1', 'включен', 'enabled')
+_INACTIVE_STATUS_KEYWORDS = ('ні', 'no', 'неактивний', 'inactive', 'неактивен', 'false', '0', 'выключен', 'disabled', 'вимкнено', 'вимкнений')
+_ACTIVE_STATUS_SET = frozenset(_ACTIVE_STATUS_KEYWORDS)
+_INACTIVE_STATUS_SET = frozenset(_INACTIVE_STATUS_KEYWORDS)
+
+# JS: статус, код і сума всіх видимих рядків поточної сторінки за один запит.
+# Видимість перевіряємо через offsetParent, а комірки беремо з row.cells
+# (жива колекція рядка) без querySelectorAll та копіювання в масив.
+# Індекси комірок: 0 - ID, 1 - Назва, 2 - Статус, 3 - Код, 4 - Сума
+_PAGE_ROWS_JS = """() => {
+    const result = [];
+    for (const row of document.querySelectorAll('table#datagrid tbody tr:not(.no-data)')) {
+        if (row.offsetParent === null) {
+            continue;
+        }
+        const cells = row.cells;
+        // Мінімальна кількість комірок для валідного рядка
+        if (cells.length < 5) {
+            continue;
+        }
+        result.push({
+            statusText: cells[2].innerText.trim(),
+            codeText: cells[3].innerText.trim(),
+            amountText: cells[4].innerText.trim()
+        });
+    }
+    return result;
+}"""
+
 def get_codes_from_current_page(
     iframe, 
     all_codes_set: Optional[Set[str]] = None, 
     duplicates_info: Optional[Dict[str, List[int]]] = None, 
-    sort_order: str = "asc"
-) -> Dict[int, List[Dict[str, Any]]]:
+    sort_order: str = "asc",
+    code_to_amount: Optional[Dict[str, int]] = None,
+    rows_data: Optional[List[Dict[str, str]]] = None
+) -> Dict[int, List[CodeObj]]:
     """
     Оптимізована функція для збору всіх BON кодів з поточної сторінки таблиці.
-    Використовує evaluate_all для мінімізації запитів до браузера.
+    Використовує один evaluate для мінімізації запитів до браузера.
     Зберігає всю логіку оригіналу: відстеження дублікатів, сортування.
 
     Args:
@@ -1061,10 +1265,14 @@ def get_codes_from_current_page(
         all_codes_set: (опціонально) множина для відстеження унікальних кодів.
         duplicates_info: (опціонально) словник для збору інформації про дублікати.
         sort_order: Порядок сортування (для логування).
+        code_to_amount: (опціонально) зворотний індекс код -> сума першої появи,
+            спільний для всіх сторінок; дає O(1) пошук оригінальної суми дубліката.
+        rows_data: (опціонально) вже прочитані рядки сторінки (результат _PAGE_ROWS_JS);
+            дозволяє розбирати їх, поки браузер завантажує наступну сторінку.
 
     Returns:
-        Dict[int, List[Dict[str, Any]]]: Словник, де ключ - сума, 
-        значення - список об'єктів {'code': str, 'status': str, 'amount': int}.
+        Dict[int, List[CodeObj]]: Словник, де ключ - сума, 
+        значення - список об'єктів CodeObj(code, status).
         Неактивні коди додаються на початок списку, активні - в кінець.
     """
     
@@ -1082,42 +1290,33 @@ def get_codes_from_current_page(
     else:
         duplicates_info_local = duplicates_info
         using_external_duplicates = True
+    
+    code_to_amount_local = code_to_amount if code_to_amount is not None else {}
 
-    codes_by_amount = {}
+    # Неактивні та активні коди збираємо в окремі списки (append - O(1)),
+    # а злиття "неактивні першими" робимо один раз в кінці
+    inactive_by_amount = defaultdict(list)
+    active_by_amount = defaultdict(list)
     page_codes_count = 0
+    total_active = 0
+    total_inactive = 0
     
     try:
         logger.debug("🚀 Починаємо оптимізований збір даних з таблиці...")
         
         # --- Основна оптимізація: отримуємо всі дані за один запит ---
-        # Селектор для всіх видимих рядків тіла таблиці, що містять дані
-        rows_selector = 'table#datagrid tbody tr:visible:not(.no-data)'
-
-        # Використовуємо evaluate_all для отримання даних з усіх рядків одразу
-        rows_data = iframe.locator(rows_selector).evaluate_all("""
-        rows => rows.map(row => {
-            const cells = Array.from(row.querySelectorAll('td'));
-            
-            // Мінімальна кількість комірок для валідного рядка
-            if (cells.length < 5) { 
-                return null; 
-            }
-            
-            // Індекси комірок (можуть відрізнятися, потрібно адаптувати):
-            // 0 - ID, 1 - Назва, 2 - Статус, 3 - Код, 4 - Сума
-            const statusTextRaw = cells[2]?.innerText?.trim() || '';
-            const codeTextRaw = cells[3]?.innerText?.trim() || '';
-            const amountTextRaw = cells[4]?.innerText?.trim() || '';
-            
-            return {
-                statusText: statusTextRaw,
-                codeText: codeTextRaw,
-                amountText: amountTextRaw
-            };
-        }).filter(Boolean) // Видаляємо null значення (невалідні рядки)
-        """)
+        if rows_data is None:
+            rows_data = iframe.evaluate(_PAGE_ROWS_JS)
         
         logger.debug(f"📥 Отримано дані з {len(rows_data)} потенційних рядків таблиці.")
+        
+        # Рівень логування перевіряємо один раз, а не форматуємо debug-рядки для кожного рядка
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        # Методи, що викликаються для кожного рядка, прив'язуємо до локальних імен
+        search_amount = _AMOUNT_RE.search
+        add_code = all_codes_set_local.add
+        record_code_amount = code_to_amount_local.setdefault
 
         # --- Обробляємо отримані дані в Python ---
         for i, row_data in enumerate(rows_data):
@@ -1134,7 +1333,8 @@ def get_codes_from_current_page(
                 code = code_raw.strip()
                 
                 # Додаткове логування для діагностики формату кодів
-                logger.debug(f"Аналіз коду: '{code}' (початок: '{code[:10]}'...)")
+                if debug_enabled:
+                    logger.debug(f"Аналіз коду: '{code}' (початок: '{code[:10]}'...)")
                 
                 # Перевіряємо, чи код починається з 'BON' або має інший формат
                 if not code.startswith('BON'):
@@ -1146,25 +1346,22 @@ def get_codes_from_current_page(
                 status_text_normalized = status_text_raw.strip().lower()
                 
                 # Розширена логіка розпізнавання статусів
-                active_keywords = ['так', 'yes', 'активний', 'active', 'активен', 'true', '1', 'включен', 'enabled']
-                inactive_keywords = ['ні', 'no', 'неактивний', 'inactive', 'неактивен', 'false', '0', 'выключен', 'disabled', 'вимкнено', 'вимкнений']
-                
                 is_active = None
                 
-                # Спочатку перевіряємо точні збіги
-                if status_text_normalized in active_keywords:
+                # Спочатку перевіряємо точні збіги (O(1) по frozenset)
+                if status_text_normalized in _ACTIVE_STATUS_SET:
                     is_active = True
-                elif status_text_normalized in inactive_keywords:
+                elif status_text_normalized in _INACTIVE_STATUS_SET:
                     is_active = False
                 else:
                     # Якщо точного збігу немає, шукаємо часткові збіги
-                    for keyword in active_keywords:
+                    for keyword in _ACTIVE_STATUS_KEYWORDS:
                         if keyword in status_text_normalized:
                             is_active = True
                             break
                     
                     if is_active is None:
-                        for keyword in inactive_keywords:
+                        for keyword in _INACTIVE_STATUS_KEYWORDS:
                             if keyword in status_text_normalized:
                                 is_active = False
                                 break
@@ -1180,11 +1377,11 @@ def get_codes_from_current_page(
                 # Додаткове логування для діагностики
                 if not is_active:
                     logger.info(f"🔍 Знайдено НЕАКТИВНИЙ код: {code} (статус: '{status_text_raw}')")
-                else:
+                elif debug_enabled:
                     logger.debug(f"🔍 Знайдено активний код: {code} (статус: '{status_text_raw}')")
 
                 # --- Обробка суми ---
-                amount_match = re.search(r'(\d+)', amount_text_raw)
+                amount_match = search_amount(amount_text_raw)
                 if not amount_match:
                     logger.debug(f" ⚠️ НЕ РОЗПІЗНАНО СУМУ: для коду {code} (колонка: '{amount_text_raw}')")
                     continue
@@ -1196,13 +1393,8 @@ def get_codes_from_current_page(
                 if code in all_codes_set_local:
                     is_duplicate = True
                     if code not in duplicates_info_local:
-                        # Знаходимо оригінальну суму цього коду з вже зібраних даних
-                        original_amount = None
-                        for check_amount, check_code_objects in codes_by_amount.items():
-                            # Шукаємо код серед об'єктів
-                            if any(obj['code'] == code for obj in check_code_objects):
-                                original_amount = check_amount
-                                break
+                        # Оригінальна сума коду - з зворотного індексу (O(1))
+                        original_amount = code_to_amount_local.get(code)
                         
                         if original_amount is not None:
                             duplicates_info_local[code] = [original_amount]
@@ -1215,30 +1407,25 @@ def get_codes_from_current_page(
                     if amount not in duplicates_info_local[code]:
                         duplicates_info_local[code].append(amount)
                     
-                    # Логування дубліката
-                    if len(set(duplicates_info_local[code])) > 1:
-                        logger.error(f"❌ КРИТИЧНИЙ ДУБЛІКАТ: {code} має РІЗНІ СУМИ: {sorted(list(set(duplicates_info_local[code])))} грн! Поточна: {amount} грн")
+                    # Логування дубліката (список сум вже без повторів - див. перевірку вище)
+                    if len(duplicates_info_local[code]) > 1:
+                        logger.error(f"❌ КРИТИЧНИЙ ДУБЛІКАТ: {code} має РІЗНІ СУМИ: {sorted(duplicates_info_local[code])} грн! Поточна: {amount} грн")
 
-                # --- Додаємо код до множини унікальних (якщо використовуємо локальну) ---
-                if not using_external_set:
-                    all_codes_set_local.add(code)
+                # --- Додаємо код до множини унікальних та зворотного індексу ---
+                # (зовнішня множина теж поповнюється, інакше дублікати між
+                # сторінками не виявлялися б)
+                add_code(code)
+                record_code_amount(code, amount)
 
-                # --- Додаємо код до основного словника з сортуванням ---
-                if amount not in codes_by_amount:
-                    codes_by_amount[amount] = []
-                
-                code_obj = {
-                    'code': code,
-                    'status': status_str,
-                    'amount': amount
-                }
+                # --- Додаємо код до списку відповідного статусу ---
+                code_obj = CodeObj(code, status_str)
 
-                # Сортуємо: неактивні коди першими, потім активні
-                # (як в оригіналі: insert(0) для неактивних, append для активних)
                 if not is_active:
-                    codes_by_amount[amount].insert(0, code_obj) # Неактивні на початок
+                    inactive_by_amount[amount].append(code_obj)
+                    total_inactive += 1
                 else:
-                    codes_by_amount[amount].append(code_obj) # Активні в кінець
+                    active_by_amount[amount].append(code_obj)
+                    total_active += 1
 
                 page_codes_count += 1
 
@@ -1246,21 +1433,17 @@ def get_codes_from_current_page(
                 logger.debug(f"Помилка обробки рядка {i}: {e}")
                 continue # Продовжуємо з наступним рядком
 
-        # Детальна статистика по статусах
-        total_active = 0
-        total_inactive = 0
-        for amount_codes in codes_by_amount.values():
-            for code_obj in amount_codes:
-                if code_obj['status'] == 'active':
-                    total_active += 1
-                else:
-                    total_inactive += 1
-
+        # Детальна статистика по статусах (лічильники ведуться під час додавання)
         logger.info(f"✅ Сторінку оброблено. Знайдено {page_codes_count} BON кодів:")
         logger.info(f"   🟢 Активних: {total_active}")
         logger.info(f"   🔴 Неактивних: {total_inactive}")
         
-        # Повертаємо коди, знайдені на цій конкретній сторінці
+        # Повертаємо коди, знайдені на цій конкретній сторінці:
+        # для кожної суми неактивні коди першими, потім активні
+        codes_by_amount = {}
+        for amount in (*inactive_by_amount, *active_by_amount):
+            if amount not in codes_by_amount:
+                codes_by_amount[amount] = inactive_by_amount.get(amount, []) + active_by_amount.get(amount, [])
         return codes_by_amount
 
     except Exception as e:
@@ -1268,7 +1451,79 @@ def get_codes_from_current_page(
         # У випадку критичної помилки повертаємо порожній результат
         return {}
     
-def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]:
+# JS: код першого рядка таблиці - "відбиток" поточної сторінки пагінації
+_FIRST_ROW_CODE_JS = """() => {
+    const cell = document.querySelector('table#datagrid tbody tr:first-child td:nth-child(4)');
+    return cell ? cell.innerText.trim() : '';
+}"""
+
+# JS: обхід усіх сторінок пагінації всередині iframe за один виклик.
+# Для кожної сторінки читає рядки (_PAGE_ROWS_JS), клікає "наступна" і чекає,
+# поки зміниться код першого рядка (не довше pageTimeout мс, з одним повторним кліком).
+# Повертає { pages: [рядки сторінки, ...], stalled, lastFirstCode }
+_SCRAPE_ALL_PAGES_JS = """async (pageTimeout) => {
+    const readRows = """ + _PAGE_ROWS_JS + """;
+    const firstCode = """ + _FIRST_ROW_CODE_JS + """;
+    const waitForChange = (previousCode) => new Promise(resolve => {
+        const started = Date.now();
+        const check = () => {
+            const code = firstCode();
+            if (code !== '' && code !== previousCode) {
+                resolve(true);
+            } else if (Date.now() - started > pageTimeout) {
+                resolve(false);
+            } else {
+                setTimeout(check, 30);
+            }
+        };
+        check();
+    });
+    const nextButton = () => document.querySelector('.datagrid-pager .fl-l.r.active');
+
+    const pages = [];
+    while (true) {
+        pages.push(readRows());
+        const next = nextButton();
+        if (!next) {
+            return { pages: pages, stalled: false, lastFirstCode: '' };
+        }
+        const previousCode = firstCode();
+        next.click();
+        if (!(await waitForChange(previousCode))) {
+            const retry = nextButton();
+            if (retry) {
+                retry.click();
+            }
+            if (!retry || !(await waitForChange(previousCode))) {
+                return { pages: pages, stalled: true, lastFirstCode: previousCode };
+            }
+        }
+    }
+}"""
+
+def _wait_for_first_row_change(iframe, previous_first_code, timeout=5000):
+    """
+    Чекає, поки код першого рядка таблиці відрізнятиметься від previous_first_code,
+    тобто поки завантажаться дані нової сторінки.
+    
+    Returns:
+        bool: чи змінилася сторінка до таймауту
+    """
+    try:
+        iframe.wait_for_function(
+            """(previousCode) => {
+                const cell = document.querySelector('table#datagrid tbody tr:first-child td:nth-child(4)');
+                const code = cell ? cell.innerText.trim() : '';
+                return code !== '' && code !== previousCode;
+            }""",
+            arg=previous_first_code,
+            timeout=timeout
+        )
+        return True
+    except Exception:
+        return False
+
+def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[CodeObj]]:
     """
     Отримує всі BON коди з поточної таблиці (після застосування фільтрів),
     обробляючи всі сторінки пагінації.
@@ -1283,7 +1538,7 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
     """
     # Ініціалізуємо codes_by_amount на початку для уникнення помилок
     codes_by_amount = {}
-    duplicates_info = {} # Ініціалізуємо тут, щоб була доступна в finally
+    duplicates_info = {} # Заповнюється під час збору (дублікати обробляються в циклі)
 
     try:
         logger.info("📋 ПОЧАТОК збору всіх BON кодів з відфільтрованої таблиці (з усіх сторінок)...")
@@ -1292,30 +1547,38 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
         pager_text = iframe.locator('.datagrid-pager .pages').first.inner_text().strip()
         logger.info(f"📄 Інформація про пагінацію: {pager_text}")
 
-        # Зменшена пауза для стабілізації в HEADED режимі
-        headed_mode = os.getenv('PLAYWRIGHT_HEADED', 'True').lower() in ['true', '1', 'yes']
-        if headed_mode:
-            logger.info("🖥️ HEADED режим: пауза 0.5 сек для стабілізації...")
-            time.sleep(0.5) # Зменшую з 2 сек до 0.5 сек
+        # Стабілізація в HEADED режимі: чекаємо, поки в таблиці з'являться рядки
+        # (не довше 0.5 сек, як і попередня фіксована пауза)
+        if _HEADED_MODE:
+            logger.info("🖥️ HEADED режим: очікуємо рядки таблиці для стабілізації...")
+            try:
+                iframe.wait_for_selector('table#datagrid tbody tr', state='attached', timeout=500)
+            except Exception:
+                logger.debug("Рядки таблиці не з'явилися за 0.5 сек, продовжуємо")
 
         # Використовуємо Set для запобігання дублікатів
         all_codes_set: Set[str] = set() # Для відстеження всіх унікальних кодів
-        current_page = 1
-        has_next_page = True
+        code_to_amount: Dict[str, int] = {} # Зворотний індекс: код -> сума першої появи
+        # Накопичувальні лічильники статусів по сумах - фінальна статистика
+        # береться з них без повторного проходу по всіх кодах
+        active_by_amount: Dict[int, int] = defaultdict(int)
+        inactive_by_amount: Dict[int, int] = defaultdict(int)
+        # Порядковий розподіл по сумах логуємо лише на явний запит - фінальний підсумок лишається
+        per_page_logging = CONFIG.get('verbose_per_page_logging', False)
+        current_page = 0
         total_processed_rows = 0
 
-        while has_next_page:
-            logger.info(f"📄 Обробка сторінки {current_page}...")
-
-            # --- Виклик ОПТИМІЗОВАНОЇ функції для поточної сторінки ---
+        def collect_page(rows_data, page_number):
+            """Розбирає вже прочитані рядки однієї сторінки та додає їх у загальний словник."""
             page_codes = get_codes_from_current_page(
                 iframe, 
                 all_codes_set=all_codes_set, 
                 duplicates_info=duplicates_info, 
-                sort_order="asc" # або передавати ззовні, якщо потрібно
+                sort_order="asc", # або передавати ззовні, якщо потрібно
+                code_to_amount=code_to_amount,
+                rows_data=rows_data
             )
-            page_codes_count = sum(len(codes) for codes in page_codes.values())
-            total_processed_rows += page_codes_count
+            page_codes_count = 0
 
             # --- Об'єднуємо результати з поточної сторінки в загальний словник ---
             for amount, code_objects in page_codes.items():
@@ -1324,80 +1587,45 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
                 # Додаємо коди, зберігаючи їхню відсортовану черговість (неактивні спочатку)
                 codes_by_amount[amount].extend(code_objects)
 
-            # --- Логування стану сторінки ---
-            logger.info(f" 💰 Сторінка {current_page}: оброблено {page_codes_count} кодів")
-            for amount, codes in page_codes.items():
-                count = len(codes)
-                active_count = sum(1 for obj in codes if obj['status'] == 'active')
+                # Оновлюємо лічильники (та за потреби логуємо стан сторінки) в тому ж проході
+                count = len(code_objects)
+                page_codes_count += count
+                active_count = sum(1 for obj in code_objects if obj.status == 'active')
                 inactive_count = count - active_count
-                logger.info(f" 💰 {amount} грн: {active_count} активних + {inactive_count} неактивних = {count} всього")
-
-            logger.info(f"📝 Загальна кількість унікальних кодів після сторінки {current_page}: {len(all_codes_set)}")
-
-            # --- Перевіряємо наявність наступної сторінки ---
-            # Оновлений код для знаходження стрілки "вправо" для пагінації
-            next_page_button = iframe.locator('.datagrid-pager .fl-l.r.active').first
-            has_next_page = next_page_button.count() > 0
+                active_by_amount[amount] += active_count
+                inactive_by_amount[amount] += inactive_count
+                if per_page_logging:
+                    logger.info(f" 💰 {amount} грн: {active_count} активних + {inactive_count} неактивних = {count} всього")
+
+            logger.info(f" 💰 Сторінка {page_number}: оброблено {page_codes_count} кодів")
+            logger.info(f"📝 Загальна кількість унікальних кодів після сторінки {page_number}: {len(all_codes_set)}")
+            return page_codes_count
+
+        # --- Уся пагінація одним evaluate: JS сам гортає сторінки та збирає рядки ---
+        # Якщо якась сторінка не завантажилась вчасно (навіть після повторного кліку),
+        # JS повертає вже зібране з ознакою stalled; тоді чекаємо ще раз з Python
+        # і продовжуємо з поточної сторінки
+        while True:
+            scrape = iframe.evaluate(_SCRAPE_ALL_PAGES_JS, 5000)
+            for page_rows in scrape['pages']:
+                current_page += 1
+                logger.info(f"📄 Обробка сторінки {current_page}...")
+                total_processed_rows += collect_page(page_rows, current_page)
 
-            # Виводимо інформацію про пагінацію
-            if has_next_page:
-                logger.info(f"📑 Є наступна сторінка після {current_page}")
-            else:
+            if not scrape['stalled']:
                 logger.info(f"📑 Це остання сторінка ({current_page})")
+                break
 
-            if has_next_page:
-                # --- Перед переходом зберігаємо інформацію про поточну сторінку для порівняння ---
-                previous_page_info = iframe.locator('.datagrid-pager .pages').first.inner_text().strip()
-                logger.info(f"📑 Поточний стан пагінації перед переходом: {previous_page_info}")
-
-                # Для статистики рахуємо кількість кодів до переходу
-                previous_all_codes_count = len(all_codes_set)
-                logger.info(f"📊 Кількість унікальних кодів перед переходом: {previous_all_codes_count}")
-
-                # --- Клік на кнопку наступної сторінки ---
-                try:
-                    next_page_button.click()
-                    logger.info("➡️ Клік по кнопці 'наступна сторінка'...")
-
-                    # --- Очікування завантаження нової сторінки ---
-                    try:
-                        # Очікуємо, поки loader зникне
-                        loader = iframe.locator('#datagrid-loader')
-                        loader.wait_for(state='hidden', timeout=5000)
-                        logger.info("✅ Лоадер прихований, сторінка завантажена")
-                    except Exception:
-                        logger.info("📊 Лоадер не знайдено, використовуємо альтернативний метод очікування")
-                        # Альтернативний метод - чекаємо на стабілізацію мережевої активності
-                        iframe.page.wait_for_load_state('networkidle', timeout=3000)
-
-                    # --- Перевіряємо, що сторінка дійсно змінилася ---
-                    new_page_info = iframe.locator('.datagrid-pager .pages').first.inner_text().strip()
-                    logger.info(f"📑 Поточний стан пагінації після переходу: {new_page_info}")
-
-                    # Порівнюємо інформацію про сторінку до і після переходу
-                    if previous_page_info == new_page_info:
-                        logger.warning(f"⚠️ ПРОБЛЕМА ПАГІНАЦІЇ! Інформація про сторінку не змінилася після переходу!")
-                        # Спробуємо ще раз
-                        logger.info(f"🔄 Спроба повторного кліку на кнопку наступної сторінки...")
-                        if next_page_button.count() > 0:
-                            next_page_button.click()
-                            time.sleep(2) # Збільшимо затримку для надійності
-                        else:
-                            logger.error(f"❌ Кнопка наступної сторінки зникла при повторній спробі!")
-                            break # Виходимо з циклу, якщо кнопка зникла
-
-                except Exception as click_error:
-                    logger.error(f"❌ Помилка при переході на наступну сторінку: {click_error}")
-                    break # Виходимо з циклу в разі критичної помилки
-
-                current_page += 1
-            # --- Кінець блоку переходу на наступну сторінку ---
+            logger.warning(f"⚠️ ПРОБЛЕМА ПАГІНАЦІЇ! Сторінка {current_page + 1} не завантажилась вчасно")
+            if not _wait_for_first_row_change(iframe, scrape['lastFirstCode']):
+                logger.error("❌ Сторінка так і не змінилася, завершуємо збір")
+                break
 
         # --- Підсумок збору ---
         logger.info("✅ ЗБІР ВСІХ СТОРІНОК ЗАВЕРШЕНО!")
         logger.info(f"📊 ПІДСУМОК: Загалом знайдено {len(all_codes_set)} унікальних BON промокодів")
-        total_codes = sum(len(codes) for codes in codes_by_amount.values())
-        logger.info(f"📊 ПІДСУМОК: Загалом оброблено {total_codes} BON промокодів (включаючи активні та неактивні)")
+        # Кожен оброблений рядок потрапляє в codes_by_amount, тож окремий підрахунок не потрібен
+        logger.info(f"📊 ПІДСУМОК: Загалом оброблено {total_processed_rows} BON промокодів (включаючи активні та неактивні)")
         logger.info(f"📊 ПІДСУМОК: Загалом оброблено {total_processed_rows} рядків")
         logger.info(f"📚 ПІДСУМОК: Загалом оброблено {current_page} сторінок пагінації")
 
@@ -1407,8 +1635,8 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
         amounts_with_codes = []
         
         for amount, code_objects in codes_by_amount.items():
-            active_count = sum(1 for obj in code_objects if obj['status'] == 'active')
-            inactive_count = len(code_objects) - active_count
+            active_count = active_by_amount[amount]
+            inactive_count = inactive_by_amount[amount]
             total_active_final += active_count
             total_inactive_final += inactive_count
             
@@ -1427,10 +1655,12 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
         # --- ВАЛІДАЦІЯ ДУБЛІКАТІВ ---
         if duplicates_info:
             logger.info(f"🔍 Виявлено {len(duplicates_info)} унікальних кодів з дублікатами!")
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
             for code, amounts in duplicates_info.items():
-                if len(set(amounts)) > 1: # Перевірка на справжній дублікат
-                    logger.error(f"❌ КРИТИЧНИЙ ДУБЛІКАТ: {code} має РІЗНІ СУМИ: {sorted(list(set(amounts)))} грн!")
-                else:
+                distinct_amounts = set(amounts)
+                if len(distinct_amounts) > 1: # Перевірка на справжній дублікат
+                    logger.error(f"❌ КРИТИЧНИЙ ДУБЛІКАТ: {code} має РІЗНІ СУМИ: {sorted(distinct_amounts)} грн!")
+                elif debug_enabled:
                     # Можливо, це просто повторна зустріч того ж коду-суми
                     logger.debug(f"🔍 Повторний код (можливо дублікат): {code} для суми {amounts[0]} грн")
             logger.info("✅ ОБРОБКА ДУБЛІКАТІВ ЗАВЕРШЕНА!")
@@ -1442,23 +1672,6 @@ def get_all_bon_codes_with_pagination(iframe) -> Dict[int, List[Dict[str, Any]]]
     except Exception as e:
         logger.error(f"❌ Помилка при зборі BON кодів: {e}")
         return {}
-    finally:
-        # Виконуємо ВАЛІДАЦІЮ ДУБЛІКАТІВ НАВІТЬ ЯКЩО БУЛА ПОМИЛКА
-        # (якщо codes_by_amount не порожній)
-        try:
-            if codes_by_amount: # Тепер codes_by_amount завжди визначений
-                logger.info("🔍 Перевірка дублікатів після збору всіх кодів...")
-                # Передаємо інформацію про дублікати, якщо вона є
-                if duplicates_info:
-                    logger.debug(f"📊 Передаємо інформацію про {len(duplicates_info)} дублікатів до функції валідації")
-                # --- Виклик функції валідації (якщо вона є) ---
-                # from ... import validate_duplicates_after_collection
-                # codes_by_amount = validate_duplicates_after_collection(codes_by_amount, duplicates_info, iframe)
-                # logger.debug("🔍 Функція validate_duplicates_after_collection() завершена")
-        except Exception as validation_error:
-            logger.error(f"❌ Помилка при валідації дублікатів: {validation_error}")
-        # Завжди повертаємо codes_by_amount (навіть якщо порожній)
-        # return codes_by_amount # Не повертаємо тут, тому що return буде в try блоці
 
 # Створюємо псевдонім для зворотної сумісності
 get_all_bon_codes_from_table = get_all_bon_codes_with_pagination
@@ -1529,25 +1742,24 @@ def set_table_rows_per_page(iframe, rows_count=160):
     try:
         logger.info(f"⚙️ Налаштування кількості рядків на сторінці: {rows_count}...")
         
-        # Знаходимо кнопку налаштувань (три крапки)
-        settings_button = iframe.locator('.button.settings')
-        if not settings_button.count():
+        # Клікаємо на кнопку налаштувань (три крапки). Наявність перевіряє сам клік
+        # з коротким таймаутом - без окремого запиту count()
+        settings_button = iframe.locator('.button.settings').first
+        try:
+            settings_button.click(timeout=1000)
+        except Exception:
             logger.warning("⚠️ Не знайдено кнопку налаштувань")
             return False
-        
-        # Клікаємо на кнопку налаштувань
-        settings_button.click()
         time.sleep(0.5)
         
-        # Шукаємо випадаючий список з кількістю рядків
-        rows_select = iframe.locator('#datagrid-perpage-select')
-        if not rows_select.count():
+        # Вибираємо максимальну кількість рядків у випадаючому списку
+        rows_select = iframe.locator('#datagrid-perpage-select').first
+        try:
+            rows_select.select_option(value=str(rows_count), timeout=1000)
+        except Exception:
             logger.warning("⚠️ Не знайдено селект з кількістю рядків")
             settings_button.click()  # закриваємо налаштування
             return False
-        
-        # Вибираємо максимальну кількість рядків
-        rows_select.select_option(value=str(rows_count))
         time.sleep(1.0)  # Чекаємо, поки таблиця перезавантажиться
         
         # Перевіряємо, чи застосувалися зміни
@@ -1569,6 +1781,24 @@ def set_table_rows_per_page(iframe, rows_count=160):
         logger.error(f"❌ Помилка при налаштуванні кількості рядків: {e}")
         return False
 
+# JS: клас індикатора сортування в заголовку колонки (null, якщо індикатора немає)
+_SORT_INDICATOR_CLASS_JS = """(header) => {
+    const indicator = header.querySelector('.sort-indicator');
+    return indicator ? (indicator.getAttribute('class') || '') : null;
+}"""
+
+# JS: чи змінився текст першого рядка таблиці відносно initialText
+_FIRST_ROW_TEXT_CHANGED_JS = """(initialText) => {
+    const row = document.querySelector('table#datagrid tbody tr');
+    return !!row && row.innerText !== initialText;
+}"""
+
+def _first_row_text(iframe) -> str:
+    """Повертає текст першого рядка таблиці одним evaluate ('' якщо рядків немає)."""
+    return iframe.evaluate(
+        "() => { const row = document.querySelector('table#datagrid tbody tr'); return row ? row.innerText : ''; }"
+    )
+
 def sort_table_by_amount(iframe, sort_order="asc"):
     """
     Сортує таблицю в адмін-панелі по розміру знижки (кліком на заголовок колонки).
@@ -1588,9 +1818,14 @@ def sort_table_by_amount(iframe, sort_order="asc"):
         pager_text = iframe.locator('.datagrid-pager .pages').first.inner_text().strip()
         logger.info(f"📄 Поточний стан пагінації перед сортуванням: {pager_text}")
         
-        # 1. Знаходимо заголовок "Розмір знижки" (колонка 4778)
-        amount_header = iframe.locator('#header_id_4778')
-        if not amount_header.count():
+        # 1. Знаходимо заголовок "Розмір знижки" (колонка 4778) і одразу читаємо
+        # клас індикатора сортування - наявність і стан одним запитом
+        amount_header = iframe.locator('#header_id_4778').first
+        # Локатор лоадера створюємо один раз і перевикористовуємо на кожному кліку
+        loader = iframe.locator('#datagrid-loader')
+        try:
+            sort_class = amount_header.evaluate(_SORT_INDICATOR_CLASS_JS, timeout=1000)
+        except Exception:
             logger.error("❌ Не знайдено заголовок 'Розмір знижки' для сортування")
             return False
 
@@ -1602,12 +1837,10 @@ def sort_table_by_amount(iframe, sort_order="asc"):
         # - для зростання — один клік (якщо ще не встановлено)
         # - для спадання — два кліки (один для зростання, другий для спадання)
         
-        # Спочатку перевіряємо поточний стан сортування
-        sort_indicator = amount_header.locator('.sort-indicator')
+        # Поточний стан сортування (клас індикатора прочитано разом із пошуком заголовка)
         current_sort_state = "none"  # none, asc, desc
         
-        if sort_indicator.count() > 0:
-            sort_class = sort_indicator.get_attribute('class') or ""
+        if sort_class is not None:
             if 'sort-up' in sort_class:
                 current_sort_state = "asc"
             elif 'sort-down' in sort_class:
@@ -1637,10 +1870,7 @@ def sort_table_by_amount(iframe, sort_order="asc"):
 
             # Зберігаємо початковий стан першого рядка для перевірки змін
             try:
-                initial_first_row = iframe.locator('table#datagrid tbody tr').first
-                initial_row_text = ""
-                if initial_first_row.count() > 0:
-                    initial_row_text = initial_first_row.inner_text()
+                initial_row_text = _first_row_text(iframe)
             except Exception:
                 initial_row_text = ""
             logger.info(f"👆 Клік {click_num + 1}/{clicks_needed} на заголовок...")
@@ -1652,7 +1882,6 @@ def sort_table_by_amount(iframe, sort_order="asc"):
             
             # Спочатку чекаємо появу лоадера, якщо він є
             try:
-                loader = iframe.locator('#datagrid-loader')
                 if loader.count() > 0:
                     logger.info("🔄 Чекаємо появу лоадера...")
                     loader.wait_for(state='visible', timeout=2000)
@@ -1667,41 +1896,15 @@ def sort_table_by_amount(iframe, sort_order="asc"):
             except Exception as loader_error:
                 logger.info(f"⚠️ Не вдалося відстежити лоадер: {loader_error}")
                 
-                # Резервний метод - перевірка змін вмісту таблиці
+                # Резервний метод - браузер сам чекає, поки зміниться перший рядок таблиці
+                # (один wait_for_function замість опитування з Python)
                 logger.info("🔄 Використовуємо резервний метод очікування...")
-                sorting_completed = False
-                max_attempts = 30  # Збільшуємо кількість спроб (3 секунди)
-                
-                for attempt in range(max_attempts):
-                    try:
-                        time.sleep(0.1)  # Коротка пауза між перевірками
-                        
-                        # Перевіряємо, чи змінився вміст першого рядка (індикатор сортування)
-                        current_first_row = iframe.locator('table#datagrid tbody tr').first
-                        if current_first_row.count() > 0:
-                            current_row_text = current_first_row.inner_text()
-                            
-                            # Якщо вміст змінився або минуло достатньо часу
-                            if current_row_text != initial_row_text or attempt >= 15:
-                                # Додаткова перевірка на стабільність (три рази підряд однаковий результат)
-                                time.sleep(0.3)
-                                stable_check1 = current_first_row.inner_text() if current_first_row.count() > 0 else ""
-                                time.sleep(0.2)
-                                stable_check2 = current_first_row.inner_text() if current_first_row.count() > 0 else ""
-                                
-                                if stable_check1 == stable_check2 == current_row_text:
-                                    sorting_completed = True
-                                    logger.info(f"✅ Сортування завершено після {attempt + 1} спроб ({(attempt + 1) * 0.1:.1f} сек)")
-                                    break
-                                    
-                    except Exception as wait_error:
-                        logger.debug(f"Помилка при перевірці стану таблиці (спроба {attempt + 1}): {wait_error}")
-                        continue
-                
-                if not sorting_completed:
-                    logger.warning("⚠️ Не вдалося точно визначити завершення сортування, додаємо фінальну паузу")
-                    # Фінальна пауза для надійності
-                    time.sleep(1.5)  # Збільшуємо час очікування
+                try:
+                    iframe.wait_for_function(_FIRST_ROW_TEXT_CHANGED_JS, arg=initial_row_text, timeout=2000)
+                    logger.info("✅ Перший рядок таблиці змінився - сортування завершено")
+                except Exception:
+                    # Порядок першого рядка міг і не змінитися (наприклад, однакові суми)
+                    logger.info("ℹ️ Перший рядок не змінився за 2 сек, вважаємо сортування завершеним")
         
         # Перевіряємо стан таблиці після сортування
         new_pager_text = iframe.locator('.datagrid-pager .pages').first.inner_text().strip()
@@ -1714,9 +1917,8 @@ def sort_table_by_amount(iframe, sort_order="asc"):
             logger.info("✅ Стан пагінації змінився після сортування, дані перегруповані")
         
         # Перевірка напряму сортування (за зростанням чи за спаданням)
-        sort_indicator = amount_header.locator('.sort-indicator')
-        if sort_indicator.count() > 0:
-            sort_class = sort_indicator.get_attribute('class')
+        sort_class = amount_header.evaluate(_SORT_INDICATOR_CLASS_JS)
+        if sort_class is not None:
             actual_sort_state = "none"
             
             if 'sort-down' in sort_class:
@@ -1743,6 +1945,54 @@ def sort_table_by_amount(iframe, sort_order="asc"):
         logger.error(f"❌ Помилка при сортуванні таблиці по розміру знижки: {e}")
         return False
 
+def _backoff_delays(initial=0.02, factor=1.5, cap=0.25, total_budget=3.0):
+    """
+    Генерує паузи для опитування стану сторінки з експоненційним наростанням.
+    
+    Перші перевірки йдуть часто (швидкі операції завершуються за 1-2 спроби),
+    далі паузи ростуть до cap. Сума всіх пауз не перевищує total_budget.
+    
+    Args:
+        initial: перша пауза (сек)
+        factor: множник наступної паузи
+        cap: максимальна пауза (сек)
+        total_budget: загальний час очікування (сек)
+        
+    Yields:
+        float: тривалість чергової паузи
+    """
+    elapsed = 0.0
+    delay = initial
+    while elapsed < total_budget:
+        step = min(delay, cap, total_budget - elapsed)
+        yield step
+        elapsed += step
+        delay *= factor
+
+def _checked_count(iframe):
+    """
+    Повертає кількість вибраних чекбоксів у таблиці.
+    Рахує через один evaluate, без створення Playwright-локатора.
+    """
+    return iframe.evaluate(
+        "() => document.querySelectorAll('table#datagrid tbody input[type=checkbox]:checked').length"
+    )
+
+# JS: кількість рядків таблиці та вибраних чекбоксів одним запитом
+_TABLE_STATS_JS = """() => ({
+    rows: document.querySelectorAll('table#datagrid tbody tr').length,
+    checked: document.querySelectorAll('table#datagrid tbody input[type=checkbox]:checked').length
+})"""
+
+def _table_stats(iframe):
+    """
+    Повертає стан таблиці на межі фаз видалення одним evaluate.
+    
+    Returns:
+        dict: {'rows': кількість рядків, 'checked': кількість вибраних чекбоксів}
+    """
+    return iframe.evaluate(_TABLE_STATS_JS)
+
 def delete_all_promo_codes_on_page(iframe, page=None):
     """
     Видаляє всі промокоди на поточній сторінці, використовуючи головний чекбокс для вибору.
@@ -1754,6 +2004,7 @@ def delete_all_promo_codes_on_page(iframe, page=None):
     Returns:
         dict: результат операції з кількістю видалених кодів
     """
+    install_dialog_auto_accept(page)
     try:
         logger.info("🗑️ Видалення всіх промокодів на сторінці...")
         
@@ -1777,10 +2028,15 @@ def delete_all_promo_codes_on_page(iframe, page=None):
             try:
                 # Клікаємо на головний чекбокс для вибору всіх
                 master_checkbox.click()
-                time.sleep(0.5)  # Даємо час для оновлення інтерфейсу
                 
-                # Перевіряємо, чи всі чекбокси вибрані
-                selected_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+                # Чекаємо, поки інтерфейс позначить чекбокси: опитуємо з наростаючими
+                # паузами, не довше за попередню фіксовану паузу 0.5 сек
+                selected_count = _checked_count(iframe)
+                for delay in _backoff_delays(total_budget=0.5):
+                    if selected_count:
+                        break
+                    time.sleep(delay)
+                    selected_count = _checked_count(iframe)
                 logger.info(f"✅ Вибрано {selected_count} промокодів через головний чекбокс")
                 
                 if selected_count == 0:
@@ -1796,9 +2052,7 @@ def delete_all_promo_codes_on_page(iframe, page=None):
         
         # Видаляємо вибрані промокоди
         # Перевіряємо режим браузера для вибору оптимальної стратегії
-        headed_mode = os.getenv('PLAYWRIGHT_HEADED', 'true').lower() in ['true', '1', 'yes']
-        
-        if headed_mode:
+        if _HEADED_MODE:
             logger.info("🖥️ HEADED режим: використовуємо стандартну функцію видалення")
             delete_success = delete_selected_codes(iframe, page)
         else:
@@ -1811,7 +2065,7 @@ def delete_all_promo_codes_on_page(iframe, page=None):
         else:
             logger.error("❌ Помилка при видаленні вибраних промокодів")
             # Рахуємо, скільки реально було видалено
-            final_checked_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+            final_checked_count = _checked_count(iframe)
             actually_deleted = selected_count - final_checked_count
             return {"selected": selected_count, "deleted": actually_deleted, "success": False}
         
@@ -1835,6 +2089,7 @@ def delete_all_promo_codes_in_range(iframe, start_amount, end_amount, process_lo
         int: кількість видалених промокодів
     """
     total_deleted = 0
+    install_dialog_auto_accept(page)
     
     try:
         process_logger.info(f"🗑️ Видалення всіх промокодів в діапазоні {start_amount}-{end_amount} грн")
@@ -1853,7 +2108,7 @@ def delete_all_promo_codes_in_range(iframe, start_amount, end_amount, process_lo
             codes_to_delete = []
             for amount, code_objects in page_codes.items():
                 for obj in code_objects:
-                    codes_to_delete.append(obj['code'])
+                    codes_to_delete.append(obj.code)
             
             if not codes_to_delete:
                 process_logger.info("✅ Всі промокоди в діапазоні видалено")
@@ -1902,14 +2157,15 @@ def validate_duplicates_after_collection(codes_by_amount, duplicates_info=None,
     logger.info(f"📊 Отримано інформацію про {len(duplicates_info)} дублікатів під час збору")
     
     # Обробляємо кожен дублікат
-    duplicate_amounts_to_process = set()
-    for code, amounts in duplicates_info.items():
-        logger.info(f"  🔍 Дублікат: {code} для сум: {amounts}")
-        for amount in amounts:
-            duplicate_amounts_to_process.add(amount)
+    if logger.isEnabledFor(logging.INFO):
+        for code, amounts in duplicates_info.items():
+            logger.info(f"  🔍 Дублікат: {code} для сум: {amounts}")
+    duplicate_amounts_to_process = set().union(*duplicates_info.values())
     
     if duplicate_amounts_to_process:
-        logger.info(f"🔄 Потрібно переобробити коди для сум: {sorted(duplicate_amounts_to_process)}")
+        # Сортуємо один раз - той самий порядок і для логу, і для переобробки
+        duplicate_amounts_sorted = sorted(duplicate_amounts_to_process)
+        logger.info(f"🔄 Потрібно переобробити коди для сум: {duplicate_amounts_sorted}")
         
         # Перевіряємо наявність необхідних параметрів
         if not iframe:
@@ -1919,7 +2175,7 @@ def validate_duplicates_after_collection(codes_by_amount, duplicates_info=None,
         
         try:
             # Переобробляємо коди для кожної суми з дублікатами
-            for amount in sorted(duplicate_amounts_to_process):
+            for amount in duplicate_amounts_sorted:
                 logger.info(f"� Переобробляємо коди для суми {amount} грн через дублікати...")
                 
                 # Застосовуємо фільтр по сумі
@@ -1935,8 +2191,7 @@ def validate_duplicates_after_collection(codes_by_amount, duplicates_info=None,
                     logger.info(f"✅ Зібрано {len(fresh_code_objects)} свіжих кодів для суми {amount} грн")
                     # Переписуємо коди в основний масив
                     codes_by_amount[amount] = fresh_code_objects
-                    fresh_codes_list = [obj['code'] for obj in fresh_code_objects]
-                    logger.info(f"📝 Коди для суми {amount} грн оновлено: {fresh_codes_list}")
+                    logger.info(f"📝 Коди для суми {amount} грн оновлено: {[obj.code for obj in fresh_code_objects]}")
                 elif fresh_codes_dict:
                     logger.warning(f"⚠️ Не знайдено кодів для суми {amount} грн в результаті")
                     codes_by_amount[amount] = []
@@ -1960,25 +2215,25 @@ def _validate_final_duplicates(codes_by_amount):
     """
     Допоміжна функція для перевірки дублікатів у фінальному наборі кодів.
     """
-    # Збираємо всі коди в один список для аналізу
-    all_codes_list = []
+    # Швидкий шлях для звичайного випадку без дублікатів: якщо унікальних кодів
+    # стільки ж, скільки всього, детальний аналіз (Counter та індекс сум) не потрібен
+    total_before = sum(len(code_objects) for code_objects in codes_by_amount.values())
+    unique_codes = {obj.code for code_objects in codes_by_amount.values() for obj in code_objects}
+    if len(unique_codes) == total_before:
+        logger.info(f"📊 Загалом зібрано {total_before} кодів для аналізу дублікатів")
+        logger.info("✅ Дублікатів не знайдено у фінальному наборі")
+        return codes_by_amount
+    
+    # Один прохід по всіх кодах: лічильник появ та (сума, статус) для кожного коду
+    code_counts = Counter()
+    code_amounts = defaultdict(list)
     for amount, code_objects in codes_by_amount.items():
         for obj in code_objects:
-            all_codes_list.append((obj['code'], amount, obj['status']))
-    
-    logger.info(f"📊 Загалом зібрано {len(all_codes_list)} кодів для аналізу дублікатів")
-    
-    # Перевіряємо на дублікати
-    code_counts = {}
-    code_amounts = {}  # Зберігаємо суми для кожного коду
-    
-    for code, amount, status in all_codes_list:
-        if code in code_counts:
+            code = obj.code
             code_counts[code] += 1
-        else:
-            code_counts[code] = 1
-            code_amounts[code] = []
-        code_amounts[code].append((amount, status))
+            code_amounts[code].append((amount, obj.status))
+    
+    logger.info(f"📊 Загалом зібрано {total_before} кодів для аналізу дублікатів")
     
     # Знаходимо дублікати
     duplicates = {code: count for code, count in code_counts.items() if count > 1}
@@ -1989,38 +2244,43 @@ def _validate_final_duplicates(codes_by_amount):
         # Аналізуємо кожен дублікат
         for code, count in duplicates.items():
             amounts_statuses = code_amounts[code]
-            amounts = set(amt for amt, stat in amounts_statuses)
-            logger.warning(f"  🔄 Код {code} зустрічався {count} разів для сум: {sorted(amounts)}")
+            # Суми сортуємо один раз для обох повідомлень
+            sorted_amounts = sorted({amt for amt, stat in amounts_statuses})
+            logger.warning(f"  🔄 Код {code} зустрічався {count} разів для сум: {sorted_amounts}")
             
-            if len(amounts) > 1:
-                logger.error(f"  ❌ КРИТИЧНА ПОМИЛКА: Код {code} має різні суми: {sorted(amounts)}")
+            if len(sorted_amounts) > 1:
+                logger.error(f"  ❌ КРИТИЧНА ПОМИЛКА: Код {code} має різні суми: {sorted_amounts}")
             else:
-                logger.info(f"  ✅ Код {code} має однакову суму: {list(amounts)[0]} грн")
+                logger.info(f"  ✅ Код {code} має однакову суму: {sorted_amounts[0]} грн")
         
         # Очищаємо дублікати - залишаємо лише один екземпляр кожного коду
         logger.info("🧹 Очищаємо дублікати...")
         cleaned_codes_by_amount = {}
+        total_removed = 0
+        # Переписуємо лише суми, де є дубльовані коди; решту списків беремо як є
+        amounts_with_duplicates = {amount for code in duplicates for amount, _ in code_amounts[code]}
         
         for amount, code_objects in codes_by_amount.items():
-            # Збираємо унікальні коди, зберігаючи статус
-            seen_codes = set()
-            cleaned_objects = []
+            if amount not in amounts_with_duplicates:
+                cleaned_codes_by_amount[amount] = code_objects
+                continue
             
+            # Збираємо унікальні коди, зберігаючи статус: setdefault лишає перший
+            # екземпляр коду, а dict зберігає порядок вставки
+            deduped = {}
             for obj in code_objects:
-                code = obj['code']
-                if code not in seen_codes:
-                    seen_codes.add(code)
-                    cleaned_objects.append(obj)
+                deduped.setdefault(obj.code, obj)
+            cleaned_objects = list(deduped.values())
             
             cleaned_codes_by_amount[amount] = cleaned_objects
             
             removed_count = len(code_objects) - len(cleaned_objects)
+            total_removed += removed_count
             if removed_count > 0:
                 logger.info(f"  🧹 Для суми {amount} грн: видалено {removed_count} дублікатів, залишилось {len(cleaned_objects)} унікальних кодів")
         
         # Перевіряємо результат
-        total_after = sum(len(codes) for codes in cleaned_codes_by_amount.values())
-        total_before = sum(len(codes) for codes in codes_by_amount.values())
+        total_after = total_before - total_removed
         logger.info(f"✅ Очищення завершено: {total_before} → {total_after} кодів (видалено {total_before - total_after} дублікатів)")
         
         return cleaned_codes_by_amount
@@ -2029,53 +2289,159 @@ def _validate_final_duplicates(codes_by_amount):
         return codes_by_amount
 
 
-def select_specific_promo_codes_optimized(iframe, codes_to_select: List[str]) -> bool:
+# JS-фрагмент: рядки таблиці, закешовані на window.__promoRows між кроками вибору
+# та видалення. Кеш інвалідується, коли перший рядок від'єднано від DOM
+# (таблицю перемальовано після фільтрації чи видалення).
+_PROMO_ROWS_JS = """
+    const cachedRows = window.__promoRows;
+    const rows = (cachedRows && cachedRows.length && cachedRows[0].isConnected)
+        ? cachedRows
+        : (window.__promoRows = Array.from(document.querySelectorAll('table#datagrid tbody tr')));
+"""
+
+
+def select_specific_promo_codes_optimized(iframe, codes_to_select: Iterable[str]) -> bool:
+    """
+    Вибирає чекбокси для заданих кодів одним JS-запитом.
+    
+    Коди передаються в evaluate як аргумент (не вбудовуються в JS-код), тому
+    підходить будь-яка колекція, зокрема frozenset.
+    
+    Args:
+        iframe: iframe адмін-панелі
+        codes_to_select: коди для вибору (list, set або frozenset)
+        
+    Returns:
+        bool: True, якщо вибрано хоча б один чекбокс
+    """
+    if not codes_to_select:
+        return False
+    
     try:
-        # 1. Отримати всі коди з їхніми індексами (рядками) за один запит
-        rows_data = iframe.locator('table#datagrid tbody tr:visible:not(.no-data)').evaluate_all("""
-        rows => rows.map((row, index) => {
-            const codeCell = row.querySelector('td:nth-child(4)'); // 4-та колонка - код
+        # Пошук і вибір виконуються одним JS-запитом: Set кодів будується в браузері,
+        # тому назад повертається лише кількість вибраних чекбоксів і дельта
+        # ненайдених кодів, а не вся таблиця
+        result = iframe.evaluate("""(codes) => {
+            const wanted = new Set(codes);
+            const found = new Set();""" + _PROMO_ROWS_JS + """
+            let selected = 0;
+            rows.forEach(row => {
+                if (row.classList.contains('no-data') || row.offsetParent === null) {
+                    return;
+                }
+                const codeCell = row.querySelector('td:nth-child(4)'); // 4-та колонка - код
+                const code = codeCell ? codeCell.innerText.trim() : null;
+                if (!code || !wanted.has(code)) {
+                    return;
+                }
+                found.add(code);
+                const checkbox = row.querySelector('td:nth-child(1) input[type="checkbox"]');
+                if (checkbox) {
+                    if (!checkbox.checked) {
+                        checkbox.click();
+                    }
+                    selected++;
+                }
+            });
             return {
-                code: codeCell ? codeCell.innerText.trim() : null,
-                rowIndex: index
+                selected: selected,
+                notFound: [...wanted].filter(code => !found.has(code))
             };
-        })
-        """)
-        
-        # 2. Створити множину кодів для швидкого пошуку
-        codes_to_select_set = set(codes_to_select)
+        }""", list(codes_to_select))
         
-        # 3. Знайти індекси рядків, які потрібно вибрати
-        indices_to_select = [data['rowIndex'] for data in rows_data if data['code'] in codes_to_select_set]
+        selected = result['selected']
+        not_found = result['notFound']
+        if not_found:
+            logger.info(f"📋 Не знайдено на сторінці {len(not_found)} кодів: {', '.join(not_found[:10])}")
         
-        if not indices_to_select:
+        if not selected:
             logger.warning("⚠️ Жодного коду зі списку не знайдено на поточній сторінці.")
             return False
         
-        logger.info(f"🔍 Знайдено {len(indices_to_select)} кодів для вибору.")
-        
-        # 4. Виконати вибірку чекбоксів за індексами одним JS-запитом
-        # Припускаємо, що чекбокс є першим елементом td:nth-child(1) input[type='checkbox']
-        iframe.evaluate("""(indices) => {
-            const tableBody = document.querySelector('table#datagrid tbody');
-            const rows = tableBody.querySelectorAll('tr:visible:not(.no-data)');
-            indices.forEach(index => {
-                if (index >= 0 && index < rows.length) {
-                    const checkbox = rows[index].querySelector('td:nth-child(1) input[type="checkbox"]');
-                    if (checkbox && !checkbox.checked) {
-                        checkbox.click();
-                    }
-                }
-            });
-        }""", indices_to_select)
-        
-        logger.info(f"✅ Успішно вибрано {len(indices_to_select)} чекбоксів.")
+        logger.info(f"✅ Успішно вибрано {selected} чекбоксів.")
         return True
     
     except Exception as e:
         logger.error(f"❌ Помилка при оптимізованому виборі кодів: {e}")
         return False
 
+# JS-фрагмент: індекс код -> рядок (window.__codeMap), будується одним проходом
+# по таблиці, щоб пошук рядка для кожного коду був O(1) замість XPath-обходу
+_BUILD_CODE_MAP_JS = """
+    window.__codeMap = new Map();
+    rows.forEach(row => {
+        const codeCell = row.querySelector('td:nth-child(4)');
+        if (codeCell) {
+            window.__codeMap.set(codeCell.innerText.trim(), row);
+        }
+    });
+"""
+
+# JS: вибір чекбоксів для списку кодів - увесь цикл вибору одним запитом.
+# Будує window.__codeMap, для кожного коду знаходить рядок і клікає чекбокс (клік для
+# тригеру DOM подій, fallback через .checked), а в кінці рахує всі вибрані чекбокси.
+# Повертає { totalRows, selected, already, failed, notFound, checkedCount }
+_SELECT_CODES_JS = """(codes) => {""" + _PROMO_ROWS_JS + _BUILD_CODE_MAP_JS + """
+    const result = {
+        totalRows: rows.length,
+        selected: [],
+        already: [],
+        failed: [],
+        notFound: [],
+        checkedCount: 0
+    };
+    codes.forEach(code => {
+        const row = window.__codeMap.get(code);
+        if (!row || !row.isConnected) {
+            result.notFound.push(code);
+            return;
+        }
+        const checkbox = row.querySelector('input[type="checkbox"].datagrid-check-control')
+            || row.querySelector('input[type="checkbox"]');
+        if (!checkbox) {
+            result.failed.push(code);
+            return;
+        }
+        if (checkbox.checked) {
+            result.already.push(code);
+            return;
+        }
+        checkbox.click();
+        if (!checkbox.checked) {
+            // Грід веде власний облік вибору по кліку, тому checked не виставляємо напряму:
+            // прокручуємо до чекбокса і повторюємо справжній клік, потім - click-подію
+            checkbox.scrollIntoView({ block: 'center' });
+            checkbox.click();
+            if (!checkbox.checked) {
+                checkbox.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
+            }
+        }
+        (checkbox.checked ? result.selected : result.failed).push(code);
+    });
+    result.checkedCount = document.querySelectorAll('table#datagrid tbody input[type=checkbox]:checked').length;
+    return result;
+}"""
+
+# JS: які з переданих кодів присутні у поточному виді таблиці
+_CODES_PRESENT_JS = """(codes) => {
+    const wanted = new Set(codes);
+    const present = [];
+    document.querySelectorAll('table#datagrid tbody tr:not(.no-data)').forEach(row => {
+        const codeCell = row.querySelector('td:nth-child(4)');
+        if (codeCell) {
+            const code = codeCell.innerText.trim();
+            if (wanted.has(code)) {
+                present.push(code);
+            }
+        }
+    });
+    return present;
+}"""
+
+def _codes_present_in_table(iframe, codes) -> Set[str]:
+    """Повертає множину кодів з codes, які є в поточному виді таблиці (один evaluate)."""
+    return set(iframe.evaluate(_CODES_PRESENT_JS, list(codes)))
+
 def select_specific_promo_codes(iframe, promo_codes, page=None):
     """
     Вибирає конкретні промокоди через чекбокси.
@@ -2083,15 +2449,19 @@ def select_specific_promo_codes(iframe, promo_codes, page=None):
     
     Args:
         iframe: iframe адмін-панелі
-        promo_codes: список промокодів для вибору
+        promo_codes: ітерабельна колекція промокодів для вибору (порядок зберігається)
         page: основна сторінка
         
     Returns:
         int: кількість вибраних промокодів
     """
-    selected_count = 0
-    codes_to_find = set(promo_codes)
-    codes_not_found = []
+    # Один прохід: прибираємо повтори, зберігаючи порядок викликача (звіти про
+    # ненайдені/невибрані коди йдуть у тому ж порядку), і одразу маємо список для evaluate
+    codes_to_find = list(dict.fromkeys(promo_codes))
+    
+    if not codes_to_find:
+        logger.warning("⚠️ Список промокодів для вибору порожній")
+        return 0
     
     logger.info(f"☑️ Вибираємо {len(codes_to_find)} промокодів...")
 
@@ -2099,74 +2469,40 @@ def select_specific_promo_codes(iframe, promo_codes, page=None):
         logger.error("❌ Об'єкт 'page' не передано")
         return 0
 
-    # Спочатку перевіряємо, скільки рядків взагалі є в таблиці
+    # Пошук рядків, кліки по чекбоксах, fallback-и та фінальний підрахунок вибраних -
+    # одним запитом; в Python лише розбір результату
     try:
-        all_rows = iframe.locator('table#datagrid tbody tr')
-        total_rows = all_rows.count()
-        logger.info(f"📊 Всього рядків в таблиці: {total_rows}")
-        
-        if total_rows == 0:
-            logger.warning("⚠️ Таблиця порожня - неможливо вибрати жодного промокоду")
-            return 0
+        result = iframe.evaluate(_SELECT_CODES_JS, codes_to_find)
     except Exception as e:
-        logger.warning(f"⚠️ Помилка при перевірці таблиці: {e}")
-
-    for code_to_find in codes_to_find:
-        try:
-            # Шукаємо рядок з промокодом
-            row_locator = iframe.locator(f'//tr[td[4][normalize-space(.)="{code_to_find}"]]')
-            
-            if row_locator.count() == 0:
-                codes_not_found.append(code_to_find)
-                logger.warning(f"⚠️ Не знайдено рядок для: {code_to_find}")
-                continue
-
-            row = row_locator
-            logger.debug(f"  🎯 Знайдено рядок для: {code_to_find}")
-
-            # Шукаємо чекбокс
-            checkbox = row.locator('input[type="checkbox"].datagrid-check-control')
-            if checkbox.count() == 0:
-                checkbox = row.locator('input[type="checkbox"]')
+        logger.warning(f"❌ Помилка при виборі кодів: {e}")
+        return 0
 
-            if checkbox.count() > 0:
-                if not checkbox.is_checked():
-                    try:
-                        # Використовуємо .click() для тригеру DOM подій
-                        checkbox.click()
-                        time.sleep(0.05)  # Зменшую очікування з 0.1 на 0.05 сек
-                        
-                        if checkbox.is_checked():
-                            logger.debug(f"  ✅ Вибрано: {code_to_find}")
-                            selected_count += 1
-                        else:
-                            # Fallback через JavaScript
-                            checkbox.evaluate('element => element.checked = true')
-                            if checkbox.is_checked():
-                                selected_count += 1
-                                
-                    except Exception as e:
-                        logger.warning(f"  ❌ Помилка при виборі {code_to_find}: {e}")
-                        # Fallback через JavaScript
-                        try:
-                            checkbox.evaluate('element => element.checked = true')
-                            if checkbox.is_checked():
-                                selected_count += 1
-                        except Exception:
-                            pass
-                else:
-                    logger.debug(f"  ✓ Вже вибраний: {code_to_find}")
-                    selected_count += 1
-            else:
-                logger.warning(f"  ⚠️ Чекбокс не знайдено для: {code_to_find}")
+    codes_not_found = result['notFound']
+    total_rows = result['totalRows']
+    logger.info(f"📊 Всього рядків в таблиці: {total_rows}, з них шуканих кодів: {len(codes_to_find) - len(codes_not_found)}")
+    
+    if total_rows == 0:
+        logger.warning("⚠️ Таблиця порожня - неможливо вибрати жодного промокоду")
+        return 0
+    if len(codes_not_found) == len(codes_to_find):
+        logger.warning(f"⚠️ Жодного з {len(codes_to_find)} кодів немає в поточній таблиці")
+        return 0
 
-        except Exception as e:
-            logger.warning(f"❌ Помилка при обробці {code_to_find}: {e}")
-            continue
+    codes_failed = result['failed']
+    logger.info(
+        f"☑️ Вибрано {len(result['selected'])}, вже вибрано {len(result['already'])}, "
+        f"не вдалося {len(codes_failed)}, не знайдено {len(codes_not_found)}"
+    )
+    if codes_failed:
+        logger.warning(f"⚠️ Не вдалося вибрати: {', '.join(codes_failed[:10])}")
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for state in ('selected', 'already', 'failed'):
+            for code in result[state]:
+                logger.debug("  %s: %s", code, state)
             
-    # Фінальна перевірка
-    time.sleep(0.1)  # Зменшую очікування з 0.2 на 0.1 сек
-    final_checked_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+    # Фінальна кількість вибраних порахована в тому ж запиті (кліки по чекбоксах синхронні)
+    final_checked_count = result['checkedCount']
     
     # Логуємо результат
     logger.info(f"✅ Вибрано {final_checked_count} промокодів")
@@ -2177,6 +2513,166 @@ def select_specific_promo_codes(iframe, promo_codes, page=None):
 
     return final_checked_count
 
+# JS-хелпер: перевіряє всі селектори в браузері та клікає перший знайдений елемент.
+# Підтримує Playwright-подібний суфікс :has-text("..."), якого немає в CSS.
+_CLICK_FIRST_MATCH_JS = """(selectors) => {
+    for (const s of selectors) {
+        const m = s.match(/^(.*):has-text\\("(.*)"\\)$/);
+        let el = null;
+        try {
+            if (m) {
+                el = Array.from(document.querySelectorAll(m[1] || '*'))
+                    .find(e => (e.textContent || '').includes(m[2])) || null;
+            } else {
+                el = document.querySelector(s);
+            }
+        } catch (e) {
+            continue; // невалідний селектор - пропускаємо
+        }
+        if (el) {
+            el.click();
+            return s;
+        }
+    }
+    return null;
+}"""
+
+
+# JS: умова для wait_for_function - лоадер таблиці відсутній або прихований
+_LOADER_HIDDEN_JS = """() => {
+    const loader = document.querySelector('#datagrid-loader');
+    return !loader || loader.style.display === 'none' || loader.offsetParent === null;
+}"""
+
+# JS: видалення завершене - лоадер прихований і в таблиці не лишилось вибраних чекбоксів
+_DELETE_SETTLED_JS = """() => {
+    const loader = document.querySelector('#datagrid-loader');
+    const loaderHidden = !loader || loader.style.display === 'none' || loader.offsetParent === null;
+    return loaderHidden
+        && !document.querySelector('table#datagrid tbody input[type=checkbox]:checked');
+}"""
+
+# JS: рахує вибрані чекбокси та одразу викликає removeSelectedGrids() (якщо є що видаляти),
+# щоб кількість і дія виконувалися за один CDP-запит. З autoConfirm=true на час виклику
+# window.confirm підміняється, і confirmCalled повідомляє, що підтвердження вже відбулося.
+_REMOVE_SELECTED_JS = """async ({ autoConfirm, modalWaitMs }) => {""" + _PROMO_ROWS_JS + """
+    const selected = rows.filter(row => row.querySelector('input[type=checkbox]:checked')).length;
+    if (!selected) {
+        return { selected: 0, called: false, confirmCalled: false, modalConfirmed: false };
+    }
+    if (typeof removeSelectedGrids !== 'function') {
+        return { selected: selected, called: false, confirmCalled: false, modalConfirmed: false };
+    }
+    // confirm() або підтверджується прямо тут, або передається браузеру (діалог приймає
+    // обробник сторінки) - в обох випадках фіксуємо сам факт виклику
+    let confirmCalled = false;
+    const originalConfirm = window.confirm;
+    window.confirm = autoConfirm
+        ? () => { confirmCalled = true; return true; }
+        : (...args) => { confirmCalled = true; return originalConfirm.apply(window, args); };
+    try {
+        removeSelectedGrids();
+    } finally {
+        window.confirm = originalConfirm;
+    }
+    // Без confirm() панель показує власне модальне вікно - натискаємо його кнопку
+    // в цьому ж запиті, без окремого пошуку кнопки з Python
+    let modalConfirmed = false;
+    if (!confirmCalled) {
+        const deadline = Date.now() + modalWaitMs;
+        while (true) {
+            const button = document.querySelector('.confirm-modal__button--ok, #dialog-window .confirm-modal__button--ok');
+            if (button && button.getClientRects().length) {
+                button.click();
+                modalConfirmed = true;
+                break;
+            }
+            if (Date.now() >= deadline) break;
+            await new Promise(resolve => setTimeout(resolve, 30));
+        }
+    }
+    return { selected: selected, called: true, confirmCalled: confirmCalled, modalConfirmed: modalConfirmed };
+}"""
+
+
+# Селектори кнопок підтвердження та видалення (у порядку пріоритету) - константи модуля,
+# а не списки, що створюються на кожен виклик. *_ANY - ті самі селектори одним рядком,
+# щоб чекати появи будь-якої кнопки одним локатором
+_CONFIRM_SELECTORS = (
+    '.confirm-modal__button--ok',
+    'button:has-text("Підтвердити")',
+    '#dialog-window .confirm-modal__button--ok',
+)
+
+_HEADLESS_CONFIRM_SELECTORS = (
+    '.confirm-modal__button--ok',
+    'button:has-text("Підтвердити")',
+    'button:has-text("Так")',
+    'button:has-text("OK")',
+    '#dialog-window .confirm-modal__button--ok',
+    '.modal-footer button.btn-primary',
+    '.ui-dialog-buttonset button:first-child',
+    'button[onclick*="confirm"]',
+    '.dialog-confirm-button',
+)
+_HEADLESS_CONFIRM_SELECTOR_ANY = ', '.join(_HEADLESS_CONFIRM_SELECTORS)
+
+_DELETE_BUTTON_SELECTORS = (
+    'button[onclick*="removeSelectedGrids"]',
+    'input[onclick*="removeSelectedGrids"]',
+    'a[onclick*="removeSelectedGrids"]',
+    '.btn-delete',
+    '#delete-selected',
+    'button:has-text("Видалити")',
+    'input[value*="Видалити"]',
+    '[title*="Видалити"]',
+)
+
+
+def _click_first_matching(iframe, selectors):
+    """
+    Клікає перший елемент, що відповідає одному із селекторів, за один виклик evaluate.
+    
+    Args:
+        iframe: iframe адмін-панелі
+        selectors: список селекторів у порядку пріоритету
+        
+    Returns:
+        str | None: селектор, за яким знайдено елемент, або None
+    """
+    return iframe.evaluate(_CLICK_FIRST_MATCH_JS, list(selectors))
+
+# Стандартні діалоги (confirm/alert) приймає один постійний обробник на сторінку,
+# зареєстрований одразу після ініціалізації браузера, замість нового замикання на
+# кожне видалення. Лічильник діалогів ведеться окремо для кожної сторінки; функції
+# видалення порівнюють його до і після власного виклику, тож діалог з іншої сторінки
+# чи попередньої дії не вважається підтвердженням поточного видалення.
+# Наявність сторінки в словнику означає, що обробник уже встановлено
+_dialogs_accepted = weakref.WeakKeyDictionary()
+
+def _accept_dialog(page, dialog):
+    """Підтверджує стандартний діалог браузера і рахує його для сторінки."""
+    logger.info(f"💬 Отримано діалог: {dialog.message}")
+    dialog.accept()
+    _dialogs_accepted[page] = _dialogs_accepted.get(page, 0) + 1
+
+def _dialog_count(page):
+    """Кількість підтверджених діалогів сторінки."""
+    return _dialogs_accepted.get(page, 0)
+
+def install_dialog_auto_accept(page):
+    """
+    Реєструє постійний обробник, що автоматично підтверджує діалоги сторінки.
+    Ідемпотентна: кожна функція видалення викликає її для переданої сторінки.
+    
+    Args:
+        page: основна сторінка браузера
+    """
+    if page is None or page in _dialogs_accepted:
+        return
+    _dialogs_accepted[page] = 0
+    page.on('dialog', functools.partial(_accept_dialog, page))
+
 def delete_selected_codes(iframe, page=None):
     """
     Натискає кнопку видалення та обробляє діалоги підтвердження.
@@ -2192,72 +2688,53 @@ def delete_selected_codes(iframe, page=None):
     if not page:
         logger.error("❌ Об'єкт 'page' не передано, неможливо обробити діалоги підтвердження.")
         return False
+    install_dialog_auto_accept(page)
 
     try:
-        # Перевіряємо, чи є що видаляти
-        selected_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+        # Діалоги підтверджує постійний обробник сторінки (install_dialog_auto_accept)
+        dialogs_before = _dialog_count(page)
+
+        # Рахуємо вибрані коди та викликаємо removeSelectedGrids() одним запитом
+        removal = iframe.evaluate(_REMOVE_SELECTED_JS, {'autoConfirm': False, 'modalWaitMs': 1500})
+        selected_count = removal['selected']
         if selected_count == 0:
             logger.warning("⚠️ Немає вибраних промокодів для видалення")
             return False
             
         logger.info(f"🗑️ Видаляємо {selected_count} вибраних промокодів...")
-
-        # Налаштовуємо обробник стандартного діалогу
-        dialog_handled = False
-        def handle_dialog(dialog):
-            nonlocal dialog_handled
-            logger.info(f"💬 Отримано діалог: {dialog.message}")
-            dialog.accept()
-            dialog_handled = True
-            logger.info("✅ Діалог підтверджено")
         
-        page.once('dialog', handle_dialog)
-
-        # Викликаємо видалення через JavaScript
-        function_exists = iframe.evaluate('typeof removeSelectedGrids === "function"')
-        
-        if function_exists:
-            logger.info("�️ Викликаємо removeSelectedGrids()...")
-            iframe.evaluate('removeSelectedGrids()')
+        if removal['called']:
+            logger.info("🗑️ Викликано removeSelectedGrids()")
         else:
             logger.warning("⚠️ Функція removeSelectedGrids не знайдена!")
             return False
         
-        # Очікуємо появи модального вікна
-        time.sleep(0.5)
-        
-        # Шукаємо кнопку підтвердження
-        confirm_selectors = [
-            '.confirm-modal__button--ok',
-            'button:has-text("Підтвердити")',
-            '#dialog-window .confirm-modal__button--ok'
-        ]
-        
-        button_found = False
-        for selector in confirm_selectors:
-            confirm_buttons = iframe.locator(selector)
-            if confirm_buttons.count() > 0:
-                logger.info(f"✅ Знайдено кнопку підтвердження: {selector}")
-                confirm_buttons.nth(0).click()
+        # Стандартний confirm() блокує evaluate до підтвердження, тому на цей момент
+        # обробник вже спрацював. Модальне вікно (до 1.5 сек) підтверджує той самий evaluate.
+        if removal['confirmCalled'] or _dialog_count(page) > dialogs_before:
+            logger.info("✅ Стандартний діалог оброблено, модальне вікно не потрібне")
+        elif removal['modalConfirmed']:
+            logger.info("🎯 Кнопку 'Підтвердити' натиснуто!")
+        else:
+            # Модальне вікно не знайдено за відведений час - остання спроба за селекторами
+            matched_selector = _click_first_matching(iframe, _CONFIRM_SELECTORS)
+            if matched_selector:
+                logger.info(f"✅ Знайдено кнопку підтвердження: {matched_selector}")
                 logger.info("🎯 Кнопку 'Підтвердити' натиснуто!")
-                button_found = True
-                break
-        
-        if not button_found:
-            logger.info("⌨️ Кнопка не знайдена, пробуємо Enter...")
-            iframe.press('Enter')
-        
-        # Очікуємо завершення операції
-        time.sleep(1)
+            else:
+                logger.info("⌨️ Кнопка не знайдена, пробуємо Enter...")
+                iframe.press('Enter')
 
-        # Чекаємо оновлення таблиці
+        # Чекаємо оновлення таблиці: спочатку появи лоадера, потім його зникнення
+        loader = iframe.locator('#datagrid-loader')
         try:
-            iframe.locator('#datagrid-loader').wait_for(state='hidden', timeout=10000)
+            loader.wait_for(state='visible', timeout=1000)
+            loader.wait_for(state='hidden', timeout=10000)
         except Exception:
             pass  # Якщо лоадер не з'явився, продовжуємо
         
         # Перевіряємо результат
-        remaining_selected = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+        remaining_selected = _checked_count(iframe)
         
         if remaining_selected == 0:
             logger.info("✅ Всі вибрані промокоди успішно видалено!")
@@ -2282,6 +2759,7 @@ def delete_specific_promo_codes(iframe, promo_codes, page=None):
     Returns:
         dict: результат операції з кількістю видалених кодів
     """
+    install_dialog_auto_accept(page)
     try:
         logger.info(f"🎯 Видалення {len(promo_codes)} конкретних промокодів...")
         
@@ -2289,20 +2767,8 @@ def delete_specific_promo_codes(iframe, promo_codes, page=None):
             logger.warning("⚠️ Список промокодів порожній")
             return {"selected": 0, "deleted": 0, "success": False}
         
-        # Перевіряємо стан таблиці
-        try:
-            all_rows = iframe.locator('table#datagrid tbody tr')
-            total_rows = all_rows.count()
-            logger.info(f"📊 Всього рядків в таблиці: {total_rows}")
-            
-            if total_rows == 0:
-                logger.warning("⚠️ Таблиця порожня - неможливо видалити жодного промокоду")
-                return {"selected": 0, "deleted": 0, "success": False}
-                
-        except Exception as e:
-            logger.warning(f"⚠️ Помилка при перевірці таблиці: {e}")
-        
         # 1. Вибираємо промокоди через чекбокси
+        # (перевірка порожньої таблиці виконується в тому ж запиті, що й пошук кодів)
         selected_count = select_specific_promo_codes(iframe, promo_codes, page)
         
         if selected_count == 0:
@@ -2312,14 +2778,9 @@ def delete_specific_promo_codes(iframe, promo_codes, page=None):
         
         logger.info(f"✅ Вибрано {selected_count} промокодів з {len(promo_codes)} запланованих")
         
-        # Невелика пауза перед видаленням, щоб дати UI оновитись
-        time.sleep(0.5)
-
         # 2. Видаляємо вибрані промокоди
         # Перевіряємо режим браузера для вибору оптимальної стратегії
-        headed_mode = os.getenv('PLAYWRIGHT_HEADED', 'true').lower() in ['true', '1', 'yes']
-        
-        if headed_mode:
+        if _HEADED_MODE:
             logger.info("🖥️ HEADED режим: використовуємо стандартну функцію видалення")
             delete_success = delete_selected_codes(iframe, page)
         else:
@@ -2332,7 +2793,7 @@ def delete_specific_promo_codes(iframe, promo_codes, page=None):
         else:
             logger.error("❌ Помилка при видаленні вибраних промокодів")
             # Рахуємо, скільки реально було видалено
-            final_checked_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+            final_checked_count = _checked_count(iframe)
             actually_deleted = selected_count - final_checked_count
             return {"selected": selected_count, "deleted": actually_deleted, "success": False}
         
@@ -2341,6 +2802,29 @@ def delete_specific_promo_codes(iframe, promo_codes, page=None):
         return {"selected": 0, "deleted": 0, "success": False, "error": str(e)}
 
 
+def _delete_codes_in_current_view(iframe, codes, page=None) -> Set[str]:
+    """
+    Видаляє коди, видимі в поточному виді таблиці, одним викликом delete_specific_promo_codes.
+    
+    Рядки, що лишилися після видалення, не зсуваються на інші сторінки, тому повторна
+    перевірка того ж виду точно показує, які коди видалено.
+    
+    Args:
+        iframe: iframe адмін-панелі
+        codes: коди для видалення
+        page: основна сторінка (для модальних вікон)
+        
+    Returns:
+        Set[str]: множина реально видалених кодів
+    """
+    present = _codes_present_in_table(iframe, codes)
+    if not present:
+        return set()
+    
+    delete_specific_promo_codes(iframe, list(present), page)
+    return present - _codes_present_in_table(iframe, present)
+
+
 def delete_selected_codes_headless_optimized(iframe, page=None):
     """
     Покращена функція видалення для headless режиму.
@@ -2357,102 +2841,67 @@ def delete_selected_codes_headless_optimized(iframe, page=None):
     if not page:
         logger.error("❌ Об'єкт 'page' не передано, неможливо обробити діалоги підтвердження.")
         return False
+    install_dialog_auto_accept(page)
 
     try:
-        # Перевіряємо, чи є що видаляти
-        selected_count = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
+        # Діалоги підтверджує постійний обробник сторінки (install_dialog_auto_accept)
+        dialogs_before = _dialog_count(page)
+        dialog_handled = False
+
+        # Рахуємо вибрані коди та викликаємо removeSelectedGrids() одним запитом;
+        # window.confirm підтверджується прямо в браузері
+        removal = iframe.evaluate(_REMOVE_SELECTED_JS, {'autoConfirm': True, 'modalWaitMs': 1500})
+        selected_count = removal['selected']
         if selected_count == 0:
             logger.warning("⚠️ Немає вибраних промокодів для видалення")
             return False
             
         logger.info(f"🗑️ [HEADLESS] Видаляємо {selected_count} вибраних промокодів...")
-
-        # Налаштовуємо обробник стандартного діалогу (для headless режиму)
-        dialog_handled = False
-        def handle_dialog(dialog):
-            nonlocal dialog_handled
-            logger.info(f"💬 [HEADLESS] Отримано діалог: {dialog.message}")
-            dialog.accept()
-            dialog_handled = True
-            logger.info("✅ [HEADLESS] Діалог підтверджено")
-        
-        page.on('dialog', handle_dialog)
-
-        # Перевіряємо доступність функції видалення
-        function_exists = iframe.evaluate('typeof removeSelectedGrids === "function"')
         
-        if function_exists:
-            logger.info("🔧 [HEADLESS] Викликаємо removeSelectedGrids()...")
-            iframe.evaluate('removeSelectedGrids()')
+        if removal['called']:
+            logger.info("🔧 [HEADLESS] Викликано removeSelectedGrids()")
+            if removal['confirmCalled'] or removal['modalConfirmed']:
+                # Підтвердження відбулося в тому ж запиті - модальні/Enter/JS fallback-и не потрібні
+                dialog_handled = True
         else:
             logger.warning("⚠️ [HEADLESS] Функція removeSelectedGrids не знайдена, шукаємо альтернативні способи...")
             
             # Альтернативний спосіб: пошук кнопки видалення
-            delete_button_selectors = [
-                'button[onclick*="removeSelectedGrids"]',
-                'input[onclick*="removeSelectedGrids"]',
-                'a[onclick*="removeSelectedGrids"]',
-                '.btn-delete',
-                '#delete-selected',
-                'button:has-text("Видалити")',
-                'input[value*="Видалити"]',
-                '[title*="Видалити"]'
-            ]
-            
-            button_found = False
-            for selector in delete_button_selectors:
-                buttons = iframe.locator(selector)
-                if buttons.count() > 0:
-                    logger.info(f"✅ [HEADLESS] Знайдено кнопку видалення: {selector}")
-                    buttons.first.click()
-                    button_found = True
-                    break
-            
-            if not button_found:
+            matched_selector = _click_first_matching(iframe, _DELETE_BUTTON_SELECTORS)
+            if matched_selector:
+                logger.info(f"✅ [HEADLESS] Знайдено кнопку видалення: {matched_selector}")
+            else:
                 logger.info("⌨️ [HEADLESS] Кнопка підтвердження не знайдена, пробуємо Enter...")
                 iframe.press('Enter')
         
-        # Очікуємо появи діалогу або модального вікна (збільшую час для headless)
-        logger.info("⏳ [HEADLESS] Очікуємо появи діалогу підтвердження...")
-        time.sleep(1.5)  # Збільшую час для headless режиму
+
+        # Очікуємо появи модального вікна після альтернативної кнопки видалення
+        # (після removeSelectedGrids() його вже чекав _REMOVE_SELECTED_JS)
+        dialog_handled = dialog_handled or _dialog_count(page) > dialogs_before
+        if not dialog_handled and not removal['called']:
+            logger.info("⏳ [HEADLESS] Очікуємо появи діалогу підтвердження...")
+            try:
+                iframe.locator(_HEADLESS_CONFIRM_SELECTOR_ANY).first.wait_for(state='visible', timeout=1500)
+            except Exception:
+                pass  # Модальне вікно не з'явилося - нижче спрацюють резервні способи
         
         # Перевіряємо, чи був оброблений стандартний діалог
-        if dialog_handled:
+        if dialog_handled or _dialog_count(page) > dialogs_before:
             logger.info("✅ [HEADLESS] Стандартний діалог оброблено, операція має завершитись")
         else:
             # Шукаємо модальне вікно підтвердження
             logger.info("🔍 [HEADLESS] Стандартний діалог не з'явився, шукаємо модальне вікно...")
             
-            confirm_selectors = [
-                '.confirm-modal__button--ok',
-                'button:has-text("Підтвердити")',
-                'button:has-text("Так")',
-                'button:has-text("OK")',
-                '#dialog-window .confirm-modal__button--ok',
-                '.modal-footer button.btn-primary',
-                '.ui-dialog-buttonset button:first-child',
-                'button[onclick*="confirm"]',
-                '.dialog-confirm-button'
-            ]
-            
-            button_found = False
-            for selector in confirm_selectors:
-                confirm_buttons = iframe.locator(selector)
-                if confirm_buttons.count() > 0:
-                    logger.info(f"✅ [HEADLESS] Знайдено кнопку підтвердження: {selector}")
-                    confirm_buttons.first.click()
-                    logger.info("🎯 [HEADLESS] Кнопку підтвердження натиснуто!")
-                    button_found = True
-                    time.sleep(0.5)
-                    break
-            
-            if not button_found:
+            matched_selector = _click_first_matching(iframe, _HEADLESS_CONFIRM_SELECTORS)
+            if matched_selector:
+                logger.info(f"✅ [HEADLESS] Знайдено кнопку підтвердження: {matched_selector}")
+                logger.info("🎯 [HEADLESS] Кнопку підтвердження натиснуто!")
+            else:
                 logger.info("⌨️ [HEADLESS] Кнопка підтвердження не знайдена, пробуємо Enter та JavaScript...")
                 
                 # Спроба 1: Enter на iframe
                 try:
                     iframe.press('Enter')
-                    time.sleep(0.5)
                 except Exception:
                     pass
                 
@@ -2486,32 +2935,21 @@ def delete_selected_codes_headless_optimized(iframe, page=None):
                 except Exception as js_error:
                     logger.warning(f"⚠️ [HEADLESS] JavaScript підтвердження не вдалося: {js_error}")
         
-        # Очікуємо завершення операції (збільшуючи час для headless)
-        logger.info("⏳ [HEADLESS] Очікуємо завершення операції видалення...")
-        time.sleep(3.0)  # Збільшую час для headless режиму
-
-        # Чекаємо оновлення таблиці
-        logger.info("🔄 [HEADLESS] Перевіряємо оновлення таблиці...")
+        # Чекаємо оновлення таблиці: одна умова в браузері повертається одразу,
+        # щойно лоадер зник і вибраних чекбоксів не лишилось
+        logger.info("🔄 [HEADLESS] Очікуємо завершення операції видалення...")
         try:
-            # Спочатку чекаємо появи лоадера
-            loader = iframe.locator('#datagrid-loader')
-            try:
-                loader.wait_for(state='visible', timeout=3000)
-                logger.info("⏳ [HEADLESS] Лоадер з'явився, чекаємо його зникнення...")
-                loader.wait_for(state='hidden', timeout=15000)
-                logger.info("✅ [HEADLESS] Лоадер зник, таблиця оновлена")
-            except Exception:
-                logger.info("⏳ [HEADLESS] Лоадер не з'явився, чекаємо стабілізації мережі...")
-                iframe.page.wait_for_load_state('networkidle', timeout=8000)
-        except Exception as wait_error:
-            logger.warning(f"⚠️ [HEADLESS] Помилка очікування оновлення таблиці: {wait_error}")
-        
-        # Додаткова пауза для стабілізації
-        time.sleep(1.0)
+            iframe.wait_for_function(_DELETE_SETTLED_JS, timeout=15000)
+            logger.info("✅ [HEADLESS] Всі вибрані промокоди успішно видалено!")
+            return True
+        except Exception:
+            logger.info("⏳ [HEADLESS] Таблиця не оновилась повністю, перевіряємо залишок...")
         
-        # Фінальна перевірка результату
-        remaining_selected = iframe.locator('table#datagrid tbody input[type="checkbox"]:checked').count()
-        total_rows_now = iframe.locator('table#datagrid tbody tr').count()
+        # Фінальна перевірка результату (лише для часткового/невдалого видалення)
+        # Залишок вибраних чекбоксів і кількість рядків - одним запитом
+        stats = _table_stats(iframe)
+        remaining_selected = stats['checked']
+        total_rows_now = stats['rows']
         
         logger.info(f"📊 [HEADLESS] Поточна кількість рядків в таблиці: {total_rows_now}")
         logger.info(f"📊 [HEADLESS] Залишилося вибраних чекбоксів: {remaining_selected}")
@@ -10,10 +10,12 @@
 - Синхронізація з цільовою кількістю кодів для кожної суми
 """
 
-import time
 import logging
 import random
 import string
+import functools
+import weakref
+from collections import defaultdict
 import sys
 import os
 from typing import Dict, List, Set, Optional, Tuple
@@ -25,22 +27,211 @@ sys.path.insert(0, os.path.join(parent_dir, 'replenish_promo_code_lambda'))
 
 # Імпорти з replenish_promo_code_lambda
 try:
-    from bon_utils import is_bon_promo_code, extract_amount_from_bon_code
+    from bon_utils import parse_bon
     from promo_logic import PromoService
 except ImportError as e:
     logger = logging.getLogger(__name__)
     logger.warning(f"⚠️ Не вдалося імпортувати модулі: {e}")
     # Fallback заглушки
-    def is_bon_promo_code(code):
-        return code.startswith('BON')
-    def extract_amount_from_bon_code(code):
+    def parse_bon(code):
         import re
-        match = re.search(r'BON(\d+)', code)
+        match = re.match(r'BON(\d+)', code)
         return int(match.group(1)) if match else None
     PromoService = None
 
 logger = logging.getLogger(__name__)
 
+# JS: текст першої (код) та, на запит, останньої (статус) комірки рядка таблиці.
+# Статус у збиранні кодів не використовується, тому за замовчуванням не читається (null)
+_ROW_CELLS_JS = """(row, includeStatus) => {
+    const cells = row.querySelectorAll('td');
+    if (!cells.length) return null;
+    const status = includeStatus && cells.length > 1 ? cells[cells.length - 1].textContent : null;
+    return [cells[0].textContent, status];
+}"""
+
+# JS: всі рядки поточної сторінки одним запитом
+_PAGE_ROWS_JS = """(includeStatus) => {
+    const rowCells = """ + _ROW_CELLS_JS + """;
+    return Array.from(document.querySelectorAll('table tbody tr'), row => rowCells(row, includeStatus));
+}"""
+
+# JS: відмічає чекбокси рядків з переданими кодами; повертає відмічені коди
+_SELECT_CODES_JS = """(codes) => {
+    const wanted = new Set(codes);
+    const selected = [];
+    document.querySelectorAll('table tbody tr').forEach(row => {
+        const cell = row.querySelector('td');
+        const code = cell ? cell.textContent.trim() : null;
+        if (!code || !wanted.has(code)) return;
+        const checkbox = row.querySelector('input[type="checkbox"]');
+        if (!checkbox) return;
+        if (!checkbox.checked) checkbox.click();
+        if (checkbox.checked) selected.push(code);
+    });
+    return selected;
+}"""
+
+# JS: коди зі списку, які ще є в таблиці (без зміни чекбоксів)
+_CODES_PRESENT_JS = """(codes) => {
+    const wanted = new Set(codes);
+    const present = [];
+    document.querySelectorAll('table tbody tr').forEach(row => {
+        const cell = row.querySelector('td');
+        const code = cell ? cell.textContent.trim() : null;
+        if (code && wanted.has(code)) present.push(code);
+    });
+    return present;
+}"""
+
+# JS: видаляє всі відмічені рядки одним викликом removeSelectedGrids().
+# window.confirm підтверджується прямо в браузері; якщо панель замість нього
+# показує власне модальне вікно (#dialog-window), натискаємо його кнопку OK
+_REMOVE_SELECTED_JS = """async ({ modalWaitMs }) => {
+    if (typeof removeSelectedGrids !== 'function') {
+        return { called: false, confirmCalled: false, modalConfirmed: false };
+    }
+    let confirmCalled = false;
+    const originalConfirm = window.confirm;
+    window.confirm = () => { confirmCalled = true; return true; };
+    try {
+        removeSelectedGrids();
+    } finally {
+        window.confirm = originalConfirm;
+    }
+    let modalConfirmed = false;
+    if (!confirmCalled) {
+        const deadline = Date.now() + modalWaitMs;
+        while (true) {
+            const button = document.querySelector('.confirm-modal__button--ok, #dialog-window .confirm-modal__button--ok');
+            if (button && button.getClientRects().length) {
+                button.click();
+                modalConfirmed = true;
+                break;
+            }
+            if (Date.now() >= deadline) break;
+            await new Promise(resolve => setTimeout(resolve, 30));
+        }
+    }
+    return { called: true, confirmCalled: confirmCalled, modalConfirmed: modalConfirmed };
+}"""
+
+# Запасні селектори кнопки підтвердження (як у PromoService), якщо модальне
+# вікно не з'явилось за modalWaitMs
+_CONFIRM_SELECTORS = (
+    '.confirm-modal__button--ok',
+    'button:has-text("Підтвердити")',
+    'button:has-text("Так")',
+    'button:has-text("OK")',
+    '#dialog-window .confirm-modal__button--ok',
+    '.modal-footer button.btn-primary',
+    '.ui-dialog-buttonset button:first-child',
+    'button[onclick*="confirm"]',
+    '.dialog-confirm-button',
+)
+
+# JS: знімок таблиці - текст першого рядка та кількість рядків
+_TABLE_SNAPSHOT_JS = """() => {
+    const rows = document.querySelectorAll('table tbody tr');
+    return [rows.length ? rows[0].textContent : null, rows.length];
+}"""
+
+# JS: таблиця змінилась відносно знімка (інший перший рядок або кількість рядків)
+_TABLE_CHANGED_JS = """(previous) => {
+    const rows = document.querySelectorAll('table tbody tr');
+    const first = rows.length ? rows[0].textContent : null;
+    return first !== previous[0] || rows.length !== previous[1];
+}"""
+
+# JS: шаблон URL сторінок пагінації з посилання "Наступна" (номер сторінки -> {page}).
+# Посилання вже несе стан фільтрів, тому сторінки можна завантажувати напряму.
+# lastPage - найбільший номер сторінки серед посилань пагінатора (нижня межа кількості сторінок)
+_PAGE_URL_TEMPLATE_JS = """() => {
+    const pageLinks = Array.from(document.querySelectorAll('a[href*="page="]'));
+    const links = pageLinks
+        .filter(a => ['Наступна', 'Next', '>'].some(text => (a.textContent || '').includes(text)));
+    const next = links[links.length - 1];
+    if (!next) return null;
+    const pageRe = /([?&][\\w-]*page=)(\\d+)/;
+    const href = new URL(next.getAttribute('href'), document.baseURI).href;
+    const match = href.match(pageRe);
+    if (!match) return { template: null, nextPage: null, lastPage: null };
+    let lastPage = Number(match[2]);
+    for (const link of pageLinks) {
+        const linkMatch = new URL(link.getAttribute('href'), document.baseURI).href.match(pageRe);
+        if (linkMatch && linkMatch[1] === match[1]) lastPage = Math.max(lastPage, Number(linkMatch[2]));
+    }
+    return { template: href.replace(match[0], match[1] + '{page}'), nextPage: Number(match[2]), lastPage: lastPage };
+}"""
+
+# JS: паралельно завантажує сторінки пагінації (не більше concurrency запитів одночасно)
+# і повертає рядки кожної сторінки. Зупиняється на порожній сторінці або на повторі
+# попередньої - так сервер поводиться за межами останньої сторінки або коли ігнорує page=.
+# currentFirstCode - код з уже відкритої сторінки, з ним порівнюється перша завантажена
+_FETCH_PAGES_JS = """async ({ template, firstPage, concurrency, maxPages, currentFirstCode }) => {
+    const parser = new DOMParser();
+    const rowCells = """ + _ROW_CELLS_JS + """;
+    const fetchPage = async (number) => {
+        const response = await fetch(template.replace('{page}', number), { credentials: 'same-origin' });
+        if (!response.ok) throw new Error('HTTP ' + response.status + ' для сторінки ' + number);
+        const doc = parser.parseFromString(await response.text(), 'text/html');
+        return Array.from(doc.querySelectorAll('table tbody tr'), row => rowCells(row, false));
+    };
+    const pages = [];
+    const hasCode = (rows, code) => code !== null && rows.some(row => row && row[0] && row[0].trim() === code);
+    let lastFirstCode = currentFirstCode || null;
+    for (let start = firstPage; start < firstPage + maxPages; start += concurrency) {
+        const batch = [];
+        for (let number = start; number < start + concurrency; number++) {
+            batch.push(fetchPage(number));
+        }
+        for (const rows of await Promise.all(batch)) {
+            if (!rows.length || hasCode(rows, lastFirstCode)) return pages;
+            const firstRow = rows.find(row => row && row[0] && row[0].trim());
+            lastFirstCode = firstRow ? firstRow[0].trim() : null;
+            pages.push(rows);
+        }
+    }
+    return pages;
+}"""
+
+
+# Кількість підтверджених діалогів браузера для кожної сторінки (обробник
+# встановлюється на сторінку один раз)
+_dialogs_accepted = weakref.WeakKeyDictionary()
+
+
+def _accept_dialog(page, dialog):
+    """Підтверджує стандартний діалог браузера і рахує його для сторінки."""
+    try:
+        dialog.accept()
+    except Exception as e:
+        # Діалог уже підтвердив інший обробник цієї сторінки
+        logger.debug("💬 Діалог уже оброблено: %s", e)
+        return
+    _dialogs_accepted[page] = _dialogs_accepted.get(page, 0) + 1
+    logger.info(f"💬 Підтверджено діалог: {dialog.message}")
+
+
+def _dialog_count(page) -> int:
+    """Кількість підтверджених діалогів сторінки."""
+    return _dialogs_accepted.get(page, 0)
+
+
+def install_dialog_auto_accept(page):
+    """
+    Реєструє постійний обробник, що автоматично підтверджує діалоги сторінки.
+    Без нього Playwright відхиляє confirm(), викликаний панеллю після асинхронного кроку.
+    Ідемпотентна - повторний виклик для тієї ж сторінки нічого не робить.
+    
+    Args:
+        page: основна сторінка браузера
+    """
+    if page is None or page in _dialogs_accepted:
+        return
+    _dialogs_accepted[page] = 0
+    page.on('dialog', functools.partial(_accept_dialog, page))
+
 
 class PromoSmartManager:
     """
@@ -68,10 +259,57 @@ class PromoSmartManager:
         # Налаштування для роботи
         self.max_rows_per_page = 160  # Максимум промо-кодів на сторінку
         self.duplicate_check_retries = 3  # Кількість перевірок дублікатів
+        self.page_fetch_concurrency = 6  # Одночасних завантажень сторінок пагінації
         
         # Кеш для збереження результатів
         self.all_codes_cache = {}
         self.duplicates_found = {}
+        self._iframe = None
+    
+    @property
+    def iframe(self):
+        """
+        iframe адмін-панелі, закешований на рівні менеджера.
+        
+        Від'єднаний Frame (після перезавантаження iframe) перевіряється локально,
+        без звернення до браузера, і лише тоді запитується в PromoService заново.
+        """
+        if self._iframe is None or self._iframe.is_detached():
+            self._iframe = self.promo_service._get_iframe()
+        return self._iframe
+    
+    def _invalidate_iframe(self):
+        """Скидає закешований iframe (після навігації сторінки або повторного логіну)."""
+        self._iframe = None
+    
+    def _table_snapshot(self, iframe) -> Optional[List]:
+        """Повертає знімок таблиці перед дією (None, якщо таблицю прочитати не вдалося)."""
+        try:
+            return iframe.evaluate(_TABLE_SNAPSHOT_JS)
+        except Exception:
+            return None
+    
+    def _wait_for_table_update(self, iframe, snapshot: Optional[List], timeout: int) -> bool:
+        """
+        Чекає оновлення таблиці після дії замість фіксованої паузи.
+        
+        Args:
+            iframe: iframe адмін-панелі
+            snapshot: знімок таблиці до дії (_table_snapshot)
+            timeout: максимальне очікування в мс
+            
+        Returns:
+            bool: True, якщо таблиця змінилась; False, якщо за timeout змін не було
+            (наприклад, фільтр дав той самий результат)
+        """
+        try:
+            if snapshot is None:
+                iframe.wait_for_load_state('networkidle', timeout=timeout)
+            else:
+                iframe.wait_for_function(_TABLE_CHANGED_JS, arg=snapshot, timeout=timeout)
+            return True
+        except Exception:
+            return False
         
     def set_page_size(self, rows_count: int = 160) -> bool:
         """
@@ -84,7 +322,7 @@ class PromoSmartManager:
             bool: True якщо успішно встановлено
         """
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для встановлення розміру сторінки")
                 return False
@@ -97,9 +335,10 @@ class PromoSmartManager:
                 logger.warning("⚠️ Селектор кількості рядків не знайдений")
                 return False
                 
-            # Встановлюємо значення
+            # Встановлюємо значення і чекаємо на оновлення таблиці (не довше за колишню паузу)
+            snapshot = self._table_snapshot(iframe)
             rows_selector.select_option(str(rows_count))
-            time.sleep(2)  # Чекаємо на оновлення таблиці
+            self._wait_for_table_update(iframe, snapshot, timeout=2000)
             
             logger.info(f"✅ Встановлено {rows_count} рядків на сторінку")
             return True
@@ -120,7 +359,7 @@ class PromoSmartManager:
             bool: True якщо фільтр застосовано успішно
         """
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для фільтрації")
                 return False
@@ -145,8 +384,11 @@ class PromoSmartManager:
             # Натискаємо кнопку застосування фільтру
             filter_button = iframe.locator('input[value="Фільтр"]')
             if filter_button.count() > 0:
+                # Чекаємо на застосування фільтру (не довше за колишню паузу:
+                # якщо результат фільтру той самий, таблиця не зміниться)
+                snapshot = self._table_snapshot(iframe)
                 filter_button.click()
-                time.sleep(3)  # Чекаємо на застосування фільтру
+                self._wait_for_table_update(iframe, snapshot, timeout=3000)
             
             logger.info(f"✅ Фільтр по сумах {start_amount}-{end_amount} застосовано")
             return True
@@ -163,7 +405,7 @@ class PromoSmartManager:
             bool: True якщо фільтр застосовано успішно
         """
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для BON фільтру")
                 return False
@@ -183,8 +425,10 @@ class PromoSmartManager:
             # Натискаємо кнопку застосування фільтру
             filter_button = iframe.locator('input[value="Фільтр"]')
             if filter_button.count() > 0:
+                # Чекаємо на застосування фільтру (не довше за колишню паузу)
+                snapshot = self._table_snapshot(iframe)
                 filter_button.click()
-                time.sleep(3)  # Чекаємо на застосування фільтру
+                self._wait_for_table_update(iframe, snapshot, timeout=3000)
             
             logger.info("✅ BON фільтр застосовано")
             return True
@@ -193,82 +437,122 @@ class PromoSmartManager:
             logger.error(f"❌ Помилка застосування BON фільтру: {e}")
             return False
     
-    def get_current_page_codes(self) -> List[Dict]:
+    def get_current_page_codes(self, include_status: bool = False) -> List[Dict]:
         """
         Отримує всі промо-коди з поточної сторінки.
         
+        Args:
+            include_status: Читати також статус (остання колонка) у code_info['status']
+            
         Returns:
             List[Dict]: Список промо-кодів з інформацією
         """
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для читання кодів")
                 return []
             
-            codes = []
-            
-            # Знаходимо всі рядки таблиці з промо-кодами
-            rows = iframe.locator('table tbody tr')
-            rows_count = rows.count()
+            # Читаємо всі рядки таблиці одним evaluate замість запитів на кожну комірку
+            rows_data = iframe.evaluate(_PAGE_ROWS_JS, include_status)
             
-            logger.debug(f"📋 Знайдено {rows_count} рядків на поточній сторінці")
+            logger.debug("📋 Знайдено %d рядків на поточній сторінці", len(rows_data))
             
-            for i in range(rows_count):
-                try:
-                    row = rows.nth(i)
-                    
-                    # Отримуємо код (зазвичай в першій колонці)
-                    code_cell = row.locator('td').nth(0)
-                    if code_cell.count() == 0:
-                        continue
-                        
-                    code_text = code_cell.text_content()
-                    if not code_text:
-                        continue
-                        
-                    code = code_text.strip()
-                    
-                    # Перевіряємо, чи це BON код
-                    if not is_bon_promo_code(code):
-                        continue
-                    
-                    # Отримуємо суму з коду
-                    amount = extract_amount_from_bon_code(code)
-                    if amount is None:
-                        continue
-                    
-                    # Отримуємо додаткову інформацію (статус, дата створення тощо)
-                    cells = row.locator('td')
-                    cell_count = cells.count()
-                    
-                    code_info = {
-                        'code': code,
-                        'amount': amount,
-                        'row_index': i
-                    }
-                    
-                    # Додаємо додаткову інформацію якщо є
-                    if cell_count > 1:
-                        # Зазвичай статус в останній колонці
-                        status_cell = cells.nth(cell_count - 1)
-                        status_text = status_cell.text_content()
-                        if status_text:
-                            code_info['status'] = status_text.strip()
-                    
-                    codes.append(code_info)
-                    
-                except Exception as e:
-                    logger.debug(f"⚠️ Помилка обробки рядка {i}: {e}")
-                    continue
+            codes = self._codes_from_rows(rows_data)
             
-            logger.debug(f"✅ Отримано {len(codes)} BON кодів з поточної сторінки")
+            logger.debug("✅ Отримано %d BON кодів з поточної сторінки", len(codes))
             return codes
             
         except Exception as e:
             logger.error(f"❌ Помилка отримання кодів з поточної сторінки: {e}")
             return []
     
+    def _codes_from_rows(self, rows_data: List[Optional[List[str]]]) -> List[Dict]:
+        """
+        Розбирає рядки таблиці ([код, статус]) у список BON промо-кодів.
+        
+        Args:
+            rows_data: Рядки сторінки, як їх повертає _PAGE_ROWS_JS / _FETCH_PAGES_JS
+            
+        Returns:
+            List[Dict]: Список промо-кодів з інформацією
+        """
+        codes = []
+        for i, row_data in enumerate(rows_data):
+            if not row_data:
+                continue
+            code_text, status_text = row_data
+            if not code_text:
+                continue
+                
+            code = code_text.strip()
+            
+            # Перевіряємо, чи це BON код, і отримуємо суму - одним розбором
+            amount = parse_bon(code)
+            if amount is None:
+                continue
+            
+            code_info = {
+                'code': code,
+                'amount': amount,
+                'row_index': i
+            }
+            
+            # Статус (зазвичай в останній колонці), якщо є
+            if status_text:
+                code_info['status'] = status_text.strip()
+            
+            codes.append(code_info)
+        
+        return codes
+    
+    def _fetch_remaining_pages(self, iframe, current_first_code: str) -> Optional[List[List]]:
+        """
+        Паралельно завантажує сторінки пагінації після поточної за URL з посилання "Наступна".
+        
+        Args:
+            iframe: iframe адмін-панелі з уже застосованими фільтрами
+            current_first_code: Код з поточної сторінки - якщо сервер ігнорує page=,
+                перша "наступна" сторінка повторить його і не буде прийнята
+            
+        Returns:
+            Optional[List[List]]: Рядки кожної сторінки по порядку (порожній список, якщо
+            наступної сторінки немає) або None, якщо URL сторінок отримати не вдалося
+        """
+        try:
+            pager = iframe.evaluate(_PAGE_URL_TEMPLATE_JS)
+            if pager is None:
+                # Немає посилання на наступну сторінку - поточна остання
+                return []
+            if not pager['template']:
+                # Посилання є, але номер сторінки в URL не знайдено
+                return None
+            
+            logger.info(f"⚡ Паралельне завантаження сторінок з {pager['nextPage']} (по {self.page_fetch_concurrency} одночасно)...")
+            pages = iframe.evaluate(_FETCH_PAGES_JS, {
+                'template': pager['template'],
+                'firstPage': pager['nextPage'],
+                'concurrency': self.page_fetch_concurrency,
+                'maxPages': 1000,
+                'currentFirstCode': current_first_code
+            })
+            
+            # Якщо таблицю заповнює AJAX (у завантаженому HTML рядків немає) або сервер
+            # ігнорує page=, збір тихо обмежився б першою сторінкою. Пагінатор каже, що
+            # сторінок щонайменше lastPage - при нестачі повертаємось до переходу кліками.
+            # Порожню останню сторінку відсікає сам get_all_pages_codes
+            expected_pages = pager['lastPage'] - pager['nextPage'] + 1
+            if len(pages) < expected_pages:
+                logger.warning(
+                    f"⚠️ Завантажено {len(pages)} сторінок з рядками, пагінатор показує щонайменше "
+                    f"{expected_pages} - переходимо кліками"
+                )
+                return None
+            return pages
+        except Exception as e:
+            logger.warning(f"⚠️ Паралельне завантаження сторінок не вдалося, переходимо кліками: {e}")
+            return None
+    
     def get_all_pages_codes(self, start_amount: int, end_amount: int) -> Dict[int, List[str]]:
         """
         Проходить по всіх сторінках пагінації та збирає всі BON коди.
@@ -281,7 +565,7 @@ class PromoSmartManager:
             Dict[int, List[str]]: Словник {сума: [список_кодів]}
         """
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для пагінації")
                 return {}
@@ -298,23 +582,13 @@ class PromoSmartManager:
                 logger.error("❌ Не вдалося застосувати BON фільтр")
                 return {}
             
-            all_codes = {}
+            all_codes = defaultdict(list)
             page_number = 1
             processed_codes = set()  # Для відстеження дублікатів
+            duplicates_by_amount = defaultdict(int)  # Повтори між сторінками по сумах
             
-            logger.info("🔄 Початок збору кодів з усіх сторінок...")
-            
-            while True:
-                logger.info(f"📄 Обробка сторінки {page_number}...")
-                
-                # Отримуємо коди з поточної сторінки
-                page_codes = self.get_current_page_codes()
-                
-                if not page_codes:
-                    logger.info(f"📄 Сторінка {page_number} порожня, завершуємо збір")
-                    break
-                
-                # Обробляємо коди з поточної сторінки
+            def collect_page(page_codes: List[Dict], number: int) -> None:
+                """Додає коди сторінки до all_codes, відсіюючи вже зібрані."""
                 new_codes_count = 0
                 duplicate_codes_count = 0
                 
@@ -322,54 +596,92 @@ class PromoSmartManager:
                     code = code_info['code']
                     amount = code_info['amount']
                     
-                    # Перевіряємо на дублікат
-                    if code in processed_codes:
+                    # Додаємо код і перевіряємо на дублікат одним хешуванням:
+                    # якщо розмір множини не змінився, код уже був зібраний
+                    seen_before = len(processed_codes)
+                    processed_codes.add(code)
+                    if len(processed_codes) == seen_before:
                         duplicate_codes_count += 1
-                        logger.debug(f"🔄 Дублікат знайдено: {code}")
+                        duplicates_by_amount[amount] += 1
+                        logger.debug("🔄 Дублікат знайдено: %s", code)
                         continue
                     
-                    # Додаємо новий код
-                    processed_codes.add(code)
                     new_codes_count += 1
                     
-                    if amount not in all_codes:
-                        all_codes[amount] = []
                     all_codes[amount].append(code)
                 
-                logger.info(f"📄 Сторінка {page_number}: +{new_codes_count} нових, {duplicate_codes_count} дублікатів")
-                
-                # Перевіряємо наявність кнопки "Наступна сторінка"
-                next_button = iframe.locator('a[href*="page="]:has-text("Наступна"), a[href*="page="]:has-text("Next"), a[href*="page="]:has-text(">")').last
-                
-                if next_button.count() == 0 or not next_button.is_enabled():
-                    logger.info(f"📄 Остання сторінка {page_number}, завершуємо збір")
-                    break
-                
-                # Переходимо на наступну сторінку
-                try:
-                    next_button.click()
-                    time.sleep(3)  # Чекаємо завантаження сторінки
+                logger.info(f"📄 Сторінка {number}: +{new_codes_count} нових, {duplicate_codes_count} дублікатів")
+            
+            logger.info("🔄 Початок збору кодів з усіх сторінок...")
+            
+            first_page_codes = self.get_current_page_codes()
+            if not first_page_codes:
+                logger.info(f"📄 Сторінка {page_number} порожня, завершуємо збір")
+                fetched_pages = []
+            else:
+                collect_page(first_page_codes, page_number)
+                # Решту сторінок за можливості завантажуємо паралельно прямо в браузері
+                # за URL з пагінації, без кліків і очікувань між сторінками
+                fetched_pages = self._fetch_remaining_pages(iframe, first_page_codes[0]['code'])
+            
+            if fetched_pages is not None:
+                for rows_data in fetched_pages:
+                    page_codes = self._codes_from_rows(rows_data)
+                    if not page_codes:
+                        break
                     page_number += 1
+                    collect_page(page_codes, page_number)
+            else:
+                # Запасний шлях: послідовний перехід кнопкою "Наступна"
+                while True:
+                    # Перевіряємо наявність кнопки "Наступна сторінка"
+                    next_button = iframe.locator('a[href*="page="]:has-text("Наступна"), a[href*="page="]:has-text("Next"), a[href*="page="]:has-text(">")').last
                     
-                    # Захист від нескінченного циклу
-                    if page_number > 1000:
-                        logger.warning("⚠️ Досягнуто ліміт сторінок (1000), припиняємо збір")
+                    if next_button.count() == 0 or not next_button.is_enabled():
+                        logger.info(f"📄 Остання сторінка {page_number}, завершуємо збір")
                         break
+                    
+                    # Переходимо на наступну сторінку
+                    try:
+                        # Наступна сторінка завжди відрізняється від поточної, тож чекаємо
+                        # саме її появи (з запасом до 10 сек), а не фіксовані 3 сек
+                        snapshot = self._table_snapshot(iframe)
+                        next_button.click()
+                        self._wait_for_table_update(iframe, snapshot, timeout=10000)
+                        page_number += 1
                         
-                except Exception as e:
-                    logger.error(f"❌ Помилка переходу на сторінку {page_number + 1}: {e}")
-                    break
+                        # Захист від нескінченного циклу
+                        if page_number > 1000:
+                            logger.warning("⚠️ Досягнуто ліміт сторінок (1000), припиняємо збір")
+                            break
+                            
+                    except Exception as e:
+                        logger.error(f"❌ Помилка переходу на сторінку {page_number + 1}: {e}")
+                        break
+                    
+                    logger.info(f"📄 Обробка сторінки {page_number}...")
+                    
+                    # Отримуємо коди з поточної сторінки
+                    page_codes = self.get_current_page_codes()
+                    
+                    if not page_codes:
+                        logger.info(f"📄 Сторінка {page_number} порожня, завершуємо збір")
+                        break
+                    
+                    collect_page(page_codes, page_number)
             
-            # Підсумкова статистика
-            total_codes = sum(len(codes) for codes in all_codes.values())
-            logger.info(f"✅ Збір завершено: {total_codes} унікальних кодів з {page_number} сторінок")
+            # Суми з повторами між сторінками - кандидати на повторну перевірку (ЕТАП 2)
+            self.duplicates_found = dict(duplicates_by_amount)
             
-            # Виводимо статистику по сумах
-            for amount in sorted(all_codes.keys()):
-                count = len(all_codes[amount])
-                logger.info(f"💰 {amount} грн: {count} кодів")
+            # Підсумкова статистика (кожен зібраний код є в processed_codes рівно раз)
+            logger.info(f"✅ Збір завершено: {len(processed_codes)} унікальних кодів з {page_number} сторінок, {len(all_codes)} різних сум")
             
-            return all_codes
+            # Статистика по кожній сумі - лише в DEBUG (сум можуть бути тисячі)
+            if logger.isEnabledFor(logging.DEBUG):
+                for amount in sorted(all_codes):
+                    logger.debug("💰 %s грн: %s кодів", amount, len(all_codes[amount]))
+            
+            return dict(all_codes)
             
         except Exception as e:
             logger.error(f"❌ Помилка збору кодів з усіх сторінок: {e}")
@@ -411,8 +723,6 @@ class PromoSmartManager:
                 else:
                     verified_codes[amount] = []
                     logger.info(f"📝 Сума {amount} грн: кодів не знайдено")
-                
-                time.sleep(1)  # Пауза між перевірками
             
             return verified_codes
             
@@ -448,28 +758,32 @@ class PromoSmartManager:
         logger.info(f"📊 Аналіз балансу кодів для діапазону {start_amount}-{end_amount} грн")
         logger.info(f"🎯 Цільова кількість: {target_count} кодів на суму")
         
+        # Кількості по сумах рахуємо один раз; для сум без кодів - 0
+        counts = {amount: len(codes) for amount, codes in current_codes.items()}
+        
         for amount in range(start_amount, end_amount + 1):
-            current_count = len(current_codes.get(amount, []))
+            current_count = counts.get(amount, 0)
             
             if current_count < target_count:
                 # Потрібно створити коди
                 need_to_create = target_count - current_count
                 analysis['to_create'][amount] = need_to_create
                 analysis['summary']['total_to_create'] += need_to_create
-                logger.info(f"➕ {amount} грн: потрібно створити {need_to_create} кодів (є {current_count})")
+                logger.info("➕ %s грн: потрібно створити %s кодів (є %s)", amount, need_to_create, current_count)
                 
             elif current_count > target_count:
                 # Потрібно видалити зайві коди
                 codes_to_delete = current_codes[amount][target_count:]  # Видаляємо зайві
                 analysis['to_delete'][amount] = codes_to_delete
                 analysis['summary']['total_to_delete'] += len(codes_to_delete)
-                logger.info(f"➖ {amount} грн: потрібно видалити {len(codes_to_delete)} кодів (є {current_count})")
+                logger.info("➖ %s грн: потрібно видалити %s кодів (є %s)", amount, len(codes_to_delete), current_count)
                 
             else:
                 # Кількість оптимальна
                 analysis['unchanged'][amount] = current_count
                 analysis['summary']['amounts_unchanged'] += 1
-                logger.info(f"✅ {amount} грн: оптимальна кількість ({current_count} кодів)")
+                # Незмінні суми - лише в DEBUG: їх тисячі, а в підсумку є загальна кількість
+                logger.debug("✅ %s грн: оптимальна кількість (%s кодів)", amount, current_count)
         
         # Підсумок
         logger.info(f"\n📊 ПІДСУМОК АНАЛІЗУ:")
@@ -504,20 +818,17 @@ class PromoSmartManager:
                     logger.info(f"➕ Створюємо {count} кодів для суми {amount} грн...")
                     
                     try:
-                        # Генеруємо коди для створення
-                        codes_to_create = []
-                        for _ in range(count):
-                            # Генеруємо унікальний код формату BON{amount}{random}
-                            random_part = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-                            new_code = f"BON{amount}{random_part}"
-                            codes_to_create.append(new_code)
+                        # Генеруємо коди формату BON{amount}{6 випадкових цифр}: цифри для
+                        # всіх кодів суми - одним викликом random.choices, далі лише зрізи
+                        digits = ''.join(random.choices(string.digits, k=6 * count))
+                        codes_to_create = [f"BON{amount}{digits[i:i + 6]}" for i in range(0, 6 * count, 6)]
                         
-                        # Створюємо коди через PromoService
+                        # Створюємо коди через PromoService. Пауза між кодами не потрібна:
+                        # create_promo_code сам чекає повернення до списку після збереження
                         success_count = 0
                         for code in codes_to_create:
                             if self.promo_service.create_promo_code(code, amount):
                                 success_count += 1
-                                time.sleep(0.5)  # Пауза між створенням
                             else:
                                 logger.warning(f"⚠️ Не вдалося створити код {code}")
                         
@@ -537,12 +848,13 @@ class PromoSmartManager:
                     logger.info(f"➖ Видаляємо {len(codes_to_delete)} кодів для суми {amount} грн...")
                     
                     try:
-                        # Видаляємо коди через SmartManager
-                        if self._delete_codes_batch(codes_to_delete):
-                            results['deleted'] += len(codes_to_delete)
-                            logger.info(f"✅ Видалено {len(codes_to_delete)} кодів для суми {amount} грн")
+                        # Видаляємо коди через SmartManager; рахуємо лише ті, що зникли з таблиці
+                        all_deleted, deleted_count = self._delete_codes_batch(codes_to_delete, amount)
+                        results['deleted'] += deleted_count
+                        if all_deleted:
+                            logger.info(f"✅ Видалено {deleted_count} кодів для суми {amount} грн")
                         else:
-                            error_msg = f"Не вдалося видалити коди для суми {amount}"
+                            error_msg = f"Не вдалося видалити {len(codes_to_delete) - deleted_count} з {len(codes_to_delete)} кодів для суми {amount}"
                             logger.error(f"❌ {error_msg}")
                             results['errors'].append(error_msg)
                             
@@ -567,41 +879,100 @@ class PromoSmartManager:
             results['errors'].append(str(e))
             return results
     
-    def _delete_codes_batch(self, codes_to_delete: List[str]) -> bool:
+    def _confirm_removal(self, iframe, removal: Dict, dialogs_before: int) -> bool:
+        """
+        Перевіряє, що видалення підтверджено, і за потреби натискає кнопку модального вікна.
+        
+        Args:
+            iframe: iframe адмін-панелі
+            removal: результат _REMOVE_SELECTED_JS
+            dialogs_before: кількість підтверджених діалогів сторінки до видалення
+            
+        Returns:
+            bool: True якщо підтвердження спрацювало (confirm, діалог або модальне вікно)
+        """
+        if removal['confirmCalled'] or removal['modalConfirmed']:
+            return True
+        if _dialog_count(self.page) > dialogs_before:
+            # confirm() після асинхронного кроку панелі підтвердив обробник діалогів сторінки
+            return True
+        
+        # Модальне вікно не з'явилось за відведений час - остання спроба за селекторами
+        for selector in _CONFIRM_SELECTORS:
+            confirm_buttons = iframe.locator(selector)
+            if confirm_buttons.count() > 0:
+                logger.info(f"✅ Знайдено кнопку підтвердження: {selector}")
+                confirm_buttons.first.click()
+                return True
+        
+        logger.warning("⚠️ Діалог підтвердження видалення не знайдено")
+        return False
+    
+    def _delete_codes_batch(self, codes_to_delete: List[str], amount: Optional[int] = None) -> Tuple[bool, int]:
         """
-        Видаляє список кодів пакетно.
+        Видаляє список кодів пакетно: відмічає їх рядки одним evaluate і видаляє
+        всі відмічені одним викликом removeSelectedGrids() з підтвердженням.
+        Видаленими вважаються лише коди, що після оновлення зникли з таблиці.
         
         Args:
             codes_to_delete: Список кодів для видалення
+            amount: Сума кодів - таблиця фільтрується по ній, щоб коди були на сторінці
             
         Returns:
-            bool: True якщо успішно видалено
+            Tuple[bool, int]: (чи видалено всі коди, скільки кодів реально видалено)
         """
+        deleted_count = 0
         try:
-            iframe = self.promo_service._get_iframe()
+            iframe = self.iframe
             if not iframe:
                 logger.error("❌ Не вдалося отримати iframe для видалення")
-                return False
-            
-            # Логіка вибору та видалення кодів
-            # (тут може бути складніша логіка залежно від інтерфейсу)
+                return False, 0
             
             logger.info(f"🗑️ Видалення {len(codes_to_delete)} кодів...")
+            install_dialog_auto_accept(self.page)
             
-            # Приклад простого видалення (потрібно адаптувати під реальний інтерфейс)
-            for code in codes_to_delete:
-                try:
-                    # Знаходимо рядок з кодом та видаляємо його
-                    # Це залежить від конкретного інтерфейсу адмін-панелі
-                    pass
-                except Exception as e:
-                    logger.warning(f"⚠️ Не вдалося видалити код {code}: {e}")
+            if amount is not None:
+                if not self.apply_amount_range_filter(amount, amount) or not self.apply_bon_filter():
+                    logger.error(f"❌ Не вдалося відфільтрувати таблицю по сумі {amount}")
+                    return False, 0
             
-            return True
+            # Кожен прохід видаляє всі коди зі списку, видимі на сторінці; після
+            # перезавантаження таблиці на сторінку потрапляють наступні
+            remaining = list(dict.fromkeys(codes_to_delete))
+            for _ in range(len(remaining) // self.max_rows_per_page + 2):
+                selected = iframe.evaluate(_SELECT_CODES_JS, remaining)
+                if not selected:
+                    break
+                
+                snapshot = self._table_snapshot(iframe)
+                dialogs_before = _dialog_count(self.page)
+                removal = iframe.evaluate(_REMOVE_SELECTED_JS, {'modalWaitMs': 1500})
+                if not removal['called']:
+                    logger.error("❌ Функція removeSelectedGrids не знайдена")
+                    break
+                if not self._confirm_removal(iframe, removal, dialogs_before):
+                    break
+                if not self._wait_for_table_update(iframe, snapshot, timeout=10000):
+                    logger.warning("⚠️ Таблиця не оновилась після видалення")
+                
+                # Перевіряємо, які з відмічених кодів дійсно зникли з таблиці
+                still_present = set(iframe.evaluate(_CODES_PRESENT_JS, selected))
+                deleted = set(selected) - still_present
+                deleted_count += len(deleted)
+                remaining = [code for code in remaining if code not in deleted]
+                logger.info(f"🗑️ Видалено {len(deleted)}/{len(selected)} відмічених кодів, залишилось {len(remaining)}")
+                if not deleted or not remaining:
+                    break
+            
+            if remaining:
+                logger.warning(f"⚠️ Не видалено {len(remaining)} кодів: {', '.join(remaining[:10])}")
+                return False, deleted_count
+            
+            return True, deleted_count
             
         except Exception as e:
             logger.error(f"❌ Помилка пакетного видалення: {e}")
-            return False
+            return False, deleted_count
     
     def smart_management_cycle(self, start_amount: int, end_amount: int, 
                              target_count: int) -> Dict:
@@ -628,14 +999,21 @@ class PromoSmartManager:
             if not current_codes:
                 logger.warning("⚠️ Не знайдено жодного BON коду в заданому діапазоні")
             
-            # ЕТАП 2: Перевірка дублікатів для проблемних сум
+            # ЕТАП 2: Перевірка дублікатів для проблемних сум.
+            # get_all_pages_codes відсіює повтори між сторінками, але вони означають, що
+            # таблиця зсувалась під час пагінації і частину кодів могло бути пропущено.
+            # Тому перезбираємо суми з такими повторами, а також суми з підозріло великою
+            # кількістю кодів (понад 120% від цілі)
             logger.info(f"\n🔍 ЕТАП 2: Перевірка дублікатів...")
-            amounts_to_verify = []
-            for amount in range(start_amount, end_amount + 1):
-                if amount in current_codes and len(current_codes[amount]) > target_count * 1.2:
-                    amounts_to_verify.append(amount)
+            amounts_to_verify = [
+                amount for amount, codes in current_codes.items()
+                if start_amount <= amount <= end_amount
+                and (amount in self.duplicates_found or len(codes) > target_count * 1.2)
+            ]
             
-            if amounts_to_verify:
+            if not amounts_to_verify:
+                logger.info("✅ Повторів між сторінками і надлишкових сум немає, перевірка не потрібна")
+            else:
                 logger.info(f"🔍 Перевіряємо дублікати для сум: {amounts_to_verify}")
                 verified_codes = self.verify_duplicates_for_amounts(amounts_to_verify)
                 